@@ -1,7 +1,8 @@
 """
 Ponto de entrada para deploy na Vercel
+
+Usa a aplicação serverless, que inicializa sem importar o scraper nem o agendador.
 """
-import importlib.util
 import os
 import sys
 from pathlib import Path
@@ -10,11 +11,11 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-# Configuração para Vercel
+# Configuração para Vercel (usada apenas se uma atualização carregar o Playwright)
 os.environ["PLAYWRIGHT_BROWSERS_PATH"] = "0"
 
-# Importa a aplicação FastAPI
-from canaimeapi.app import app
+# Importa a aplicação FastAPI em modo serverless
+from canaimeapi.serverless import app
 
 # Exporta a aplicação para a Vercel
-app = app 
\ No newline at end of file
+app = app
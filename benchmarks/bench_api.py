@@ -0,0 +1,280 @@
+"""
+Mede vazão e latência de /api/v1/dados sob carga concorrente
+
+A API completa (`canaimeapi.app`) é iniciada com uvicorn em outro processo,
+apontada para o Canaimé simulado de `benchmarks.servidor_canaime` e com o
+backend HTTP, de modo que a primeira atualização termina em poucos segundos e
+sem acesso à rede. Depois, para cada nível de concorrência, clientes
+simultâneos repetem a requisição durante o tempo indicado.
+
+O gerador de carga roda em Python no mesmo computador: em máquinas com poucos
+núcleos ele próprio pode limitar a vazão medida. Os corpos são lidos sem
+descompressão, para não somar ao cliente o custo de gzip/brotli.
+
+Uso:
+    python -m benchmarks.bench_api --total 5000 --concorrencia 1 10 50
+    python -m benchmarks.bench_api --condicional --caminho "/api/v1/dados?unidade=PAMC"
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.servidor_canaime import ServidorCanaime
+
+RAIZ_PROJETO = Path(__file__).parent.parent
+AUTENTICACAO = ("admin", "admin")
+
+
+def porta_livre() -> int:
+    """Retorna uma porta TCP livre no endereço local"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def iniciar_api(servidor: ServidorCanaime, unidades: List[str], porta: int, diretorio: str) -> subprocess.Popen:
+    """
+    Inicia a API em um processo uvicorn apontado para o servidor simulado
+
+    Args:
+        servidor: Canaimé simulado já iniciado
+        unidades: Unidades prisionais extraídas
+        porta: Porta de escuta da API
+        diretorio: Diretório temporário para snapshots e sessão
+
+    Returns:
+        subprocess.Popen: Processo da API
+    """
+    ambiente = {
+        **os.environ,
+        **servidor.variaveis_ambiente(unidades),
+        "CANAIME_BACKEND": "http",
+        "CANAIME_ARMAZENAMENTO_PATH": os.path.join(diretorio, "snapshots.sqlite3"),
+        "CANAIME_SESSAO_PATH": os.path.join(diretorio, "sessao.json"),
+        "CANAIME_FOTOS_CACHE_PATH": "",
+        "ATUALIZAR_INTERVALO_MINUTOS": "1440",
+        "API_USERNAME": AUTENTICACAO[0],
+        "API_PASSWORD": AUTENTICACAO[1],
+        # A carga vem de um único cliente; o limite por cliente distorceria a medição
+        "API_LIMITE_POR_MINUTO": "0",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "canaimeapi.app:app",
+            "--host", "127.0.0.1", "--port", str(porta),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=RAIZ_PROJETO,
+        env=ambiente,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def aguardar_dados(url_base: str, esperados: int, processo: subprocess.Popen, limite: float) -> None:
+    """
+    Aguarda a API responder com todos os registros da primeira atualização
+
+    Raises:
+        RuntimeError: Se o processo terminar ou o tempo limite for atingido
+    """
+    fim = time.monotonic() + limite
+    async with httpx.AsyncClient(auth=AUTENTICACAO, timeout=5) as client:
+        while time.monotonic() < fim:
+            if processo.poll() is not None:
+                raise RuntimeError(f"A API terminou com código {processo.returncode}")
+            try:
+                resposta = await client.get(f"{url_base}/api/v1/status")
+                if resposta.status_code == 200 and resposta.json()["registros"] >= esperados:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"A API não carregou {esperados} registros em {limite:.0f}s")
+
+
+async def gerar_carga(
+    url: str,
+    concorrencia: int,
+    duracao: float,
+    cabecalhos: Dict[str, str],
+) -> Dict:
+    """
+    Repete a requisição com `concorrencia` clientes simultâneos durante `duracao` segundos
+
+    Args:
+        url: Endereço requisitado
+        concorrencia: Requisições em andamento ao mesmo tempo
+        duracao: Tempo de medição, em segundos
+        cabecalhos: Cabeçalhos enviados em todas as requisições
+
+    Returns:
+        Dict: Requisições, erros, vazão, percentis de latência e bytes por resposta
+    """
+    latencias: List[float] = []
+    erros = 0
+    bytes_recebidos = 0
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(auth=AUTENTICACAO, headers=cabecalhos, limits=limites, timeout=60) as client:
+
+        async def cliente(fim: float) -> None:
+            nonlocal erros, bytes_recebidos
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    async with client.stream("GET", url) as resposta:
+                        async for parte in resposta.aiter_raw():
+                            bytes_recebidos += len(parte)
+                    if resposta.status_code not in (200, 304):
+                        erros += 1
+                        continue
+                except httpx.HTTPError:
+                    erros += 1
+                    continue
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(inicio + duracao) for _ in range(concorrencia)))
+        decorrido = time.perf_counter() - inicio
+
+    if len(latencias) < 2:
+        raise RuntimeError(f"Poucas respostas válidas ({len(latencias)}) e {erros} erros")
+
+    percentis = statistics.quantiles(latencias, n=100, method="inclusive")
+    return {
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_s": round(len(latencias) / decorrido, 1),
+        "p50_ms": round(percentis[49] * 1000, 2),
+        "p95_ms": round(percentis[94] * 1000, 2),
+        "p99_ms": round(percentis[98] * 1000, 2),
+        "max_ms": round(max(latencias) * 1000, 2),
+        "bytes_resposta": bytes_recebidos // max(len(latencias) + erros, 1),
+    }
+
+
+async def executar(
+    total: int,
+    unidades: List[str],
+    niveis: List[int],
+    duracao: float,
+    caminho: str = "/api/v1/dados",
+    codificacao: str = "gzip",
+    condicional: bool = False,
+    limite_inicializacao: float = 120.0,
+) -> Dict:
+    """
+    Sobe o Canaimé simulado e a API e mede cada nível de concorrência
+
+    Args:
+        total: Presos por unidade
+        unidades: Unidades prisionais extraídas
+        niveis: Níveis de concorrência medidos
+        duracao: Tempo de medição por nível, em segundos
+        caminho: Caminho requisitado na API
+        codificacao: Valor do cabeçalho Accept-Encoding
+        condicional: Envia If-None-Match com o ETag atual (mede respostas 304)
+        limite_inicializacao: Tempo máximo, em segundos, para a API carregar os dados
+
+    Returns:
+        Dict: Parâmetros da medição e resultados por nível de concorrência
+    """
+    porta = porta_livre()
+    url_base = f"http://127.0.0.1:{porta}"
+
+    with ServidorCanaime(total) as servidor, tempfile.TemporaryDirectory() as diretorio:
+        processo = iniciar_api(servidor, unidades, porta, diretorio)
+        try:
+            inicio = time.perf_counter()
+            await aguardar_dados(url_base, total * len(unidades), processo, limite_inicializacao)
+            inicializacao = time.perf_counter() - inicio
+
+            cabecalhos = {"Accept-Encoding": codificacao}
+            if condicional:
+                async with httpx.AsyncClient(auth=AUTENTICACAO, headers=cabecalhos) as client:
+                    etag: Optional[str] = (await client.get(url_base + caminho)).headers.get("ETag")
+                if etag is None:
+                    raise RuntimeError(f"{caminho} não retornou ETag")
+                cabecalhos["If-None-Match"] = etag
+
+            # Aquecimento: primeira serialização e conexões abertas
+            await gerar_carga(url_base + caminho, max(niveis), min(duracao, 1.0), cabecalhos)
+
+            resultados = [
+                await gerar_carga(url_base + caminho, nivel, duracao, cabecalhos)
+                for nivel in niveis
+            ]
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    return {
+        "caminho": caminho,
+        "accept_encoding": codificacao,
+        "condicional": condicional,
+        "registros": total * len(unidades),
+        "inicializacao_s": round(inicializacao, 2),
+        "niveis": resultados,
+    }
+
+
+def exibir(resultado: Dict) -> None:
+    """Imprime a tabela de vazão e latência por nível de concorrência"""
+    print(
+        f"{resultado['caminho']} ({resultado['registros']} registros, "
+        f"Accept-Encoding: {resultado['accept_encoding']}, "
+        f"condicional: {'sim' if resultado['condicional'] else 'não'})"
+    )
+    print(f"Dados disponíveis {resultado['inicializacao_s']:.2f}s após iniciar a API")
+    print(
+        f"{'conc.':>5} {'req/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+        f"{'máx (ms)':>9} {'bytes':>9} {'erros':>6}"
+    )
+    for nivel in resultado["niveis"]:
+        print(
+            f"{nivel['concorrencia']:>5} {nivel['req_s']:>9.1f} {nivel['p50_ms']:>9.2f} "
+            f"{nivel['p95_ms']:>9.2f} {nivel['p99_ms']:>9.2f} {nivel['max_ms']:>9.2f} "
+            f"{nivel['bytes_resposta']:>9} {nivel['erros']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=5000, help="Presos por unidade")
+    parser.add_argument("--unidades", default="PAMC", help="Unidades separadas por vírgula")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 10, 50], help="Níveis de concorrência")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de medição por nível")
+    parser.add_argument("--caminho", default="/api/v1/dados", help="Caminho requisitado")
+    parser.add_argument("--encoding", default="gzip", help="Cabeçalho Accept-Encoding")
+    parser.add_argument("--condicional", action="store_true", help="Envia If-None-Match (respostas 304)")
+    parser.add_argument("--json", help="Arquivo onde o resultado é gravado em JSON")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(
+        executar(
+            args.total,
+            [u.strip().upper() for u in args.unidades.split(",") if u.strip()],
+            args.concorrencia,
+            args.duracao,
+            args.caminho,
+            args.encoding,
+            args.condicional,
+        )
+    )
+    exibir(resultado)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump({"api": resultado}, arquivo, indent=2)
@@ -0,0 +1,86 @@
+"""
+Compara a extração elemento a elemento com a extração em lote do CanaimeScraper
+
+Uso:
+    python -m benchmarks.bench_extracao --total 5000 --repeticoes 3
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from playwright.async_api import async_playwright
+
+from benchmarks.fixtures import salvar_pagina_chamada
+from canaimeapi.scraper.crawler import CANAIME_FOTOS_URL, CanaimeScraper
+from canaimeapi.scraper.parser import processar_entradas
+
+
+async def medir_modo(scraper: CanaimeScraper, page, modo: str, repeticoes: int):
+    """
+    Mede o tempo de leitura da página e de processamento das entradas
+
+    Args:
+        scraper: Instância do scraper
+        page: Página do Playwright com a chamada carregada
+        modo: "item" ou "lote"
+        repeticoes: Quantidade de execuções medidas
+
+    Returns:
+        Tuple: Melhor tempo de leitura, melhor tempo de processamento e registros
+    """
+    ler = scraper._ler_entradas_item if modo == "item" else scraper._ler_entradas_lote
+    melhor_leitura = melhor_processamento = float("inf")
+    registros = []
+
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        entradas, nomes, fotos = await ler(page)
+        meio = time.perf_counter()
+        registros = processar_entradas(entradas, nomes, fotos, CANAIME_FOTOS_URL)
+        fim = time.perf_counter()
+
+        melhor_leitura = min(melhor_leitura, meio - inicio)
+        melhor_processamento = min(melhor_processamento, fim - meio)
+
+    return melhor_leitura, melhor_processamento, registros
+
+
+async def main(total: int, repeticoes: int):
+    """Executa o benchmark sobre a página sintética salva em disco"""
+    caminho = salvar_pagina_chamada(total)
+    print(f"Página de chamada: {caminho} ({total} presos)")
+
+    scraper = CanaimeScraper()
+    resultados = {}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context(java_script_enabled=False)
+        page = await context.new_page()
+        await page.goto(caminho.resolve().as_uri())
+
+        for modo in ("item", "lote"):
+            resultados[modo] = await medir_modo(scraper, page, modo, repeticoes)
+
+        await browser.close()
+
+    if resultados["item"][2] != resultados["lote"][2]:
+        raise SystemExit("Os modos item e lote produziram registros diferentes")
+
+    print(f"{'modo':<6} {'leitura (s)':>12} {'processamento (s)':>18} {'registros':>10}")
+    for modo, (leitura, processamento, registros) in resultados.items():
+        print(f"{modo:<6} {leitura:>12.3f} {processamento:>18.3f} {len(registros):>10}")
+
+    ganho = resultados["item"][0] / resultados["lote"][0]
+    print(f"Leitura em lote {ganho:.1f}x mais rápida")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--total", type=int, default=5000, help="Quantidade de presos na página")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por modo")
+    args = parser.parse_args()
+
+    logging.getLogger("canaime_scraper").setLevel(logging.ERROR)
+    asyncio.run(main(args.total, args.repeticoes))
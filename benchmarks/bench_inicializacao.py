@@ -0,0 +1,122 @@
+"""
+Mede o tempo de importação dos pontos de entrada da API, módulo a módulo
+
+Cada ponto de entrada é importado em um processo novo com `python -X importtime`,
+como em um cold start. Para cada um são exibidos o tempo total, os pacotes que
+mais pesam (soma do tempo próprio dos seus módulos) e os módulos mais lentos.
+
+Uso:
+    python -m benchmarks.bench_inicializacao
+    python -m benchmarks.bench_inicializacao canaimeapi.serverless --top 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Pontos de entrada comparados por padrão
+PONTOS_DE_ENTRADA = ["canaimeapi.app", "canaimeapi.serverless", "api.index"]
+# Dependências pesadas cuja presença após a importação é informada
+PACOTES_PESADOS = ["playwright", "pandas", "apscheduler", "httpx", "selectolax", "numpy"]
+
+RAIZ_PROJETO = Path(__file__).parent.parent
+
+
+def importar(modulo: str) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """
+    Importa o módulo em um processo novo e lê a saída de `-X importtime`
+
+    Args:
+        modulo: Módulo a importar
+
+    Returns:
+        Tuple: Tempo próprio e acumulado (µs) por módulo, e pacotes pesados carregados
+    """
+    verificacao = f"import sys; print(','.join(p for p in {PACOTES_PESADOS!r} if p in sys.modules))"
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}; {verificacao}"],
+        capture_output=True, text=True, check=True, cwd=RAIZ_PROJETO,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        tempos[nome.strip()] = (int(proprio), int(acumulado))
+
+    carregados = processo.stdout.strip().splitlines()[-1] if processo.stdout.strip() else ""
+    return tempos, [p for p in carregados.split(",") if p]
+
+
+def medir(modulo: str, repeticoes: int) -> Tuple[Dict[str, Tuple[float, float]], List[str]]:
+    """
+    Repete a importação e retorna a mediana dos tempos de cada módulo
+
+    Args:
+        modulo: Módulo a importar
+        repeticoes: Quantidade de processos executados
+
+    Returns:
+        Tuple: Tempo próprio e acumulado (ms) por módulo, e pacotes pesados carregados
+    """
+    execucoes = []
+    carregados: List[str] = []
+    for _ in range(repeticoes):
+        tempos, carregados = importar(modulo)
+        execucoes.append(tempos)
+
+    medianas = {}
+    for nome in execucoes[0]:
+        proprios = [tempos[nome][0] for tempos in execucoes if nome in tempos]
+        acumulados = [tempos[nome][1] for tempos in execucoes if nome in tempos]
+        medianas[nome] = (statistics.median(proprios) / 1000, statistics.median(acumulados) / 1000)
+    return medianas, carregados
+
+
+def exibir(modulo: str, tempos: Dict[str, Tuple[float, float]], carregados: List[str], top: int):
+    """Imprime o relatório de um ponto de entrada"""
+    total = tempos.get(modulo, (0.0, 0.0))[1]
+    print(f"\n{modulo}: {total:.1f} ms ({len(tempos)} módulos)")
+    print(f"  Dependências pesadas carregadas: {', '.join(carregados) or 'nenhuma'}")
+
+    por_pacote: Dict[str, float] = defaultdict(float)
+    for nome, (proprio, _) in tempos.items():
+        por_pacote[nome.split(".")[0]] += proprio
+
+    print("  Pacotes (tempo próprio somado):")
+    for pacote, tempo in sorted(por_pacote.items(), key=lambda item: -item[1])[:top]:
+        print(f"    {tempo:8.1f} ms  {pacote}")
+
+    print("  Módulos (tempo acumulado):")
+    for nome, (_, acumulado) in sorted(tempos.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"    {acumulado:8.1f} ms  {nome}")
+
+
+def main(modulos: List[str], repeticoes: int, top: int):
+    """Mede e exibe cada ponto de entrada"""
+    print(f"Importação em processo novo, mediana de {repeticoes} execuções")
+    resumo = []
+    for modulo in modulos:
+        tempos, carregados = medir(modulo, repeticoes)
+        exibir(modulo, tempos, carregados, top)
+        resumo.append((modulo, tempos.get(modulo, (0.0, 0.0))[1]))
+
+    print("\nResumo:")
+    for modulo, total in resumo:
+        print(f"  {total:8.1f} ms  {modulo}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modulos", nargs="*", default=PONTOS_DE_ENTRADA, help="Módulos a importar")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Processos por ponto de entrada")
+    parser.add_argument("--top", type=int, default=10, help="Itens exibidos por lista")
+    args = parser.parse_args()
+
+    main(args.modulos, args.repeticoes, args.top)
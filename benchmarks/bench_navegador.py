@@ -0,0 +1,236 @@
+"""
+Compara os perfis do Chromium: tempo de carregamento das páginas e pico de memória
+
+Para cada perfil (canaimeapi.scraper.browser.PERFIS) o navegador é iniciado,
+autenticado uma vez no Canaimé simulado e abre a página de chamada de cada
+unidade a cada repetição, como em `NavegadorPersistente`. São medidos:
+- inicio: lançamento do Chromium e criação do contexto
+- carregamento: goto + networkidle de uma página de chamada
+- pico de RSS: soma da memória residente dos processos filhos deste processo
+  (driver do Playwright e todos os processos do Chromium), amostrada a cada
+  INTERVALO_AMOSTRA segundos em /proc; por isso só funciona no Linux
+
+A página de chamada referencia uma foto por preso. No perfil padrao cada uma
+passa pelo callback Python que a bloqueia; no enxuto o Chromium nem as pede.
+
+Uso:
+    python -m benchmarks.bench_navegador --total 5000 --unidades PAMC,CPBV
+    python -m benchmarks.bench_navegador --padrao-com-interface --json navegador.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.bench_scraper import configurar_ambiente, resumir
+from benchmarks.servidor_canaime import ServidorCanaime
+
+INTERVALO_AMOSTRA = 0.05
+# Os mesmos de canaimeapi.scraper.browser.PERFIS; importar o pacote antes de
+# configurar_ambiente fixaria a configuração lida do ambiente
+PERFIS = ("enxuto", "padrao")
+
+
+def _filhos(pid: int) -> List[int]:
+    """Processos filhos diretos de um processo, lidos de /proc"""
+    filhos = []
+    try:
+        for tarefa in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tarefa}/children", encoding="ascii") as arquivo:
+                filhos.extend(int(filho) for filho in arquivo.read().split())
+    except OSError:
+        pass
+    return filhos
+
+
+def _rss_kib(pid: int) -> int:
+    """Memória residente (VmRSS) de um processo, em KiB; 0 se ele já terminou"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def rss_descendentes(pid: int) -> int:
+    """Soma da memória residente de todos os descendentes de um processo, em KiB"""
+    total = 0
+    pendentes = _filhos(pid)
+    while pendentes:
+        filho = pendentes.pop()
+        total += _rss_kib(filho)
+        pendentes.extend(_filhos(filho))
+    return total
+
+
+class AmostradorMemoria:
+    """Amostra, em uma thread, o RSS dos descendentes deste processo e guarda o pico"""
+
+    def __init__(self, intervalo: float = INTERVALO_AMOSTRA):
+        self.intervalo = intervalo
+        self.pico_kib = 0
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _amostrar(self) -> None:
+        pid = os.getpid()
+        while not self._parar.is_set():
+            self.pico_kib = max(self.pico_kib, rss_descendentes(pid))
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self) -> "AmostradorMemoria":
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._parar.set()
+        self._thread.join()
+
+
+async def medir_perfil(
+    scraper, perfil: str, headless: bool, unidades: List[str], repeticoes: int
+) -> Dict:
+    """
+    Mede um perfil do Chromium
+
+    Args:
+        scraper: CanaimeScraper configurado para o servidor simulado
+        perfil: PERFIL_ENXUTO ou PERFIL_PADRAO
+        headless: Executa o navegador sem interface gráfica
+        unidades: Unidades cujas páginas são carregadas
+        repeticoes: Vezes que cada página é carregada
+
+    Returns:
+        Dict: Tempos de início e de carregamento, pico de RSS e registros extraídos
+    """
+    from playwright.async_api import async_playwright
+
+    from canaimeapi.scraper.browser import criar_contexto, iniciar_chromium
+    from canaimeapi.scraper.config import url_unidade
+
+    carregamentos: List[float] = []
+    registros = 0
+
+    with AmostradorMemoria() as amostrador:
+        async with async_playwright() as p:
+            inicio = time.perf_counter()
+            browser = await iniciar_chromium(p, headless, perfil)
+            context = await criar_contexto(browser, perfil)
+            page = await context.new_page()
+            duracao_inicio = time.perf_counter() - inicio
+            try:
+                await scraper.realizar_login(page)
+                for _ in range(repeticoes):
+                    registros = 0
+                    for unidade in unidades:
+                        inicio = time.perf_counter()
+                        await page.goto(url_unidade(unidade), timeout=0)
+                        await page.wait_for_load_state("networkidle")
+                        carregamentos.append(time.perf_counter() - inicio)
+                        if await scraper._sessao_expirada(page):
+                            raise RuntimeError("O servidor simulado recusou a sessão")
+                        entradas, _, _ = await scraper._ler_entradas_lote(page)
+                        registros += len(entradas)
+            finally:
+                await context.close()
+                await browser.close()
+
+    return {
+        "headless": headless,
+        "inicio_ms": round(duracao_inicio * 1000, 2),
+        "carregamento": resumir(carregamentos),
+        "pico_rss_mib": round(amostrador.pico_kib / 1024, 1),
+        "registros": registros,
+    }
+
+
+async def executar(
+    total: int,
+    unidades: List[str],
+    repeticoes: int,
+    perfis: List[str],
+    padrao_com_interface: bool = False,
+) -> Dict:
+    """
+    Sobe o servidor simulado e mede cada perfil, um de cada vez
+
+    Args:
+        total: Presos por unidade
+        unidades: Unidades prisionais carregadas
+        repeticoes: Vezes que cada página é carregada por perfil
+        perfis: Perfis medidos
+        padrao_com_interface: Mede o perfil padrao com interface gráfica, como o
+            scraper rodava antes de CANAIME_HEADLESS (exige um display)
+
+    Returns:
+        Dict: Resultado de `medir_perfil` por perfil
+    """
+    with ServidorCanaime(total) as servidor:
+        configurar_ambiente(servidor, unidades)
+        for unidade in unidades:
+            servidor.pagina_chamada(unidade)
+
+        from canaimeapi.scraper.browser import PERFIL_PADRAO
+        from canaimeapi.scraper.crawler import CanaimeScraper
+        from canaimeapi.scraper.repositorio import RepositorioSnapshots
+
+        scraper = CanaimeScraper(unidades=unidades, repositorio=RepositorioSnapshots(unidades))
+        resultados = {}
+        for perfil in perfis:
+            headless = not (padrao_com_interface and perfil == PERFIL_PADRAO)
+            resultados[perfil] = await medir_perfil(scraper, perfil, headless, unidades, repeticoes)
+
+    return resultados
+
+
+def exibir(resultados: Dict) -> None:
+    """Imprime a comparação entre os perfis"""
+    print(
+        f"{'perfil':<8} {'headless':<9} {'início (ms)':>12} {'carga med. (ms)':>16} "
+        f"{'carga máx. (ms)':>16} {'pico RSS (MiB)':>15} {'registros':>10}"
+    )
+    for perfil, resumo in resultados.items():
+        carregamento = resumo["carregamento"]
+        print(
+            f"{perfil:<8} {str(resumo['headless']).lower():<9} {resumo['inicio_ms']:>12.1f} "
+            f"{carregamento['mediana_ms']:>16.1f} {carregamento['max_ms']:>16.1f} "
+            f"{resumo['pico_rss_mib']:>15.1f} {resumo['registros']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=5000, help="Presos por unidade")
+    parser.add_argument("--unidades", default="PAMC", help="Unidades separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Carregamentos de cada página por perfil")
+    parser.add_argument("--perfil", nargs="+", choices=PERFIS, default=list(PERFIS))
+    parser.add_argument(
+        "--padrao-com-interface",
+        action="store_true",
+        help="Mede o perfil padrao com interface gráfica, como antes de CANAIME_HEADLESS",
+    )
+    parser.add_argument("--json", help="Arquivo onde o resultado é gravado em JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("canaime_scraper").setLevel(logging.ERROR)
+    resultados = asyncio.run(
+        executar(
+            args.total,
+            [u.strip().upper() for u in args.unidades.split(",") if u.strip()],
+            args.repeticoes,
+            args.perfil,
+            args.padrao_com_interface,
+        )
+    )
+    exibir(resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump({"navegador": resultados}, arquivo, indent=2)
@@ -0,0 +1,245 @@
+"""
+Mede a latência do scraping contra o Canaimé simulado, separada por fase
+
+Para cada backend são medidas três fases, em uma sessão nova a cada repetição:
+- login: página de login, envio do formulário e redirecionamento
+- navegação: abertura da página de chamada de cada unidade
+- extração: leitura das entradas e conversão em registros
+
+Nenhuma requisição sai da máquina: o scraper é apontado para o servidor de
+`benchmarks.servidor_canaime`.
+
+Uso:
+    python -m benchmarks.bench_scraper --total 5000 --unidades PAMC,CPBV
+    python -m benchmarks.bench_scraper --backend http --json resultado.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.servidor_canaime import ServidorCanaime
+
+BACKENDS = ("playwright", "http")
+FASES = ("login", "navegacao", "extracao")
+
+
+def configurar_ambiente(servidor: ServidorCanaime, unidades: List[str]) -> None:
+    """
+    Aponta a configuração do scraper para o servidor simulado
+
+    Precisa ser chamada antes de importar `canaimeapi`, que lê as variáveis de
+    ambiente na importação. Armazenamento de snapshots e cache de fotos são
+    desativados e a sessão do navegador fica em um diretório temporário.
+
+    Args:
+        servidor: Servidor simulado já iniciado
+        unidades: Unidades prisionais a extrair
+    """
+    os.environ.update(servidor.variaveis_ambiente(unidades))
+    os.environ["CANAIME_ARMAZENAMENTO_PATH"] = ""
+    os.environ["CANAIME_FOTOS_CACHE_PATH"] = ""
+    os.environ["CANAIME_SESSAO_PATH"] = os.path.join(tempfile.mkdtemp(), "sessao.json")
+
+
+def resumir(amostras: List[float]) -> Dict[str, float]:
+    """Mediana, mínimo e máximo das amostras, em milissegundos"""
+    return {
+        "mediana_ms": round(statistics.median(amostras) * 1000, 2),
+        "min_ms": round(min(amostras) * 1000, 2),
+        "max_ms": round(max(amostras) * 1000, 2),
+    }
+
+
+async def medir_playwright(scraper, unidades: List[str], repeticoes: int) -> Dict[str, List[float]]:
+    """
+    Mede as fases com o navegador, reproduzindo `CanaimeScraper.extrair_dados`
+
+    Cada repetição usa um contexto novo, sem cookies, para que o login aconteça. O
+    Chromium usa o perfil configurado em CANAIME_NAVEGADOR_PERFIL.
+
+    Returns:
+        Dict[str, List[float]]: Tempos, em segundos, de cada fase por repetição
+    """
+    from playwright.async_api import async_playwright
+
+    from canaimeapi.scraper.browser import criar_contexto, iniciar_chromium
+    from canaimeapi.scraper.config import CANAIME_FOTOS_URL, url_unidade
+    from canaimeapi.scraper.parser import processar_entradas
+
+    tempos: Dict[str, List[float]] = {fase: [] for fase in FASES}
+    registros = 0
+    perfil = scraper.navegador.perfil
+
+    async with async_playwright() as p:
+        browser = await iniciar_chromium(p, True, perfil)
+        try:
+            for _ in range(repeticoes):
+                context = await criar_contexto(browser, perfil)
+                page = await context.new_page()
+
+                inicio = time.perf_counter()
+                await scraper.realizar_login(page)
+                tempos["login"].append(time.perf_counter() - inicio)
+
+                navegacao = extracao = 0.0
+                registros = 0
+                for unidade in unidades:
+                    inicio = time.perf_counter()
+                    await page.goto(url_unidade(unidade), timeout=0)
+                    await page.wait_for_load_state("networkidle")
+                    if await scraper._sessao_expirada(page):
+                        raise RuntimeError("O servidor simulado recusou a sessão")
+                    meio = time.perf_counter()
+                    entradas, nomes, fotos = await scraper._ler_entradas_lote(page)
+                    registros += len(processar_entradas(entradas, nomes, fotos, CANAIME_FOTOS_URL))
+                    fim = time.perf_counter()
+
+                    navegacao += meio - inicio
+                    extracao += fim - meio
+
+                tempos["navegacao"].append(navegacao)
+                tempos["extracao"].append(extracao)
+                await context.close()
+        finally:
+            await browser.close()
+
+    return {**tempos, "registros": registros}
+
+
+async def medir_http(scraper, unidades: List[str], repeticoes: int) -> Dict[str, List[float]]:
+    """
+    Mede as fases com o backend HTTP, reproduzindo `CanaimeScraper.extrair_dados_http`
+
+    Cada repetição usa um cliente novo, sem cookies, para que o login aconteça.
+
+    Returns:
+        Dict[str, List[float]]: Tempos, em segundos, de cada fase por repetição
+    """
+    from canaimeapi.scraper.config import CANAIME_FOTOS_URL, url_unidade
+    from canaimeapi.scraper.parser import (
+        eh_pagina_login,
+        extrair_entradas_html,
+        processar_entradas,
+    )
+
+    http = scraper.http
+    tempos: Dict[str, List[float]] = {fase: [] for fase in FASES}
+    registros = 0
+
+    for _ in range(repeticoes):
+        await http.fechar()
+        client = http._obter_cliente()
+
+        inicio = time.perf_counter()
+        await http.realizar_login(client)
+        tempos["login"].append(time.perf_counter() - inicio)
+
+        navegacao = extracao = 0.0
+        registros = 0
+        for unidade in unidades:
+            inicio = time.perf_counter()
+            html = await http.obter_pagina(client, url_unidade(unidade))
+            meio = time.perf_counter()
+            if eh_pagina_login(html):
+                raise RuntimeError("O servidor simulado recusou a sessão")
+            entradas, nomes, fotos = extrair_entradas_html(html)
+            registros += len(processar_entradas(entradas, nomes, fotos, CANAIME_FOTOS_URL))
+            fim = time.perf_counter()
+
+            navegacao += meio - inicio
+            extracao += fim - meio
+
+        tempos["navegacao"].append(navegacao)
+        tempos["extracao"].append(extracao)
+
+    await http.fechar()
+    return {**tempos, "registros": registros}
+
+
+async def executar(
+    total: int,
+    unidades: List[str],
+    repeticoes: int,
+    backends: List[str],
+    latencia: float = 0.0,
+) -> Dict:
+    """
+    Sobe o servidor simulado e mede cada backend
+
+    Args:
+        total: Presos por unidade
+        unidades: Unidades prisionais extraídas
+        repeticoes: Sessões medidas por backend
+        backends: Backends medidos ("playwright" e/ou "http")
+        latencia: Atraso, em segundos, acrescentado pelo servidor a cada resposta
+
+    Returns:
+        Dict: Resumo por backend e fase, com a quantidade de registros extraídos
+    """
+    with ServidorCanaime(total, latencia=latencia) as servidor:
+        configurar_ambiente(servidor, unidades)
+        # Gera as páginas antes das medições
+        for unidade in unidades:
+            servidor.pagina_chamada(unidade)
+
+        from canaimeapi.scraper.crawler import CanaimeScraper
+        from canaimeapi.scraper.repositorio import RepositorioSnapshots
+
+        scraper = CanaimeScraper(unidades=unidades, repositorio=RepositorioSnapshots(unidades))
+        medidores = {"playwright": medir_playwright, "http": medir_http}
+
+        resultados = {}
+        for backend in backends:
+            tempos = await medidores[backend](scraper, unidades, repeticoes)
+            resumo = {fase: resumir(tempos[fase]) for fase in FASES}
+            resumo["total"] = resumir([sum(fases) for fases in zip(*(tempos[f] for f in FASES))])
+            resumo["registros"] = tempos["registros"]
+            resultados[backend] = resumo
+
+    return resultados
+
+
+def exibir(resultados: Dict) -> None:
+    """Imprime a tabela de latências por backend e fase"""
+    print(f"{'backend':<11} {'fase':<10} {'mediana (ms)':>13} {'mín (ms)':>10} {'máx (ms)':>10}")
+    for backend, resumo in resultados.items():
+        for fase in (*FASES, "total"):
+            tempos = resumo[fase]
+            print(
+                f"{backend:<11} {fase:<10} {tempos['mediana_ms']:>13.1f} "
+                f"{tempos['min_ms']:>10.1f} {tempos['max_ms']:>10.1f}"
+            )
+        print(f"{backend:<11} {'registros':<10} {resumo['registros']:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=5000, help="Presos por unidade")
+    parser.add_argument("--unidades", default="PAMC", help="Unidades separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Sessões medidas por backend")
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--latencia", type=float, default=0.0, help="Atraso do servidor por resposta, em ms")
+    parser.add_argument("--json", help="Arquivo onde o resultado é gravado em JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("canaime_scraper").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    resultados = asyncio.run(
+        executar(
+            args.total,
+            [u.strip().upper() for u in args.unidades.split(",") if u.strip()],
+            args.repeticoes,
+            args.backend,
+            args.latencia / 1000,
+        )
+    )
+    exibir(resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump({"scraper": resultados}, arquivo, indent=2)
@@ -0,0 +1,142 @@
+"""
+Compara o snapshot em DataFrame (modelo anterior) com a TabelaPresos
+
+Mede, sobre uma chamada sintética, o tempo de importação e a memória residente
+do processo (Linux), a memória ocupada pelos registros e o tempo de serialização em JSON.
+
+Uso:
+    python -m benchmarks.bench_snapshot --total 50000
+"""
+import argparse
+import gc
+import json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixtures import gerar_pagina_chamada
+from canaimeapi.scraper.parser import extrair_entradas_html, processar_entradas
+from canaimeapi.scraper.tabela import TabelaPresos
+
+# Mede o tempo de importação e a memória residente em um processo novo
+# (VmRSS do /proc; ru_maxrss herdaria o pico do processo que fez o fork)
+SCRIPT_IMPORTACAO = """
+import sys, time
+inicio = time.perf_counter()
+for modulo in sys.argv[1:]:
+    __import__(modulo)
+duracao = time.perf_counter() - inicio
+with open("/proc/self/status") as status:
+    rss = next(int(linha.split()[1]) for linha in status if linha.startswith("VmRSS:"))
+print(duracao, rss, "pandas" in sys.modules)
+"""
+
+
+def medir_importacao(modulos, repeticoes: int):
+    """
+    Importa os módulos em processos novos e retorna a mediana das medições
+
+    Args:
+        modulos: Módulos importados, em ordem
+        repeticoes: Quantidade de processos executados
+
+    Returns:
+        Tuple: Tempo de importação (s), RSS (KiB) e se o pandas foi carregado
+    """
+    duracoes, memorias, carregou_pandas = [], [], False
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", SCRIPT_IMPORTACAO, *modulos],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        duracoes.append(float(saida[0]))
+        memorias.append(int(saida[1]))
+        carregou_pandas = saida[2] == "True"
+    return statistics.median(duracoes), statistics.median(memorias), carregou_pandas
+
+
+def medir_memoria(construir, registros_json: str):
+    """
+    Mede a memória retida pelo modelo construído a partir do JSON salvo
+
+    Args:
+        construir: Função que recebe os registros e devolve o modelo
+        registros_json: Registros serializados, como no armazenamento
+
+    Returns:
+        Tuple: Modelo construído e bytes retidos após descartar os intermediários
+    """
+    gc.collect()
+    tracemalloc.start()
+    registros = json.loads(registros_json)
+    modelo = construir(registros)
+    del registros
+    gc.collect()
+    retido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return modelo, retido
+
+
+def melhor_tempo(funcao, repeticoes: int) -> float:
+    """Retorna o menor tempo (s) entre as execuções da função"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main(total: int, repeticoes: int):
+    """Executa as medições e imprime a comparação"""
+    import pandas as pd
+
+    entradas, nomes, fotos = extrair_entradas_html(gerar_pagina_chamada(total))
+    registros = processar_entradas(entradas, nomes, fotos, "https://canaime.com.br/sgp2rr/fotos/presos/")
+    registros_json = TabelaPresos.de_registros(registros, unidade="PAMC").para_json()
+    print(f"Chamada sintética: {total} presos\n")
+
+    print("Importação (processo novo, mediana):")
+    for nome, modulos in (
+        ("pandas", ["pandas"]),
+        ("tabela + índices (atual)", ["canaimeapi.scraper.snapshot"]),
+        ("tabela + índices + pandas (anterior)", ["pandas", "canaimeapi.scraper.snapshot"]),
+    ):
+        duracao, rss, carregou_pandas = medir_importacao(modulos, repeticoes)
+        print(
+            f"  {nome:<38} {duracao * 1000:7.1f} ms  RSS {rss / 1024:6.1f} MiB  "
+            f"pandas carregado: {'sim' if carregou_pandas else 'não'}"
+        )
+
+    def construir_dataframe(dados):
+        # Modelo anterior: DataFrame para o JSON e lista de dicionários para os índices
+        dataframe = pd.DataFrame(dados)
+        return dataframe, dataframe.to_dict("records")
+
+    dataframe_registros, memoria_anterior = medir_memoria(construir_dataframe, registros_json)
+    tabela, memoria_atual = medir_memoria(TabelaPresos.de_registros, registros_json)
+
+    print("\nMemória retida pelos registros:")
+    print(f"  DataFrame + registros (anterior)       {memoria_anterior / 2**20:7.1f} MiB")
+    print(f"  TabelaPresos (atual)                   {memoria_atual / 2**20:7.1f} MiB")
+
+    dataframe = dataframe_registros[0]
+    tempo_anterior = melhor_tempo(
+        lambda: dataframe.to_json(orient="records", force_ascii=False), repeticoes
+    )
+    tempo_atual = melhor_tempo(tabela.para_json, repeticoes)
+
+    print("\nSerialização em JSON (melhor tempo):")
+    print(f"  DataFrame.to_json (anterior)           {tempo_anterior * 1000:7.1f} ms")
+    print(f"  TabelaPresos.para_json (atual)         {tempo_atual * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--total", type=int, default=50000, help="Quantidade de presos na chamada")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Execuções por medição")
+    args = parser.parse_args()
+
+    main(args.total, args.repeticoes)
@@ -0,0 +1,77 @@
+"""
+Geração de páginas sintéticas de chamada no formato do Canaimé
+"""
+import random
+from pathlib import Path
+from typing import List
+
+# Diretório onde as páginas geradas são salvas
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+ALAS = ["ALA 01", "ALA 02", "ALA 03", "ALA 04", "ALA 05", "SEGURO", "TRIAGEM", "REMIÇÃO 01", "REMI??O 02"]
+PRENOMES = ["JOSÉ", "JOÃO", "ANTÔNIO", "FRANCISCO", "CARLOS", "PAULO", "PEDRO", "LUCAS", "MÁRCIO", "ANDRÉ"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "CONCEIÇÃO", "ARAÚJO", "GONÇALVES"]
+
+
+def gerar_entrada(codigo: int, rng: random.Random) -> str:
+    """
+    Gera o HTML de uma entrada da chamada
+
+    Args:
+        codigo: Código do preso
+        rng: Gerador de números aleatórios
+
+    Returns:
+        str: Linha de tabela com a foto e os dados do preso
+    """
+    nome = f"{rng.choice(PRENOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+    ala = rng.choice(ALAS)
+    cela = f"{rng.randint(1, 40):02d}"
+    return (
+        "<tr>\n"
+        f'<td width="80"><img src="../../fotos/presos/{codigo}_1.jpg" width="70"></td>\n'
+        f'<td class="titulobkSingCAPS">ID {codigo}\n'
+        f'<span class="titulo12bk">{nome}</span>\n'
+        f"MÃE: MARIA {rng.choice(SOBRENOMES)}\n"
+        f"ENTRADA: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/20{rng.randint(10, 24)}\n"
+        f"ALA: {ala} / {cela}</td>\n"
+        "</tr>\n"
+    )
+
+
+def gerar_pagina_chamada(total: int, seed: int = 42, codigo_inicial: int = 100000) -> str:
+    """
+    Gera uma página de chamada com fotos contendo `total` presos
+
+    Args:
+        total: Quantidade de presos na página
+        seed: Semente para gerar sempre os mesmos dados
+        codigo_inicial: Código do primeiro preso; os demais são consecutivos
+
+    Returns:
+        str: HTML completo da página
+    """
+    rng = random.Random(seed)
+    linhas: List[str] = [gerar_entrada(codigo_inicial + i, rng) for i in range(total)]
+    return (
+        "<html><head><meta charset=\"utf-8\"><title>Chamada</title></head><body>\n"
+        "<table>\n" + "".join(linhas) + "</table>\n</body></html>\n"
+    )
+
+
+def salvar_pagina_chamada(total: int, seed: int = 42) -> Path:
+    """
+    Salva a página de chamada sintética em disco, reaproveitando se já existir
+
+    Args:
+        total: Quantidade de presos na página
+        seed: Semente para gerar sempre os mesmos dados
+
+    Returns:
+        Path: Caminho do arquivo HTML gerado
+    """
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    caminho = FIXTURES_DIR / f"chamada_{total}_{seed}.html"
+    if not caminho.exists():
+        caminho.write_text(gerar_pagina_chamada(total, seed), encoding="utf-8")
+    return caminho
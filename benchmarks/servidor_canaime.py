@@ -0,0 +1,285 @@
+"""
+Servidor HTTP local que imita o Canaimé para benchmarks sem acesso à rede
+
+Reproduz o que o scraper usa do site real: a página de login com o formulário
+`usuario`/`senha`, o cookie de sessão definido após o login e a página de
+chamada `UND_ChamadaFOTOS_todos2.php`, gerada com `total` presos sintéticos por
+unidade. Sem sessão válida, a página de chamada redireciona para o login, como
+o site original. As fotos (`fotos/presos/<código>_1.jpg`) também exigem a sessão e
+respondem a requisições condicionais com 304.
+
+Uso:
+    python -m benchmarks.servidor_canaime --total 5000 --porta 8800
+
+Para apontar a API para o servidor, exporte as variáveis exibidas ao iniciar.
+"""
+import argparse
+import base64
+import secrets
+import threading
+import time
+import zlib
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixtures import gerar_pagina_chamada
+
+CAMINHO_LOGIN = "/sgp2rr/login/login_principal.php"
+CAMINHO_INICIO = "/sgp2rr/areas/inicio.php"
+CAMINHO_CHAMADA = "/sgp2rr/areas/impressoes/UND_ChamadaFOTOS_todos2.php"
+CAMINHO_FOTOS = "/sgp2rr/fotos/presos/"
+COOKIE_SESSAO = "PHPSESSID"
+
+# Credenciais aceitas por padrão (as mesmas do padrão de CANAIME_USER/CANAIME_PASSWORD)
+USUARIO_PADRAO = "usuario"
+SENHA_PADRAO = "senha"
+
+PAGINA_LOGIN = """<html><head><meta charset="utf-8"><title>SGP - Login</title></head><body>
+<form name="login" method="post" action="login_principal.php">
+{erro}<input type="hidden" name="acao" value="entrar">
+Usuário: <input type="text" name="usuario">
+Senha: <input type="password" name="senha">
+<input type="submit" value="Entrar">
+</form>
+</body></html>
+"""
+# Foto servida para todos os presos: JPEG cinza de 8x8 pixels
+FOTO_JPEG = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDABALDA4MChAODQ4SERATGCgaGBYWGDEjJR0oOjM9PDkzODdA"
+    "SFxOQERXRTc4UG1RV19iZ2hnPk1xeXBkeFxlZ2P/2wBDARESEhgVGC8aGi9jQjhCY2NjY2NjY2NjY2Nj"
+    "Y2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2P/wAARCAAIAAgDASIAAhEBAxEB/8QA"
+    "HwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIh"
+    "MUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVW"
+    "V1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXG"
+    "x8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQF"
+    "BgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAV"
+    "YnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOE"
+    "hYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq"
+    "8vP09fb3+Pn6/9oADAMBAAIRAxEAPwCOiiigD//Z"
+)
+
+PAGINA_INICIO = """<html><head><meta charset="utf-8"><title>SGP</title></head>
+<body>Bem-vindo ao SGP</body></html>
+"""
+
+
+class ServidorCanaime:
+    """Servidor local com login e páginas de chamada sintéticas"""
+
+    def __init__(
+        self,
+        total: int = 5000,
+        host: str = "127.0.0.1",
+        porta: int = 0,
+        latencia: float = 0.0,
+        usuario: str = USUARIO_PADRAO,
+        senha: str = SENHA_PADRAO,
+    ):
+        """
+        Inicializa o servidor, sem começar a atender
+
+        Args:
+            total: Quantidade de presos na página de chamada de cada unidade
+            host: Endereço de escuta
+            porta: Porta de escuta (0 escolhe uma porta livre)
+            latencia: Atraso, em segundos, acrescentado a cada resposta
+            usuario: Usuário aceito no login
+            senha: Senha aceita no login
+        """
+        self.total = total
+        self.latencia = latencia
+        self.usuario = usuario
+        self.senha = senha
+        self.sessoes: Set[str] = set()
+        self.logins = 0
+        # Fotos enviadas com status 200 (sem contar as respostas 304)
+        self.fotos_servidas = 0
+        self._paginas: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.httpd = ThreadingHTTPServer((host, porta), self._criar_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url_base(self) -> str:
+        """Endereço do servidor, com a porta efetivamente usada"""
+        host, porta = self.httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def variaveis_ambiente(self, unidades=("PAMC",)) -> Dict[str, str]:
+        """
+        Variáveis de configuração que apontam o scraper para este servidor
+
+        Args:
+            unidades: Unidades prisionais a extrair
+
+        Returns:
+            Dict[str, str]: Valores de CANAIME_URL, CANAIME_LOGIN_URL, CANAIME_FOTOS_URL,
+                credenciais e CANAIME_UNIDADES
+        """
+        return {
+            "CANAIME_URL": f"{self.url_base}{CAMINHO_CHAMADA}?id_und_prisional={unidades[0]}",
+            "CANAIME_LOGIN_URL": f"{self.url_base}{CAMINHO_LOGIN}",
+            "CANAIME_FOTOS_URL": f"{self.url_base}{CAMINHO_FOTOS}",
+            "CANAIME_USER": self.usuario,
+            "CANAIME_PASSWORD": self.senha,
+            "CANAIME_UNIDADES": ",".join(unidades),
+        }
+
+    def pagina_chamada(self, unidade: str) -> bytes:
+        """
+        Retorna a página de chamada da unidade, gerada uma única vez
+
+        Cada unidade tem presos e códigos próprios, sempre os mesmos entre execuções.
+
+        Args:
+            unidade: Identificador da unidade prisional
+
+        Returns:
+            bytes: HTML em UTF-8
+        """
+        with self._lock:
+            pagina = self._paginas.get(unidade)
+            if pagina is None:
+                semente = zlib.crc32(unidade.encode("utf-8"))
+                codigo_inicial = 100000 + len(self._paginas) * max(self.total, 1)
+                pagina = gerar_pagina_chamada(self.total, semente, codigo_inicial).encode("utf-8")
+                self._paginas[unidade] = pagina
+        return pagina
+
+    def iniciar(self) -> "ServidorCanaime":
+        """Começa a atender em uma thread em segundo plano"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        """Encerra o servidor e libera a porta"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "ServidorCanaime":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
+
+    def _criar_handler(self):
+        """Cria a classe de handler ligada a esta instância do servidor"""
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeçalhos e corpo são enviados separadamente; com Nagle, cada
+            # resposta esperaria o ACK atrasado do cliente (~40 ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                # Sem log por requisição: distorceria as medições
+                pass
+
+            def _sessao_valida(self) -> bool:
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                sessao = cookie.get(COOKIE_SESSAO)
+                return sessao is not None and sessao.value in servidor.sessoes
+
+            def _responder(
+                self,
+                codigo: int,
+                corpo: bytes = b"",
+                cabecalhos: Optional[Dict] = None,
+                tipo: str = "text/html; charset=utf-8",
+            ):
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                self.send_response(codigo)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(corpo)
+
+            def _redirecionar(self, caminho: str, cabecalhos: Optional[Dict] = None):
+                self._responder(302, cabecalhos={"Location": caminho, **(cabecalhos or {})})
+
+            def do_GET(self):
+                partes = urlsplit(self.path)
+
+                if partes.path == CAMINHO_LOGIN:
+                    self._responder(200, PAGINA_LOGIN.format(erro="").encode("utf-8"))
+                elif partes.path == CAMINHO_INICIO:
+                    if self._sessao_valida():
+                        self._responder(200, PAGINA_INICIO.encode("utf-8"))
+                    else:
+                        self._redirecionar(CAMINHO_LOGIN)
+                elif partes.path == CAMINHO_CHAMADA:
+                    if not self._sessao_valida():
+                        self._redirecionar(CAMINHO_LOGIN)
+                        return
+                    unidade = parse_qs(partes.query).get("id_und_prisional", ["PAMC"])[0]
+                    self._responder(200, servidor.pagina_chamada(unidade.upper()))
+                elif partes.path.startswith(CAMINHO_FOTOS) and partes.path.endswith(".jpg"):
+                    if not self._sessao_valida():
+                        self._redirecionar(CAMINHO_LOGIN)
+                        return
+                    etag = '"foto-' + partes.path.rsplit("/", 1)[-1] + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._responder(304, cabecalhos={"ETag": etag})
+                        return
+                    with servidor._lock:
+                        servidor.fotos_servidas += 1
+                    self._responder(200, FOTO_JPEG, {"ETag": etag}, tipo="image/jpeg")
+                else:
+                    self._responder(404, b"Not Found")
+
+            def do_POST(self):
+                if urlsplit(self.path).path != CAMINHO_LOGIN:
+                    self._responder(404, b"Not Found")
+                    return
+
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                campos = parse_qs(self.rfile.read(tamanho).decode("utf-8"))
+                usuario = campos.get("usuario", [""])[0]
+                senha = campos.get("senha", [""])[0]
+
+                if usuario != servidor.usuario or senha != servidor.senha:
+                    erro = "<p>Usuário ou senha inválidos</p>\n"
+                    self._responder(200, PAGINA_LOGIN.format(erro=erro).encode("utf-8"))
+                    return
+
+                sessao = secrets.token_hex(16)
+                with servidor._lock:
+                    servidor.sessoes.add(sessao)
+                    servidor.logins += 1
+                self._redirecionar(
+                    CAMINHO_INICIO,
+                    {"Set-Cookie": f"{COOKIE_SESSAO}={sessao}; Path=/; HttpOnly"},
+                )
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=5000, help="Presos por unidade")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta")
+    parser.add_argument("--porta", type=int, default=8800, help="Porta de escuta")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Atraso por resposta, em ms")
+    parser.add_argument("--unidades", default="PAMC", help="Unidades separadas por vírgula")
+    args = parser.parse_args()
+
+    servidor = ServidorCanaime(args.total, args.host, args.porta, args.latencia / 1000)
+    print(f"Canaimé simulado em {servidor.url_base} ({args.total} presos por unidade)")
+    for nome, valor in servidor.variaveis_ambiente(args.unidades.split(",")).items():
+        print(f"{nome}={valor}")
+    try:
+        servidor.httpd.serve_forever()
+    except KeyboardInterrupt:
+        servidor.httpd.server_close()
@@ -0,0 +1,113 @@
+"""
+Executa os benchmarks offline e compara com um resultado de referência
+
+Roda `bench_scraper` e `bench_api` contra o Canaimé simulado, grava o resultado
+em JSON e, com --comparar, termina com código 1 se alguma métrica piorar além
+da tolerância. Pensado para CI sem acesso à rede: o backend playwright só é
+medido quando pedido, pois exige o Chromium instalado.
+
+Uso:
+    python -m benchmarks.suite --json atual.json
+    python -m benchmarks.suite --json atual.json --comparar referencia.json --tolerancia 0.3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from benchmarks import bench_api, bench_scraper
+
+
+def metricas(resultado: Dict) -> Iterator[Tuple[str, float, bool]]:
+    """
+    Lista as métricas comparáveis de um resultado da suíte
+
+    Yields:
+        Tuple: Nome da métrica, valor e se valores maiores são melhores
+    """
+    for backend, resumo in resultado.get("scraper", {}).items():
+        for fase in (*bench_scraper.FASES, "total"):
+            yield f"scraper.{backend}.{fase}.mediana_ms", resumo[fase]["mediana_ms"], False
+
+    for nivel in resultado.get("api", {}).get("niveis", []):
+        prefixo = f"api.c{nivel['concorrencia']}"
+        yield f"{prefixo}.req_s", nivel["req_s"], True
+        yield f"{prefixo}.p50_ms", nivel["p50_ms"], False
+        yield f"{prefixo}.p95_ms", nivel["p95_ms"], False
+
+
+def comparar(atual: Dict, referencia: Dict, tolerancia: float) -> List[str]:
+    """
+    Compara as métricas presentes nos dois resultados
+
+    Args:
+        atual: Resultado desta execução
+        referencia: Resultado de referência
+        tolerancia: Piora relativa aceita (0.25 = 25%)
+
+    Returns:
+        List[str]: Descrição das métricas que pioraram além da tolerância
+    """
+    valores_referencia = {nome: valor for nome, valor, _ in metricas(referencia)}
+    regressoes = []
+
+    for nome, valor, maior_melhor in metricas(atual):
+        anterior = valores_referencia.get(nome)
+        if not anterior:
+            continue
+        variacao = (valor - anterior) / anterior
+        piora = -variacao if maior_melhor else variacao
+        marcador = "REGRESSÃO" if piora > tolerancia else ""
+        print(f"  {nome:<36} {anterior:>10.2f} -> {valor:>10.2f} ({variacao:+.0%}) {marcador}")
+        if marcador:
+            regressoes.append(f"{nome}: {anterior:.2f} -> {valor:.2f} ({variacao:+.0%})")
+
+    return regressoes
+
+
+async def executar(args: argparse.Namespace) -> Dict:
+    """Executa os dois benchmarks com os parâmetros da linha de comando"""
+    unidades = [u.strip().upper() for u in args.unidades.split(",") if u.strip()]
+
+    scraper = await bench_scraper.executar(args.total, unidades, args.repeticoes, args.backend)
+    bench_scraper.exibir(scraper)
+    print()
+
+    api = await bench_api.executar(args.total, unidades, args.concorrencia, args.duracao)
+    bench_api.exibir(api)
+
+    return {"parametros": {"total": args.total, "unidades": unidades}, "scraper": scraper, "api": api}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=5000, help="Presos por unidade")
+    parser.add_argument("--unidades", default="PAMC", help="Unidades separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Sessões medidas por backend")
+    parser.add_argument("--backend", nargs="+", choices=bench_scraper.BACKENDS, default=["http"])
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 10, 50], help="Níveis de concorrência")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de medição por nível")
+    parser.add_argument("--json", help="Arquivo onde o resultado é gravado em JSON")
+    parser.add_argument("--comparar", help="Resultado JSON de referência")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa aceita")
+    args = parser.parse_args()
+
+    logging.getLogger("canaime_scraper").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    resultado = asyncio.run(executar(args))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            referencia = json.load(arquivo)
+        print(f"\nComparação com {args.comparar} (tolerância {args.tolerancia:.0%}):")
+        regressoes = comparar(resultado, referencia, args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} métrica(s) pioraram além da tolerância")
+            sys.exit(1)
+        print("Nenhuma regressão")
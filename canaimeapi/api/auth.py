@@ -1,44 +1,331 @@
 """
 Módulo de autenticação para a API do Canaimé
+
+Aceita chaves de API, no cabeçalho X-API-Key ou em Authorization: Bearer, e o
+usuário HTTP Basic de API_USERNAME/API_PASSWORD. Cada chave tem o formato
+<nome>.<segredo>, e API_KEYS guarda apenas o hash PBKDF2 do segredo. Verificar o
+hash é lento de propósito; por isso as chaves válidas ficam em um cache em
+memória, indexado pelo SHA-256 da chave, e o hash só é recalculado quando a chave
+sai do cache. Segredos errados não entram no cache e consomem o orçamento de
+falhas do nome da chave, verificado antes do hash. Toda requisição autenticada
+passa pelo limite do cliente (canaimeapi.api.limites).
+
+Para gerar uma chave: python -m canaimeapi.api.auth <nome>
 """
+import argparse
+import hashlib
 import os
 import secrets
-from typing import Optional
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
 
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi.security import (
+    APIKeyHeader,
+    HTTPAuthorizationCredentials,
+    HTTPBasic,
+    HTTPBasicCredentials,
+    HTTPBearer,
+)
+
+from canaimeapi.api.limites import limitador
 
-# Configurações de autenticação
+# Configurações de autenticação (API_PASSWORD vazio desativa o HTTP Basic)
 API_USERNAME = os.getenv("API_USERNAME", "admin")
 API_PASSWORD = os.getenv("API_PASSWORD", "admin")
+# Chaves de API: entradas nome:hash[:requisições por minuto], separadas por vírgula
+API_KEYS = os.getenv("API_KEYS", "")
+# Clientes (nomes de chave ou usuário Basic) com acesso às rotas administrativas
+API_ADMINS = {nome.strip() for nome in os.getenv("API_ADMINS", API_USERNAME).split(",") if nome.strip()}
+
+# Chaves verificadas mantidas em memória
+CHAVES_EM_CACHE = 1024
+# Iterações do PBKDF2 nas chaves geradas; cada hash guarda as próprias iterações
+ITERACOES_PADRAO = 600_000
+ALGORITMO = "pbkdf2_sha256"
+
+# Sistema de autenticação básica HTTP e por chave de API
+security = HTTPBasic(auto_error=False)
+cabecalho_chave = APIKeyHeader(name="X-API-Key", auto_error=False)
+portador = HTTPBearer(auto_error=False)
+
+
+def gerar_hash(segredo: str, iteracoes: int = ITERACOES_PADRAO) -> str:
+    """
+    Calcula o hash guardado em API_KEYS para o segredo de uma chave
+
+    Args:
+        segredo: Parte da chave após o primeiro ponto
+        iteracoes: Iterações do PBKDF2-SHA256
+
+    Returns:
+        str: Hash no formato pbkdf2_sha256$<iterações>$<sal>$<hash>, em hexadecimal
+    """
+    sal = secrets.token_hex(16)
+    derivado = hashlib.pbkdf2_hmac("sha256", segredo.encode("utf-8"), bytes.fromhex(sal), iteracoes)
+    return f"{ALGORITMO}${iteracoes}${sal}${derivado.hex()}"
+
+
+def conferir_hash(segredo: str, hash_guardado: str) -> bool:
+    """
+    Confere um segredo com o hash guardado, em tempo constante
+
+    Args:
+        segredo: Segredo apresentado
+        hash_guardado: Hash gerado por `gerar_hash`
+
+    Returns:
+        bool: True se o segredo corresponde ao hash
+    """
+    try:
+        algoritmo, iteracoes, sal, esperado = hash_guardado.split("$")
+        if algoritmo != ALGORITMO:
+            return False
+        derivado = hashlib.pbkdf2_hmac(
+            "sha256", segredo.encode("utf-8"), bytes.fromhex(sal), int(iteracoes)
+        )
+    except ValueError:
+        return False
+    return secrets.compare_digest(derivado.hex(), esperado)
+
+
+@dataclass(frozen=True)
+class ChaveApi:
+    """Chave de API configurada em API_KEYS"""
+
+    nome: str
+    hash: str
+    # Requisições por minuto próprias da chave (padrão: API_LIMITE_POR_MINUTO)
+    por_minuto: Optional[float] = None
+
+
+def carregar_chaves(configuracao: str) -> Dict[str, ChaveApi]:
+    """
+    Lê as chaves de API configuradas
+
+    Args:
+        configuracao: Entradas nome:hash[:requisições por minuto], separadas por vírgula
+
+    Returns:
+        Dict[str, ChaveApi]: Chaves por nome
+
+    Raises:
+        ValueError: Se alguma entrada estiver malformada
+    """
+    chaves = {}
+    for entrada in configuracao.split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        partes = entrada.split(":")
+        if len(partes) not in (2, 3) or not partes[0] or "." in partes[0]:
+            raise ValueError(f"Entrada inválida em API_KEYS: {partes[0]!r}")
+        por_minuto = float(partes[2]) if len(partes) == 3 else None
+        chaves[partes[0]] = ChaveApi(partes[0], partes[1], por_minuto)
+    return chaves
+
+
+class VerificadorChaves:
+    """Verifica chaves de API, guardando em cache o resultado de cada chave"""
+
+    def __init__(self, chaves: Dict[str, ChaveApi], tamanho_cache: int = CHAVES_EM_CACHE):
+        """
+        Inicializa o verificador
+
+        Args:
+            chaves: Chaves configuradas, por nome
+            tamanho_cache: Quantidade de chaves mantidas no cache (as menos usadas saem)
+        """
+        self.chaves = chaves
+        self.tamanho_cache = tamanho_cache
+        # SHA-256 das chaves válidas -> nome do cliente
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._trava = threading.Lock()
+
+    def verificar(self, chave: str) -> Optional[str]:
+        """
+        Identifica o cliente de uma chave
+
+        Chaves com nome desconhecido são recusadas sem calcular o hash. As demais
+        são conferidas com o PBKDF2 apenas na primeira vez e, se válidas, ficam
+        no cache. Segredos errados não entram no cache, para não tirar dele as
+        chaves válidas, e cada verificação fora do cache reserva antes uma
+        tentativa do orçamento de falhas do nome.
+
+        Args:
+            chave: Chave apresentada (<nome>.<segredo>)
+
+        Returns:
+            Optional[str]: Nome do cliente, ou None se a chave for inválida
+
+        Raises:
+            HTTPException: 429 se o orçamento de falhas do nome estiver esgotado
+        """
+        nome, _, segredo = chave.partition(".")
+        configurada = self.chaves.get(nome)
+        if configurada is None or not segredo:
+            return None
+
+        resumo = hashlib.sha256(chave.encode("utf-8")).digest()
+        with self._trava:
+            cliente = self._cache.get(resumo)
+            if cliente is not None:
+                self._cache.move_to_end(resumo)
+                return cliente
+
+        limitador.reservar_verificacao(nome)
+        if not conferir_hash(segredo, configurada.hash):
+            limitador.registrar_recusa(nome)
+            return None
+
+        limitador.devolver_verificacao(nome)
+        with self._trava:
+            self._cache[resumo] = nome
+            while len(self._cache) > self.tamanho_cache:
+                self._cache.popitem(last=False)
+        return nome
+
 
-# Sistema de autenticação básica HTTP
-security = HTTPBasic()
+def _configurar_limites(chaves: Dict[str, ChaveApi]) -> None:
+    """Aplica ao limitador as taxas próprias das chaves que as definem"""
+    for chave in chaves.values():
+        if chave.por_minuto is not None:
+            limitador.definir_limite(chave.nome, chave.por_minuto)
 
 
-def verificar_credenciais(
-    credentials: HTTPBasicCredentials = Depends(security),
+# Instância única do verificador, com as chaves de API_KEYS
+verificador_chaves = VerificadorChaves(carregar_chaves(API_KEYS))
+_configurar_limites(verificador_chaves.chaves)
+
+
+def _nao_autorizado(detalhe: str) -> HTTPException:
+    """Resposta 401 que indica os esquemas aceitos"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detalhe,
+        headers={"WWW-Authenticate": 'Basic, Bearer, ApiKey header="X-API-Key"'},
+    )
+
+
+def autenticar(
+    credentials: Optional[HTTPBasicCredentials] = Depends(security),
+    chave: Optional[str] = Depends(cabecalho_chave),
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(portador),
 ) -> str:
     """
-    Verifica as credenciais de autenticação HTTP Basic
-    
+    Identifica o cliente pela chave de API ou pelo HTTP Basic, sem aplicar o limite
+
     Args:
         credentials: Credenciais HTTP Basic fornecidas na requisição
-        
+        chave: Chave de API do cabeçalho X-API-Key
+        bearer: Chave de API do cabeçalho Authorization: Bearer
+
+    Returns:
+        str: Nome do cliente (da chave de API) ou do usuário autenticado
+
+    Raises:
+        HTTPException: 401 se as credenciais forem inválidas
+    """
+    if chave is None and bearer is not None:
+        chave = bearer.credentials
+
+    if chave is not None:
+        cliente = verificador_chaves.verificar(chave)
+        if cliente is None:
+            raise _nao_autorizado("Chave de API inválida")
+        return cliente
+
+    if credentials is not None and API_PASSWORD:
+        is_username_ok = secrets.compare_digest(credentials.username, API_USERNAME)
+        is_password_ok = secrets.compare_digest(credentials.password, API_PASSWORD)
+        if is_username_ok and is_password_ok:
+            return credentials.username
+
+    raise _nao_autorizado("Credenciais inválidas")
+
+
+def verificar_credenciais(cliente: str = Depends(autenticar)) -> str:
+    """
+    Autentica o cliente e cobra uma ficha do seu limite de requisições
+
+    Args:
+        cliente: Nome do cliente autenticado (injetado pela dependência)
+
     Returns:
-        str: Nome de usuário autenticado
-        
+        str: Nome do cliente
+
     Raises:
-        HTTPException: Se as credenciais forem inválidas
+        HTTPException: 401 se as credenciais forem inválidas, 429 se o cliente
+            exceder o limite de requisições
+    """
+    limitador.cobrar(cliente)
+    return cliente
+
+
+def credenciais_com_custo(custo: float) -> Callable[..., str]:
     """
-    is_username_ok = secrets.compare_digest(credentials.username, API_USERNAME)
-    is_password_ok = secrets.compare_digest(credentials.password, API_PASSWORD)
-    
-    if not (is_username_ok and is_password_ok):
+    Cria uma dependência como `verificar_credenciais` para rotas mais caras
+
+    Args:
+        custo: Fichas cobradas do cliente a cada requisição
+
+    Returns:
+        Callable[..., str]: Dependência que retorna o nome do cliente
+    """
+
+    def verificar(cliente: str = Depends(autenticar)) -> str:
+        limitador.cobrar(cliente, custo)
+        return cliente
+
+    return verificar
+
+
+def verificar_administrador(cliente: str = Depends(verificar_credenciais)) -> str:
+    """
+    Autentica o cliente e exige que ele esteja em API_ADMINS
+
+    Args:
+        cliente: Nome do cliente autenticado (injetado pela dependência)
+
+    Returns:
+        str: Nome do cliente
+
+    Raises:
+        HTTPException: 403 se o cliente não for administrador
+    """
+    if cliente not in API_ADMINS:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Credenciais inválidas",
-            headers={"WWW-Authenticate": "Basic"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Rota restrita aos administradores (API_ADMINS)",
         )
-    
-    return credentials.username 
\ No newline at end of file
+    return cliente
+
+
+def main() -> None:
+    """Gera uma chave de API e a entrada correspondente de API_KEYS"""
+    parser = argparse.ArgumentParser(description="Gera uma chave de API para a API do Canaimé")
+    parser.add_argument("nome", help="Nome do cliente (sem ponto, vírgula ou dois-pontos)")
+    parser.add_argument(
+        "--por-minuto",
+        type=float,
+        help="Requisições por minuto da chave (padrão: API_LIMITE_POR_MINUTO)",
+    )
+    parser.add_argument("--iteracoes", type=int, default=ITERACOES_PADRAO, help="Iterações do PBKDF2")
+    args = parser.parse_args()
+
+    if any(caractere in args.nome for caractere in ".,:") or not args.nome:
+        parser.error("o nome não pode ser vazio nem conter ponto, vírgula ou dois-pontos")
+
+    segredo = secrets.token_urlsafe(32)
+    entrada = f"{args.nome}:{gerar_hash(segredo, args.iteracoes)}"
+    if args.por_minuto is not None:
+        entrada += f":{args.por_minuto:g}"
+
+    print(f"Chave (entregue ao cliente; não é guardada): {args.nome}.{segredo}")
+    print(f"Entrada de API_KEYS: {entrada}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Cache de respostas serializadas e pré-comprimidas, com suporte a ETag e 304
+"""
+import gzip
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import brotli
+from fastapi import Request, Response, status
+
+logger = logging.getLogger("canaime_api")
+
+
+def _aceita_codificacao(accept_encoding: str, codificacao: str) -> bool:
+    """
+    Verifica se o cabeçalho Accept-Encoding aceita a codificação informada
+
+    Args:
+        accept_encoding: Valor do cabeçalho Accept-Encoding
+        codificacao: Codificação procurada (por exemplo "br" ou "gzip")
+
+    Returns:
+        bool: True se a codificação foi aceita com q maior que zero
+    """
+    for item in accept_encoding.lower().split(","):
+        nome, _, parametros = item.strip().partition(";")
+        if nome.strip() not in (codificacao, "*"):
+            continue
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                return float(parametros[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_corresponde(if_none_match: str, etag: str) -> bool:
+    """
+    Compara um ETag com o cabeçalho If-None-Match (comparação fraca da RFC 9110)
+
+    Args:
+        if_none_match: Valor do cabeçalho If-None-Match
+        etag: ETag atual do recurso, entre aspas
+
+    Returns:
+        bool: True se o cabeçalho é "*" ou lista o ETag, forte ou fraco (W/)
+    """
+    etags = [item.strip().removeprefix("W/") for item in if_none_match.split(",")]
+    return "*" in etags or etag.removeprefix("W/") in etags
+
+
+@dataclass(frozen=True)
+class RespostaSerializada:
+    """Corpo de uma resposta serializado uma única vez, com variantes comprimidas"""
+
+    corpo: bytes
+    corpo_gzip: Optional[bytes]
+    corpo_br: Optional[bytes]
+    etag: str
+    ultima_modificacao: datetime
+    media_type: str = "application/json"
+
+    @classmethod
+    def criar(
+        cls,
+        corpo: bytes,
+        ultima_modificacao: datetime,
+        media_type: str = "application/json",
+        comprimir: bool = True,
+    ) -> "RespostaSerializada":
+        """
+        Comprime o corpo e calcula o ETag forte a partir do conteúdo
+
+        Args:
+            corpo: Corpo da resposta já serializado
+            ultima_modificacao: Instante (UTC) em que os dados foram atualizados
+            media_type: Tipo de conteúdo da resposta
+            comprimir: Gera as variantes gzip e brotli; False para corpos que já
+                são comprimidos pelo próprio formato
+
+        Returns:
+            RespostaSerializada: Resposta pronta para ser enviada
+        """
+        return cls(
+            corpo=corpo,
+            corpo_gzip=gzip.compress(corpo, compresslevel=6) if comprimir else None,
+            corpo_br=brotli.compress(corpo, quality=9) if comprimir else None,
+            etag='"' + hashlib.sha256(corpo).hexdigest()[:32] + '"',
+            ultima_modificacao=ultima_modificacao.replace(microsecond=0),
+            media_type=media_type,
+        )
+
+    def _nao_modificada(self, request: Request) -> bool:
+        """Avalia os cabeçalhos If-None-Match e If-Modified-Since da requisição"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_corresponde(if_none_match, self.etag)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return self.ultima_modificacao <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+
+        return False
+
+    def responder(self, request: Request) -> Response:
+        """
+        Monta a resposta HTTP escolhendo a variante comprimida aceita pelo cliente
+
+        Args:
+            request: Requisição recebida
+
+        Returns:
+            Response: 304 se o cliente já possui esta versão, senão o corpo completo
+        """
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.ultima_modificacao, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if self._nao_modificada(request):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        accept_encoding = request.headers.get("accept-encoding", "")
+        if self.corpo_br is not None and _aceita_codificacao(accept_encoding, "br"):
+            headers["Content-Encoding"] = "br"
+            corpo = self.corpo_br
+        elif self.corpo_gzip is not None and _aceita_codificacao(accept_encoding, "gzip"):
+            headers["Content-Encoding"] = "gzip"
+            corpo = self.corpo_gzip
+        else:
+            corpo = self.corpo
+
+        return Response(content=corpo, media_type=self.media_type, headers=headers)
+
+
+class CacheRespostas:
+    """
+    Guarda as respostas serializadas das versões mais recentes do snapshot
+
+    As respostas são indexadas por (versão, chave). Além da versão mais nova,
+    fica a anterior: a resposta de uma versão nova é gerada antes de ela ser
+    publicada, enquanto as requisições ainda leem a anterior. Pedidos de versões
+    mais antigas (uma requisição lenta, ou uma thread que carregou um snapshot
+    já superado) são atendidos sem entrar no cache e nunca descartam as
+    versões mais novas. Pode ser usado ao mesmo tempo pelo loop de eventos e
+    por threads; a serialização acontece fora da trava.
+    """
+
+    # Versões mantidas no cache: a mais nova e a que ela está substituindo
+    VERSOES_MANTIDAS = 2
+
+    def __init__(self):
+        """Inicializa o cache vazio"""
+        self._itens: Dict[Tuple[int, str], RespostaSerializada] = {}
+        self._versoes: List[int] = []
+        self._trava = threading.Lock()
+
+    def consultar(self, chave: str, versao: int) -> Optional[RespostaSerializada]:
+        """
+        Retorna a resposta já serializada, sem gerá-la
+
+        Args:
+            chave: Identificador da resposta
+            versao: Versão do snapshot
+
+        Returns:
+            Optional[RespostaSerializada]: Resposta em cache, ou None se ainda não gerada
+        """
+        with self._trava:
+            return self._itens.get((versao, chave))
+
+    def obter(
+        self,
+        chave: str,
+        versao: int,
+        gerar: Callable[[], bytes],
+        ultima_modificacao: datetime,
+        media_type: str = "application/json",
+        comprimir: bool = True,
+    ) -> RespostaSerializada:
+        """
+        Retorna a resposta em cache, serializando-a apenas uma vez por versão
+
+        Args:
+            chave: Identificador da resposta (por exemplo, rota e filtros)
+            versao: Versão do snapshot; uma versão nova descarta as mais antigas
+            gerar: Função que serializa o corpo da resposta
+            ultima_modificacao: Instante (UTC) em que o snapshot foi instalado
+            media_type: Tipo de conteúdo da resposta
+            comprimir: Gera as variantes gzip e brotli do corpo
+
+        Returns:
+            RespostaSerializada: Resposta pronta para ser enviada
+        """
+        item = self.consultar(chave, versao)
+        if item is not None:
+            return item
+
+        item = RespostaSerializada.criar(gerar(), ultima_modificacao, media_type, comprimir)
+        with self._trava:
+            if not self._guardar_versao(versao):
+                logger.debug(f"Resposta '{chave}' da versão {versao}, já superada, não guardada")
+                return item
+            # Outra thread pode ter gerado a mesma resposta enquanto esta serializava
+            item = self._itens.setdefault((versao, chave), item)
+
+        if comprimir:
+            logger.info(
+                f"Resposta '{chave}' da versão {versao} serializada: "
+                f"{len(item.corpo)} bytes, gzip {len(item.corpo_gzip)}, br {len(item.corpo_br)}"
+            )
+        else:
+            logger.info(f"Resposta '{chave}' da versão {versao} serializada: {len(item.corpo)} bytes")
+        return item
+
+    def _guardar_versao(self, versao: int) -> bool:
+        """
+        Registra a versão entre as mantidas, descartando as que ficaram antigas
+        (chamar com a trava)
+
+        Returns:
+            bool: False se a versão é mais antiga que todas as mantidas
+        """
+        if versao in self._versoes:
+            return True
+        if len(self._versoes) >= self.VERSOES_MANTIDAS and versao < self._versoes[0]:
+            return False
+
+        self._versoes = sorted([*self._versoes, versao])[-self.VERSOES_MANTIDAS :]
+        self._itens = {
+            (versao_item, chave): item
+            for (versao_item, chave), item in self._itens.items()
+            if versao_item in self._versoes
+        }
+        return versao in self._versoes
+
+
+# Instância única do cache para ser usada em toda a aplicação
+cache_respostas = CacheRespostas()
@@ -0,0 +1,268 @@
+"""
+Envio das alterações de cada novo snapshot aos clientes por Server-Sent Events
+
+Cada versão instalada é serializada uma única vez em um quadro SSE, compartilhado
+por todos os clientes conectados. Cada cliente tem uma fila limitada: quem não
+consome a tempo é desconectado em vez de atrasar os demais, e ao reconectar
+(com o cabeçalho Last-Event-ID, enviado automaticamente pelo EventSource)
+recebe as versões perdidas a partir do histórico de alterações.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+from typing import AsyncIterator, List, Optional, Set
+
+from canaimeapi.scraper.diff import DiffSnapshot
+from canaimeapi.scraper.repositorio import RepositorioSnapshots, repositorio
+
+logger = logging.getLogger("canaime_api")
+
+# Quadros pendentes por cliente antes de desconectá-lo
+API_EVENTOS_FILA = int(os.getenv("API_EVENTOS_FILA", "16"))
+# Clientes conectados ao mesmo tempo em cada worker
+API_EVENTOS_MAX_CLIENTES = int(os.getenv("API_EVENTOS_MAX_CLIENTES", "1000"))
+# Intervalo dos comentários que mantêm a conexão aberta em proxies
+API_EVENTOS_HEARTBEAT_SEGUNDOS = float(os.getenv("API_EVENTOS_HEARTBEAT_SEGUNDOS", "15"))
+# Tempo máximo de cada conexão; o cliente reconecta sem perder versões. Também limita
+# quanto o uvicorn aguarda as conexões abertas ao encerrar
+API_EVENTOS_DURACAO_MAX_SEGUNDOS = float(os.getenv("API_EVENTOS_DURACAO_MAX_SEGUNDOS", "600"))
+
+# Tempo de espera, em milissegundos, sugerido ao EventSource antes de reconectar
+RECONEXAO_MS = 5000
+HEARTBEAT = b": ping\n\n"
+# Marca o fim da conexão na fila de um cliente
+_FIM = b""
+
+
+def _versao_do_quadro(quadro: bytes) -> int:
+    """Lê a versão da linha "id:" que inicia os quadros de versão"""
+    return int(quadro.split(b"\n", 1)[0][len(b"id: "):])
+
+
+def _quadro(evento: str, dados: dict, id: Optional[int] = None) -> bytes:
+    """
+    Serializa um evento no formato text/event-stream
+
+    Args:
+        evento: Nome do evento
+        dados: Conteúdo, enviado como JSON em uma única linha
+        id: Identificador do evento (a versão do snapshot)
+
+    Returns:
+        bytes: Quadro SSE terminado por linha em branco
+    """
+    linhas = [] if id is None else [f"id: {id}"]
+    linhas.append(f"event: {evento}")
+    linhas.append("data: " + json.dumps(dados, ensure_ascii=False, separators=(",", ":")))
+    return ("\n".join(linhas) + "\n\n").encode("utf-8")
+
+
+def _quadro_diff(diff: DiffSnapshot) -> bytes:
+    """Quadro "versao" com as alterações por Código de uma versão"""
+    return _quadro(
+        "versao",
+        {
+            "versao": diff.versao,
+            "versao_anterior": diff.versao_anterior,
+            "gerado_em": diff.gerado_em,
+            "resumo": diff.resumo,
+            "alteracoes": diff.alteracoes,
+        },
+        id=diff.versao,
+    )
+
+
+class DifusorEventos:
+    """Distribui um quadro por versão do snapshot a todos os clientes conectados"""
+
+    def __init__(
+        self,
+        repositorio: RepositorioSnapshots,
+        tamanho_fila: int = API_EVENTOS_FILA,
+        max_clientes: int = API_EVENTOS_MAX_CLIENTES,
+    ):
+        """
+        Inicializa o difusor e o registra para ser chamado a cada snapshot instalado
+
+        Args:
+            repositorio: Repositório cujas versões são enviadas
+            tamanho_fila: Quadros pendentes por cliente antes de desconectá-lo
+            max_clientes: Clientes conectados ao mesmo tempo
+        """
+        self.repositorio = repositorio
+        self.tamanho_fila = tamanho_fila
+        self.max_clientes = max_clientes
+        self._filas: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        repositorio.registrar_ao_instalar(self.publicar)
+
+    @property
+    def clientes(self) -> int:
+        """Quantidade de clientes conectados"""
+        return len(self._filas)
+
+    @property
+    def lotado(self) -> bool:
+        """Indica se o limite de clientes conectados foi atingido"""
+        return len(self._filas) >= self.max_clientes
+
+    def _quadro_versao_atual(self) -> bytes:
+        """Quadro da versão atual, com as alterações por Código quando disponíveis"""
+        versao = self.repositorio.versao
+        diff = self.repositorio.alteracoes.ultimo
+        if diff is None or diff.versao != versao:
+            # Primeira versão ou histórico descartado: o cliente baixa /dados
+            return _quadro("reinicio", {"versao": versao}, id=versao)
+        return _quadro_diff(diff)
+
+    def publicar(self) -> None:
+        """
+        Envia a versão recém-instalada aos clientes conectados
+
+        Chamado pelo repositório, possivelmente fora do loop de eventos (snapshots
+        carregados do armazenamento em outra thread).
+        """
+        loop = self._loop
+        if loop is None or not self._filas or loop.is_closed():
+            return
+
+        quadro = self._quadro_versao_atual()
+        try:
+            em_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            em_loop = False
+
+        if em_loop:
+            self._difundir(quadro)
+        else:
+            loop.call_soon_threadsafe(self._difundir, quadro)
+
+    def _difundir(self, quadro: bytes) -> None:
+        """Coloca o quadro na fila de cada cliente, desconectando os que estão atrasados"""
+        for fila in list(self._filas):
+            try:
+                fila.put_nowait(quadro)
+            except asyncio.QueueFull:
+                logger.warning("Cliente de eventos atrasado desconectado; ele retoma pelo Last-Event-ID")
+                self._desconectar(fila)
+
+    def _desconectar(self, fila: asyncio.Queue) -> None:
+        """Descarta os quadros pendentes do cliente e encerra sua conexão"""
+        self._filas.discard(fila)
+        while not fila.empty():
+            fila.get_nowait()
+        fila.put_nowait(_FIM)
+
+    def encerrar(self) -> None:
+        """Encerra todas as conexões; pode ser chamado fora do loop de eventos"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._desconectar_todos)
+
+    def _desconectar_todos(self) -> None:
+        for fila in list(self._filas):
+            self._desconectar(fila)
+
+    def encerrar_ao_receber_sinal(self) -> None:
+        """
+        Encerra as conexões quando o processo recebe SIGINT ou SIGTERM
+
+        O uvicorn aguarda as respostas em andamento antes do evento de shutdown,
+        e os fluxos de eventos não terminam sozinhos. O tratador do uvicorn
+        continua sendo chamado em seguida. Deve ser chamado na thread principal.
+        """
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            anterior = signal.getsignal(sinal)
+            if not callable(anterior):
+                continue
+
+            def tratador(signum, frame, anterior=anterior):
+                self.encerrar()
+                anterior(signum, frame)
+
+            signal.signal(sinal, tratador)
+
+    def _quadros_desde(self, versao: int) -> List[bytes]:
+        """
+        Quadros das versões posteriores à última recebida pelo cliente
+
+        Args:
+            versao: Última versão recebida pelo cliente
+
+        Returns:
+            List[bytes]: Um quadro por versão, ou um único "reinicio" se o histórico
+                não cobre a versão informada
+        """
+        atual = self.repositorio.versao
+        if versao == atual:
+            return []
+
+        versao_minima = self.repositorio.alteracoes.versao_minima
+        if versao > atual or versao_minima is None or versao < versao_minima:
+            return [_quadro("reinicio", {"versao": atual}, id=atual)]
+
+        return [_quadro_diff(diff) for diff in self.repositorio.alteracoes.desde(versao)]
+
+    async def assinar(
+        self,
+        desde: Optional[int] = None,
+        heartbeat: float = API_EVENTOS_HEARTBEAT_SEGUNDOS,
+        duracao_max: float = API_EVENTOS_DURACAO_MAX_SEGUNDOS,
+    ) -> AsyncIterator[bytes]:
+        """
+        Gera o fluxo text/event-stream de um cliente
+
+        O primeiro quadro informa a versão atual ("conectado"). Com `desde`, as
+        versões perdidas desde então são enviadas antes das novas.
+
+        Args:
+            desde: Última versão recebida pelo cliente (Last-Event-ID)
+            heartbeat: Segundos sem eventos até enviar um comentário de manutenção
+            duracao_max: Segundos até encerrar a conexão para o cliente reconectar
+
+        Yields:
+            bytes: Quadros SSE
+        """
+        self._loop = asyncio.get_running_loop()
+        fila: asyncio.Queue = asyncio.Queue(maxsize=self.tamanho_fila)
+        # Registrada antes de ler o histórico, para não perder versões instaladas entre os dois
+        self._filas.add(fila)
+        try:
+            ultima_enviada = self.repositorio.versao
+            # Com `desde`, o id só avança com os quadros do histórico: se a conexão cair
+            # antes deles, o cliente reconecta a partir da mesma versão
+            yield f"retry: {RECONEXAO_MS}\n".encode() + _quadro(
+                "conectado", {"versao": ultima_enviada}, id=ultima_enviada if desde is None else None
+            )
+            if desde is not None:
+                for quadro in self._quadros_desde(desde):
+                    ultima_enviada = max(ultima_enviada, _versao_do_quadro(quadro))
+                    yield quadro
+
+            fim = self._loop.time() + duracao_max
+            while True:
+                restante = fim - self._loop.time()
+                if restante <= 0:
+                    return
+                try:
+                    quadro = await asyncio.wait_for(fila.get(), min(heartbeat, restante))
+                except TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                if quadro == _FIM:
+                    return
+                # Versões já enviadas pelo histórico também podem estar na fila
+                versao_quadro = _versao_do_quadro(quadro)
+                if versao_quadro <= ultima_enviada:
+                    continue
+                ultima_enviada = versao_quadro
+                yield quadro
+        finally:
+            self._filas.discard(fila)
+
+
+# Instância única do difusor, alimentada pelo repositório compartilhado
+difusor = DifusorEventos(repositorio)
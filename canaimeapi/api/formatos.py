@@ -0,0 +1,179 @@
+"""
+Formatos de exportação de /dados e escolha do formato e das colunas de cada requisição
+"""
+import importlib.util
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Query, Request, status
+
+from canaimeapi.scraper.tabela import COLUNAS, TabelaPresos
+
+Campos = Optional[Tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class Formato:
+    """Formato de exportação dos registros de um snapshot"""
+
+    nome: str
+    media_type: str
+    serializar: Callable[[TabelaPresos, Campos], bytes]
+    # Formatos com compressão própria não recebem as variantes gzip e brotli
+    comprimir: bool = True
+    # Pacote opcional exigido pelo formato
+    requer: Optional[str] = None
+
+
+def _texto(metodo: Callable[[TabelaPresos, Campos], str]) -> Callable[..., bytes]:
+    """Adapta um método de TabelaPresos que gera texto para gerar bytes em UTF-8"""
+    return lambda tabela, campos: metodo(tabela, campos).encode("utf-8")
+
+
+FORMATOS: Dict[str, Formato] = {
+    formato.nome: formato
+    for formato in (
+        Formato("json", "application/json", _texto(TabelaPresos.para_json)),
+        Formato("ndjson", "application/x-ndjson", _texto(TabelaPresos.para_ndjson)),
+        Formato("colunas", "application/json", _texto(TabelaPresos.para_json_colunas)),
+        Formato("csv", "text/csv; charset=utf-8", _texto(TabelaPresos.para_csv)),
+        Formato(
+            "arrow", "application/vnd.apache.arrow.stream", TabelaPresos.para_arrow_ipc,
+            requer="pyarrow",
+        ),
+        Formato(
+            "parquet", "application/vnd.apache.parquet", TabelaPresos.para_parquet,
+            comprimir=False, requer="pyarrow",
+        ),
+    )
+}
+
+# Tipos do cabeçalho Accept reconhecidos; os demais (inclusive */*) resultam em JSON
+FORMATOS_ACCEPT = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "text/csv": "csv",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+}
+
+
+def _normalizar(nome: str) -> str:
+    """Remove acentos e diferenças de maiúsculas, para aceitar ?fields=codigo,cela"""
+    decomposto = unicodedata.normalize("NFKD", nome.strip())
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+_COLUNAS_NORMALIZADAS = {_normalizar(nome): nome for nome in COLUNAS}
+
+
+def _formato_accept(accept: str) -> str:
+    """
+    Escolhe o formato pelo cabeçalho Accept
+
+    Args:
+        accept: Valor do cabeçalho Accept
+
+    Returns:
+        str: Formato reconhecido com o maior q (o primeiro, em caso de empate), ou json
+    """
+    escolhido, maior_q = "json", 0.0
+    for item in accept.lower().split(","):
+        tipo, _, parametros = item.strip().partition(";")
+        nome = FORMATOS_ACCEPT.get(tipo.strip())
+        if nome is None:
+            continue
+        q = 1.0
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if q > maior_q:
+            escolhido, maior_q = nome, q
+    return escolhido
+
+
+def obter_formato(
+    request: Request,
+    format: Optional[str] = Query(
+        None,
+        description=f"Formato da resposta ({', '.join(FORMATOS)}); sem ele, vale o cabeçalho Accept",
+    ),
+) -> Formato:
+    """
+    Determina o formato da resposta pelo parâmetro `format` ou pelo cabeçalho Accept
+
+    Args:
+        request: Requisição recebida (cabeçalho Accept)
+        format: Nome do formato (opcional)
+
+    Returns:
+        Formato: Formato escolhido
+
+    Raises:
+        HTTPException: 400 se o formato não existir, 406 se depender de um pacote
+            que não está instalado
+    """
+    if format is None:
+        nome = _formato_accept(request.headers.get("accept", ""))
+    else:
+        nome = format.lower()
+        if nome not in FORMATOS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Formato desconhecido: {format}. Use um de: {', '.join(FORMATOS)}",
+            )
+
+    formato = FORMATOS[nome]
+    if formato.requer is not None and importlib.util.find_spec(formato.requer) is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"O formato {nome} requer o pacote {formato.requer}, que não está instalado",
+        )
+    return formato
+
+
+def obter_campos(
+    fields: Optional[str] = Query(
+        None,
+        description="Colunas incluídas, separadas por vírgula (por exemplo Código,Cela)",
+    ),
+) -> Campos:
+    """
+    Valida a projeção de colunas pedida em `fields`
+
+    Os nomes são aceitos sem acento e sem diferenciar maiúsculas. As colunas
+    sempre saem na ordem de COLUNAS, então cada combinação é serializada e
+    guardada em cache uma única vez.
+
+    Args:
+        fields: Nomes das colunas separados por vírgula (opcional)
+
+    Returns:
+        Campos: Colunas pedidas, ou None para todas
+
+    Raises:
+        HTTPException: 400 se alguma coluna não existir ou nenhuma for informada
+    """
+    if fields is None:
+        return None
+
+    nomes = [nome for nome in fields.split(",") if nome.strip()]
+    desconhecidos = [nome for nome in nomes if _normalizar(nome) not in _COLUNAS_NORMALIZADAS]
+    if desconhecidos or not nomes:
+        invalidas = ", ".join(desconhecidos) if desconhecidos else repr(fields)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Colunas inválidas: {invalidas}. Use: {', '.join(COLUNAS)}",
+        )
+
+    pedidas = {_COLUNAS_NORMALIZADAS[_normalizar(nome)] for nome in nomes}
+    if len(pedidas) == len(COLUNAS):
+        return None
+    return tuple(nome for nome in COLUNAS if nome in pedidas)
+
@@ -0,0 +1,235 @@
+"""
+Limite de requisições por cliente da API (balde de fichas) e contadores de cada cliente
+
+Cada cliente autenticado (chave de API ou usuário HTTP Basic) tem um balde com
+API_LIMITE_RAJADA fichas, reabastecido a API_LIMITE_POR_MINUTO fichas por minuto.
+Cada requisição consome fichas de acordo com o custo da rota; sem fichas, a
+resposta é 429 com Retry-After, antes de qualquer trabalho. Assim um cliente que
+exagera é recusado sem custo e não tira capacidade dos demais. Os baldes e os
+contadores ficam na memória de cada worker.
+
+Cada nome de chave de API tem também um orçamento de verificações falhas
+(API_FALHAS_POR_MINUTO, com rajada de API_FALHAS_RAJADA). A verificação de um
+segredo novo reserva uma tentativa antes de calcular o hash, que é devolvida se
+o segredo estiver certo; esgotado o orçamento, a resposta é 429 sem calcular o
+hash, e quem tenta adivinhar segredos não consegue ocupar a CPU do worker.
+"""
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+# Fichas repostas por minuto e tamanho do balde (rajada máxima); 0 desativa o limite
+API_LIMITE_POR_MINUTO = float(os.getenv("API_LIMITE_POR_MINUTO", "600"))
+API_LIMITE_RAJADA = float(os.getenv("API_LIMITE_RAJADA", "60"))
+# Verificações de segredo falhas aceitas por nome de chave: reposição por minuto e
+# rajada; 0 desativa
+API_FALHAS_POR_MINUTO = float(os.getenv("API_FALHAS_POR_MINUTO", "6"))
+API_FALHAS_RAJADA = float(os.getenv("API_FALHAS_RAJADA", "3"))
+
+
+@dataclass
+class ContadoresCliente:
+    """Requisições de um cliente desde o início do worker"""
+
+    aceitas: int = 0
+    # Recusadas com 429 por falta de fichas
+    limitadas: int = 0
+    # Recusadas com 401: chave com o nome do cliente, mas segredo errado
+    recusadas: int = 0
+    fichas_consumidas: float = 0.0
+    # Horário (Unix) da última requisição, aceita ou não
+    ultima_requisicao: Optional[float] = None
+
+
+@dataclass
+class Balde:
+    """Balde de fichas de um cliente"""
+
+    capacidade: float
+    # Fichas repostas por segundo
+    taxa: float
+    fichas: float
+    atualizado_em: float = field(default_factory=time.monotonic)
+
+    def consumir(self, custo: float, agora: float) -> float:
+        """
+        Repõe as fichas do período e tenta consumir o custo
+
+        Args:
+            custo: Fichas exigidas pela requisição
+            agora: Instante atual (time.monotonic)
+
+        Returns:
+            float: 0 se as fichas foram consumidas, senão os segundos até haver fichas
+        """
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+        # Um custo maior que o balde nunca seria atendido; vale como balde cheio
+        custo = min(custo, self.capacidade)
+        if self.fichas >= custo:
+            self.fichas -= custo
+            return 0.0
+        return (custo - self.fichas) / self.taxa
+
+
+class LimitadorRequisicoes:
+    """Baldes de fichas e contadores de todos os clientes, protegidos por uma trava"""
+
+    def __init__(
+        self,
+        por_minuto: float = API_LIMITE_POR_MINUTO,
+        rajada: float = API_LIMITE_RAJADA,
+        falhas_por_minuto: float = API_FALHAS_POR_MINUTO,
+        falhas_rajada: float = API_FALHAS_RAJADA,
+    ):
+        """
+        Inicializa o limitador
+
+        Args:
+            por_minuto: Fichas repostas por minuto para cada cliente (0 desativa)
+            rajada: Capacidade do balde de cada cliente
+            falhas_por_minuto: Verificações falhas repostas por minuto para cada
+                nome de chave
+            falhas_rajada: Verificações falhas seguidas aceitas por nome de chave
+        """
+        self.por_minuto = por_minuto
+        self.rajada = rajada
+        self.falhas_por_minuto = falhas_por_minuto
+        self.falhas_rajada = falhas_rajada
+        self._limites: Dict[str, float] = {}
+        self._baldes: Dict[str, Balde] = {}
+        self._baldes_falhas: Dict[str, Balde] = {}
+        self._contadores: Dict[str, ContadoresCliente] = {}
+        self._trava = threading.Lock()
+
+    def definir_limite(self, cliente: str, por_minuto: float) -> None:
+        """
+        Define uma taxa própria para um cliente, em vez de API_LIMITE_POR_MINUTO
+
+        Args:
+            cliente: Nome do cliente
+            por_minuto: Fichas repostas por minuto (0 desativa o limite do cliente)
+        """
+        with self._trava:
+            self._limites[cliente] = por_minuto
+            self._baldes.pop(cliente, None)
+
+    def _contadores_de(self, cliente: str) -> ContadoresCliente:
+        """Contadores do cliente, criados no primeiro uso (chamar com a trava)"""
+        contadores = self._contadores.get(cliente)
+        if contadores is None:
+            contadores = self._contadores[cliente] = ContadoresCliente()
+        return contadores
+
+    def cobrar(self, cliente: str, custo: float = 1) -> None:
+        """
+        Consome as fichas de uma requisição do cliente
+
+        Args:
+            cliente: Nome do cliente autenticado
+            custo: Fichas exigidas pela rota
+
+        Raises:
+            HTTPException: 429 com Retry-After se o cliente não tiver fichas
+        """
+        agora = time.monotonic()
+        with self._trava:
+            contadores = self._contadores_de(cliente)
+            contadores.ultima_requisicao = time.time()
+
+            por_minuto = self._limites.get(cliente, self.por_minuto)
+            espera = 0.0
+            if por_minuto > 0 and self.rajada > 0:
+                balde = self._baldes.get(cliente)
+                if balde is None:
+                    balde = Balde(self.rajada, por_minuto / 60, self.rajada, agora)
+                    self._baldes[cliente] = balde
+                espera = balde.consumir(custo, agora)
+
+            if espera:
+                contadores.limitadas += 1
+            else:
+                contadores.aceitas += 1
+                contadores.fichas_consumidas += custo
+
+        if espera:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Limite de requisições excedido. Tente novamente em {math.ceil(espera)} s.",
+                headers={"Retry-After": str(math.ceil(espera))},
+            )
+
+    def reservar_verificacao(self, cliente: str) -> None:
+        """
+        Reserva uma tentativa do orçamento de falhas antes de verificar um segredo
+
+        Args:
+            cliente: Nome da chave apresentada
+
+        Raises:
+            HTTPException: 429 com Retry-After se o orçamento de falhas do nome
+                estiver esgotado; nesse caso o hash não deve ser calculado
+        """
+        if self.falhas_por_minuto <= 0 or self.falhas_rajada <= 0:
+            return
+        agora = time.monotonic()
+        with self._trava:
+            balde = self._baldes_falhas.get(cliente)
+            if balde is None:
+                balde = Balde(self.falhas_rajada, self.falhas_por_minuto / 60, self.falhas_rajada, agora)
+                self._baldes_falhas[cliente] = balde
+            espera = balde.consumir(1, agora)
+            if espera:
+                contadores = self._contadores_de(cliente)
+                contadores.limitadas += 1
+                contadores.ultima_requisicao = time.time()
+
+        if espera:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Muitas chaves inválidas. Tente novamente em {math.ceil(espera)} s.",
+                headers={"Retry-After": str(math.ceil(espera))},
+            )
+
+    def devolver_verificacao(self, cliente: str) -> None:
+        """Devolve a tentativa reservada por `reservar_verificacao` quando o segredo está certo"""
+        with self._trava:
+            balde = self._baldes_falhas.get(cliente)
+            if balde is not None:
+                balde.fichas = min(balde.capacidade, balde.fichas + 1)
+
+    def registrar_recusa(self, cliente: str) -> None:
+        """Conta uma tentativa com o nome de um cliente e credencial inválida"""
+        with self._trava:
+            contadores = self._contadores_de(cliente)
+            contadores.recusadas += 1
+            contadores.ultima_requisicao = time.time()
+
+    def contadores(self) -> Dict[str, ContadoresCliente]:
+        """Cópia dos contadores de cada cliente"""
+        with self._trava:
+            return {
+                cliente: ContadoresCliente(**vars(contadores))
+                for cliente, contadores in self._contadores.items()
+            }
+
+    def fichas(self, cliente: str) -> Optional[float]:
+        """Fichas disponíveis do cliente agora, ou None se ele não tem limite"""
+        with self._trava:
+            por_minuto = self._limites.get(cliente, self.por_minuto)
+            if por_minuto <= 0 or self.rajada <= 0:
+                return None
+            balde = self._baldes.get(cliente)
+            if balde is None:
+                return self.rajada
+            repostas = (time.monotonic() - balde.atualizado_em) * balde.taxa
+            return min(balde.capacidade, balde.fichas + repostas)
+
+
+# Instância única do limitador para ser usada em toda a aplicação
+limitador = LimitadorRequisicoes()
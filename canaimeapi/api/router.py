@@ -1,56 +1,826 @@
 """
 Definição das rotas da API do Canaimé
 """
+import asyncio
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
-from canaimeapi.api.auth import verificar_credenciais
-from canaimeapi.scraper.crawler import scraper
+from canaimeapi.api.auth import (
+    autenticar,
+    credenciais_com_custo,
+    verificar_administrador,
+    verificar_credenciais,
+)
+from canaimeapi.api.cache import RespostaSerializada, cache_respostas, etag_corresponde
+from canaimeapi.api.eventos import difusor
+from canaimeapi.api.formatos import (
+    FORMATOS,
+    Campos,
+    Formato,
+    obter_campos,
+    obter_formato,
+)
+from canaimeapi.api.limites import limitador
+from canaimeapi.scheduler import TAREFA_ATUALIZACAO, scheduler
+from canaimeapi.scraper.armazenamento import ArmazenamentoSnapshots
+from canaimeapi.scraper.config import CANAIME_DADOS_VALIDADE_MINUTOS
+from canaimeapi.scraper.fotos import cache_fotos
+from canaimeapi.scraper.indices import IndiceSnapshot
+from canaimeapi.scraper.ocupacao import Ocupacao
+from canaimeapi.scraper.repositorio import repositorio
+from canaimeapi.scraper.resiliencia import FECHADO, disjuntor
+from canaimeapi.scraper.snapshot import Snapshot
+from canaimeapi.scraper.tabela import TabelaPresos
 
 # Criação do router
 router = APIRouter()
 
+# Limites de paginação e da consulta em lote
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 5000
+CODIGOS_POR_LOTE = 10000
+
+# Fichas do limite de requisições cobradas pelas rotas mais caras (as demais cobram 1)
+CUSTO_HISTORICO = 10
+CUSTO_HISTORICO_PRESO = 2
+CUSTO_LOTE = 10
+CUSTO_BUSCA = 2
+CUSTO_REFRESH = 30
+
+
+class ConsultaLote(BaseModel):
+    """Corpo da consulta de vários presos por código"""
+
+    codigos: List[str] = Field(..., min_length=1, max_length=CODIGOS_POR_LOTE)
+
+
+def validar_unidade(
+    unidade: Optional[str] = Query(None, description="Filtra pela unidade prisional"),
+) -> Optional[str]:
+    """
+    Valida o filtro de unidade prisional informado na requisição
+
+    Args:
+        unidade: Identificador da unidade prisional (opcional)
+
+    Returns:
+        Optional[str]: Unidade em letras maiúsculas, ou None se não informada
+
+    Raises:
+        HTTPException: Se a unidade não estiver configurada
+    """
+    if unidade is None:
+        return None
+
+    unidade = unidade.upper()
+    if unidade not in repositorio.unidades:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unidade não configurada: {unidade}",
+        )
+    return unidade
+
+
+def obter_armazenamento() -> ArmazenamentoSnapshots:
+    """
+    Retorna o armazenamento em disco, onde fica o histórico temporal
+
+    Raises:
+        HTTPException: Se o armazenamento estiver desativado
+    """
+    if repositorio.armazenamento is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Histórico indisponível: o armazenamento (CANAIME_ARMAZENAMENTO_PATH) está desativado.",
+        )
+    return repositorio.armazenamento
+
+
+def credenciais_dados(request: Request, cliente: str = Depends(autenticar)) -> str:
+    """Cobra de /dados uma ficha, ou CUSTO_HISTORICO quando a consulta usa o histórico"""
+    limitador.cobrar(cliente, CUSTO_HISTORICO if "at" in request.query_params else 1)
+    return cliente
+
+
+def _chave_dados(formato: Formato, unidade: Optional[str], campos: Campos) -> str:
+    """Chave de uma resposta de /dados no cache de respostas"""
+    return f"dados:{formato.nome}:{unidade or ''}:{','.join(campos or ())}"
+
+
+async def _obter_resposta(
+    chave: str,
+    snapshot: Snapshot,
+    gerar: Callable[[], bytes],
+    media_type: str = "application/json",
+    comprimir: bool = True,
+) -> RespostaSerializada:
+    """
+    Retorna a resposta do cache ou, se ela ainda não existir, a gera fora do loop
+
+    A serialização e as variantes gzip e brotli de uma tabela completa levam
+    centenas de milissegundos; cada combinação de filtros e formato ainda não
+    pedida na versão atual é gerada em uma thread, sem bloquear as demais
+    requisições.
+
+    Args:
+        chave: Identificador da resposta no cache
+        snapshot: Snapshot lido pela requisição, de onde vêm a versão e o instante
+        gerar: Função que serializa o corpo a partir do mesmo snapshot
+        media_type: Tipo de conteúdo da resposta
+        comprimir: Gera as variantes gzip e brotli do corpo
+
+    Returns:
+        RespostaSerializada: Resposta pronta para ser enviada
+    """
+    resposta = cache_respostas.consultar(chave, snapshot.versao)
+    if resposta is not None:
+        return resposta
+    return await asyncio.to_thread(
+        cache_respostas.obter,
+        chave,
+        snapshot.versao,
+        gerar,
+        snapshot.atualizado_em,
+        media_type,
+        comprimir,
+    )
+
+
+def _exportar_historico(
+    at: datetime, unidade: Optional[str], formato: Formato, campos: Campos
+) -> Optional[bytes]:
+    """Lê os presos de um instante no histórico e os serializa no formato pedido"""
+    registros = obter_armazenamento().dados_em(at, unidade)
+    if registros is None:
+        return None
+    return formato.serializar(TabelaPresos.de_registros(registros), campos)
+
+
+def aquecer_cache(snapshot: Snapshot) -> None:
+    """
+    Serializa e comprime a resposta completa de /dados de um snapshot novo
+
+    Chamada pelo repositório na thread que constrói o snapshot, antes de
+    publicá-lo, para que a serialização não bloqueie o loop de eventos e a
+    resposta já esteja pronta quando as requisições virem a nova versão.
+    """
+    formato = FORMATOS["json"]
+    cache_respostas.obter(
+        _chave_dados(formato, None, None),
+        snapshot.versao,
+        lambda: formato.serializar(snapshot.dados, None),
+        snapshot.atualizado_em,
+        formato.media_type,
+        formato.comprimir,
+    )
+
+
+repositorio.registrar_ao_preparar(aquecer_cache)
+
 
 @router.get("/dados", response_model=List[Dict])
-async def get_dados(username: str = Depends(verificar_credenciais)):
+async def get_dados(
+    request: Request,
+    unidade: Optional[str] = Depends(validar_unidade),
+    at: Optional[datetime] = Query(
+        None, description="Instante (ISO 8601) para consultar os dados como estavam no passado"
+    ),
+    formato: Formato = Depends(obter_formato),
+    campos: Campos = Depends(obter_campos),
+    username: str = Depends(credenciais_dados),
+) -> Response:
     """
     Endpoint para obter os dados dos presos
+
+    A resposta é serializada e comprimida uma única vez por atualização, para
+    cada formato e combinação de colunas pedidos. Clientes que enviam
+    If-None-Match com o ETag atual recebem 304. Com `at`, os dados vêm do
+    histórico temporal gravado junto com os snapshots.
     
     Args:
+        request: Requisição recebida (cabeçalhos de cache e Accept-Encoding)
+        unidade: Unidade prisional para filtrar os dados (opcional)
+        at: Instante consultado; sem fuso horário, vale o horário local (opcional)
+        formato: Formato da resposta, por `format` ou pelo cabeçalho Accept
+        campos: Colunas incluídas, por `fields` (padrão: todas)
         username: Nome do usuário autenticado (injetado pela dependência)
         
     Returns:
-        List[Dict]: Lista de presos com suas informações
+        Response: Presos com suas informações, no formato pedido
         
     Raises:
-        HTTPException: Se não houver dados disponíveis
+        HTTPException: Se não houver dados disponíveis (ou histórico para `at`)
     """
-    if scraper.dados_presos is None:
+    if at is not None:
+        corpo = await asyncio.to_thread(_exportar_historico, at, unidade, formato, campos)
+        if corpo is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sem histórico para {at.isoformat()}",
+            )
+        return Response(content=corpo, media_type=formato.media_type)
+
+    # Lido uma única vez: a versão, o instante e os dados serializados são do mesmo snapshot
+    snapshot = repositorio.snapshot
+    dados = None
+    if snapshot is not None:
+        dados = snapshot.dados if unidade is None else snapshot.dados_unidades.get(unidade)
+    if dados is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dados não disponíveis. Aguarde a primeira atualização.",
         )
     
-    return json.loads(scraper.dados_json)
+    resposta = await _obter_resposta(
+        _chave_dados(formato, unidade, campos),
+        snapshot,
+        lambda: formato.serializar(dados, campos),
+        formato.media_type,
+        formato.comprimir,
+    )
+    resposta = resposta.responder(request)
+    resposta.headers["Vary"] = "Accept, Accept-Encoding"
+    return resposta
+
+
+def _gerar_ocupacao(
+    snapshot: Snapshot, anterior: Optional[Ocupacao], unidade: Optional[str], delta: bool
+) -> bytes:
+    """Serializa a ocupação do snapshot e, se pedido, a diferença para a anterior"""
+    ocupacao = snapshot.ocupacao
+    corpo = {
+        "versao": ocupacao.versao,
+        "ultima_atualizacao": snapshot.ultima_atualizacao,
+        **ocupacao.para_dict(unidade),
+    }
+    if delta:
+        corpo["delta"] = (
+            ocupacao.delta(anterior, unidade)
+            if anterior is not None and anterior.versao < ocupacao.versao
+            else None
+        )
+    return json.dumps(corpo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@router.get("/ocupacao")
+async def get_ocupacao(
+    request: Request,
+    unidade: Optional[str] = Depends(validar_unidade),
+    delta: bool = Query(False, description="Inclui a diferença para o snapshot anterior"),
+    username: str = Depends(verificar_credenciais),
+) -> Response:
+    """
+    Endpoint com a quantidade de presos por unidade, ala e cela
+
+    A contagem é feita uma única vez quando o snapshot é instalado, e a resposta
+    é serializada uma vez por versão, com ETag como em /dados.
+
+    Args:
+        request: Requisição recebida (cabeçalhos de cache e Accept-Encoding)
+        unidade: Unidade prisional para filtrar a ocupação (opcional)
+        delta: Inclui as celas cuja ocupação mudou desde o snapshot anterior
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Response: Totais por unidade, ala e cela, em JSON
+
+    Raises:
+        HTTPException: Se não houver dados disponíveis
+    """
+    snapshot = repositorio.snapshot
+    anterior = repositorio.ocupacao_anterior
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dados não disponíveis. Aguarde a primeira atualização.",
+        )
+
+    resposta = await _obter_resposta(
+        f"ocupacao:{unidade or ''}:{int(delta)}",
+        snapshot,
+        lambda: _gerar_ocupacao(snapshot, anterior, unidade, delta),
+    )
+    return resposta.responder(request)
+
+
+def dados_desatualizados() -> bool:
+    """
+    Indica se o snapshot servido pode não refletir mais o Canaimé
+
+    Os dados estão desatualizados quando a última atualização falhou ou quando a
+    última atualização bem-sucedida (ou, em workers que não executam o scraper,
+    o último snapshot publicado) tem mais de CANAIME_DADOS_VALIDADE_MINUTOS.
+    """
+    if disjuntor.falhas_consecutivas or disjuntor.estado != FECHADO:
+        return True
+
+    referencias = [d for d in (disjuntor.ultimo_sucesso, repositorio.atualizado_em) if d]
+    if not referencias:
+        return True
+    idade = datetime.now(timezone.utc) - max(referencias)
+    return idade > timedelta(minutes=CANAIME_DADOS_VALIDADE_MINUTOS)
 
 
 @router.get("/status")
-async def get_status(username: str = Depends(verificar_credenciais)):
+async def get_status(
+    unidade: Optional[str] = Depends(validar_unidade),
+    username: str = Depends(verificar_credenciais),
+):
     """
     Endpoint para verificar o status do serviço
     
     Args:
+        unidade: Unidade prisional para filtrar o status (opcional)
         username: Nome do usuário autenticado (injetado pela dependência)
         
     Returns:
         Dict: Status do serviço com informações sobre a última atualização
     """
+    unidades = [unidade] if unidade else repositorio.unidades
+    tarefa = scheduler.tarefas.get(TAREFA_ATUALIZACAO)
+
+    proxima_tentativa = disjuntor.proxima_tentativa
+
     return {
         "status": "online",
-        "ultima_atualizacao": scraper.ultima_atualizacao,
-        "registros": len(scraper.dados_presos) if scraper.dados_presos is not None else 0,
+        "versao": repositorio.versao,
+        "desatualizado": dados_desatualizados(),
+        "atualizacao_em_andamento": tarefa.em_andamento if tarefa else False,
+        "atualizacao": {
+            "disjuntor": disjuntor.estado,
+            "falhas_consecutivas": disjuntor.falhas_consecutivas,
+            "ultimo_erro": disjuntor.ultimo_erro or (tarefa.ultimo_erro if tarefa else None),
+            "ultimo_sucesso": (
+                disjuntor.ultimo_sucesso.isoformat() if disjuntor.ultimo_sucesso else None
+            ),
+            "proxima_tentativa": proxima_tentativa.isoformat() if proxima_tentativa else None,
+        },
+        "ultima_atualizacao": (
+            repositorio.ultima_atualizacao_unidade(unidade)
+            if unidade
+            else repositorio.ultima_atualizacao
+        ),
+        "registros": repositorio.total_registros(unidade),
+        "unidades": {
+            nome: {
+                "ultima_atualizacao": repositorio.ultima_atualizacao_unidade(nome),
+                "registros": repositorio.total_registros(nome),
+            }
+            for nome in unidades
+        },
         "timestamp": datetime.now().isoformat(),
-    } 
\ No newline at end of file
+    } 
+
+
+@router.get("/clientes")
+async def get_clientes(username: str = Depends(verificar_administrador)):
+    """
+    Endpoint com os contadores de requisições de cada cliente da API
+
+    Restrito aos administradores (API_ADMINS), pois expõe os nomes e o uso de
+    todos os clientes. Os contadores e os limites são de cada worker e recomeçam
+    quando ele reinicia.
+
+    Args:
+        username: Nome do administrador autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Requisições aceitas, limitadas (429) e recusadas (401), fichas
+            consumidas e disponíveis e horário da última requisição de cada cliente
+    """
+    return {
+        "limite": {"por_minuto": limitador.por_minuto, "rajada": limitador.rajada},
+        "clientes": {
+            cliente: {
+                "aceitas": contadores.aceitas,
+                "limitadas": contadores.limitadas,
+                "recusadas": contadores.recusadas,
+                "fichas_consumidas": contadores.fichas_consumidas,
+                "fichas_disponiveis": limitador.fichas(cliente),
+                "ultima_requisicao": (
+                    datetime.fromtimestamp(contadores.ultima_requisicao, timezone.utc).isoformat()
+                    if contadores.ultima_requisicao is not None
+                    else None
+                ),
+            }
+            for cliente, contadores in limitador.contadores().items()
+        },
+    }
+
+
+def obter_indice() -> IndiceSnapshot:
+    """
+    Retorna os índices do snapshot atual
+
+    Returns:
+        IndiceSnapshot: Índices de hash por Código, Ala, Cela e Unidade
+
+    Raises:
+        HTTPException: Se não houver dados disponíveis
+    """
+    if repositorio.indice is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dados não disponíveis. Aguarde a primeira atualização.",
+        )
+    return repositorio.indice
+
+
+@router.get("/presos")
+async def get_presos(
+    codigo: Optional[str] = Query(None, description="Código do preso"),
+    ala: Optional[str] = Query(None, description="Ala (espaços e maiúsculas são ignorados)"),
+    cela: Optional[str] = Query(None, description="Cela"),
+    unidade: Optional[str] = Depends(validar_unidade),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    offset: int = Query(0, ge=0),
+    indice: IndiceSnapshot = Depends(obter_indice),
+    username: str = Depends(verificar_credenciais),
+):
+    """
+    Endpoint para consultar presos por Código, Ala e Cela
+
+    Os filtros são combinados e resolvidos pelos índices do snapshot,
+    sem percorrer todos os registros.
+
+    Args:
+        codigo: Código do preso (opcional)
+        ala: Ala (opcional)
+        cela: Cela (opcional)
+        unidade: Unidade prisional (opcional)
+        limit: Quantidade máxima de registros retornados
+        offset: Quantidade de registros ignorados no início
+        indice: Índices do snapshot atual (injetado pela dependência)
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Total de registros encontrados e a página solicitada
+    """
+    posicoes = indice.consultar(**{"Código": codigo, "Ala": ala, "Cela": cela, "Unidade": unidade})
+
+    return {
+        "versao": repositorio.versao,
+        "total": len(posicoes),
+        "limit": limit,
+        "offset": offset,
+        "registros": indice.tabela.registros(posicoes[offset:offset + limit]),
+    }
+
+
+@router.get("/presos/{codigo}")
+async def get_preso(
+    codigo: str,
+    indice: IndiceSnapshot = Depends(obter_indice),
+    username: str = Depends(verificar_credenciais),
+):
+    """
+    Endpoint para obter um preso pelo código
+
+    Args:
+        codigo: Código do preso
+        indice: Índices do snapshot atual (injetado pela dependência)
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        List[Dict]: Registros do preso (um por unidade em que aparece)
+
+    Raises:
+        HTTPException: Se o código não for encontrado
+    """
+    registros = indice.buscar(**{"Código": codigo})
+    if not registros:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Preso não encontrado: {codigo}",
+        )
+    return registros
+
+
+@router.get("/presos/{codigo}/historico")
+async def get_historico_preso(
+    codigo: str,
+    username: str = Depends(credenciais_com_custo(CUSTO_HISTORICO_PRESO)),
+):
+    """
+    Endpoint para obter o histórico de Unidade, Ala, Cela, Foto e Nome de um preso
+
+    Cada intervalo vale de `valido_de` (inclusive) a `valido_ate` (exclusive);
+    `valido_ate` é nulo no intervalo vigente. Um preso que saiu não tem
+    intervalo vigente.
+
+    Args:
+        codigo: Código do preso
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Código e intervalos, do mais antigo ao mais recente
+
+    Raises:
+        HTTPException: Se o código não aparecer no histórico
+    """
+    intervalos = await asyncio.to_thread(obter_armazenamento().historico_preso, codigo)
+    if not intervalos:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Preso não encontrado no histórico: {codigo}",
+        )
+    return {"codigo": codigo, "intervalos": intervalos}
+
+
+@router.get("/fotos/{codigo}")
+async def get_foto(
+    codigo: str,
+    request: Request,
+    miniatura: bool = Query(False, description="Retorna a miniatura, quando disponível"),
+    indice: IndiceSnapshot = Depends(obter_indice),
+    username: str = Depends(verificar_credenciais),
+) -> Response:
+    """
+    Endpoint para obter a foto de um preso a partir do cache em disco
+
+    Fotos ausentes ou antigas são baixadas (ou revalidadas) no Canaimé; se o
+    Canaimé falhar, a cópia em cache é servida. Sem o Pillow instalado, a
+    miniatura dá lugar à foto original.
+
+    Args:
+        codigo: Código do preso
+        request: Requisição recebida (cabeçalho If-None-Match)
+        miniatura: Retorna a miniatura em vez da foto original
+        indice: Índices do snapshot atual (injetado pela dependência)
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Response: Imagem com ETag, ou 304 se o cliente já a possui
+
+    Raises:
+        HTTPException: 404 se o preso ou a foto não existirem, 503 se o cache
+            estiver desativado, 502 se a foto não puder ser obtida no Canaimé
+    """
+    if cache_fotos is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cache de fotos desativado",
+        )
+
+    registro = next(
+        (registro for registro in indice.buscar(**{"Código": codigo}) if registro.get("Foto")),
+        None,
+    )
+    if registro is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Foto não encontrada: {codigo}",
+        )
+
+    try:
+        foto = await cache_fotos.obter(registro["Código"], registro["Foto"], miniatura)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Falha ao obter a foto no Canaimé: {e}",
+        )
+
+    cabecalhos = {"ETag": foto.etag, "Cache-Control": "private, max-age=86400"}
+    if etag_corresponde(request.headers.get("if-none-match", ""), foto.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+    return Response(content=foto.conteudo, media_type=foto.tipo, headers=cabecalhos)
+
+
+@router.post("/presos/lote")
+async def post_presos_lote(
+    consulta: ConsultaLote,
+    indice: IndiceSnapshot = Depends(obter_indice),
+    username: str = Depends(credenciais_com_custo(CUSTO_LOTE)),
+):
+    """
+    Endpoint para consultar vários presos por código em uma única requisição
+
+    Args:
+        consulta: Lista de códigos a consultar
+        indice: Índices do snapshot atual (injetado pela dependência)
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Registros encontrados por código e os códigos não encontrados
+    """
+    encontrados = {}
+    nao_encontrados = []
+
+    for codigo in dict.fromkeys(consulta.codigos):
+        registros = indice.buscar(**{"Código": codigo})
+        if registros:
+            encontrados[codigo] = registros
+        else:
+            nao_encontrados.append(codigo)
+
+    return {
+        "versao": repositorio.versao,
+        "encontrados": encontrados,
+        "nao_encontrados": nao_encontrados,
+    }
+
+
+@router.get("/busca")
+async def get_busca(
+    q: str = Query(..., min_length=2, max_length=200, description="Nome ou parte do nome"),
+    unidade: Optional[str] = Depends(validar_unidade),
+    limit: int = Query(20, ge=1, le=200),
+    username: str = Depends(credenciais_com_custo(CUSTO_BUSCA)),
+):
+    """
+    Endpoint para buscar presos pelo nome, sem diferenciar acentos e maiúsculas
+
+    Tolera erros de digitação comparando trigramas; os resultados são ordenados
+    pela similaridade com o termo buscado.
+
+    Args:
+        q: Nome ou parte do nome
+        unidade: Unidade prisional para restringir a busca (opcional)
+        limit: Quantidade máxima de resultados
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Resultados com a pontuação de similaridade de cada registro
+
+    Raises:
+        HTTPException: Se não houver dados disponíveis
+    """
+    snapshot = repositorio.snapshot
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dados não disponíveis. Aguarde a primeira atualização.",
+        )
+
+    # A primeira busca de cada versão constrói o índice de nomes: fora do loop
+    indice_nomes = await asyncio.to_thread(lambda: snapshot.indice_nomes)
+    resultados = indice_nomes.buscar(q, limite=limit, unidade=unidade)
+
+    return {
+        "versao": snapshot.versao,
+        "q": q,
+        "total": len(resultados),
+        "resultados": [
+            {"pontuacao": round(pontuacao, 3), **indice_nomes.tabela.registro(posicao)}
+            for pontuacao, posicao in resultados
+        ],
+    }
+
+
+@router.get("/changes")
+async def get_changes(
+    since: int = Query(..., ge=0, description="Última versão conhecida pelo cliente"),
+    username: str = Depends(verificar_credenciais),
+):
+    """
+    Endpoint para obter apenas as alterações desde uma versão do snapshot
+
+    Cada alteração traz a versão em que ocorreu, o tipo (entrada, saida,
+    transferencia ou foto), o Código e os dados antes e/ou depois.
+
+    Args:
+        since: Última versão conhecida pelo cliente
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Versão atual e as alterações posteriores a `since`
+
+    Raises:
+        HTTPException: 410 se as alterações desde `since` não estiverem mais
+            disponíveis; o cliente deve baixar /dados novamente
+    """
+    versao_atual = repositorio.versao
+    if since == versao_atual:
+        return {"versao_atual": versao_atual, "since": since, "alteracoes": []}
+
+    versao_minima = repositorio.alteracoes.versao_minima
+    if since > versao_atual or versao_minima is None or since < versao_minima:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail={
+                "mensagem": "Alterações desta versão não estão disponíveis. Baixe /dados novamente.",
+                "versao_atual": versao_atual,
+                "versao_minima": versao_minima,
+            },
+        )
+
+    return {
+        "versao_atual": versao_atual,
+        "since": since,
+        "alteracoes": [
+            alteracao
+            for diff in repositorio.alteracoes.desde(since)
+            for alteracao in diff.alteracoes
+        ],
+    }
+
+
+@router.get("/eventos")
+async def get_eventos(
+    since: Optional[int] = Query(None, ge=0, description="Última versão conhecida pelo cliente"),
+    last_event_id: Optional[str] = Header(None, description="Enviado pelo EventSource ao reconectar"),
+    username: str = Depends(verificar_credenciais),
+):
+    """
+    Endpoint de Server-Sent Events com as alterações de cada novo snapshot
+
+    Envia "conectado" com a versão atual e, a cada atualização que instala um
+    snapshot, "versao" com as alterações por Código (mesmo formato de /changes).
+    "reinicio" indica que as alterações não estão disponíveis e o cliente deve
+    baixar /dados novamente. Com `since` (ou Last-Event-ID), as versões
+    posteriores são enviadas primeiro.
+
+    Args:
+        since: Última versão conhecida pelo cliente
+        last_event_id: Última versão recebida antes de uma reconexão
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        StreamingResponse: Fluxo text/event-stream
+
+    Raises:
+        HTTPException: 503 se o limite de clientes conectados foi atingido
+    """
+    if difusor.lotado:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Limite de clientes de eventos atingido",
+            headers={"Retry-After": "30"},
+        )
+
+    desde = since
+    if last_event_id and last_event_id.isdigit():
+        desde = int(last_event_id)
+
+    return StreamingResponse(
+        difusor.assinar(desde),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/refresh")
+async def post_refresh(
+    aguardar: bool = Query(True, description="Aguarda o término da atualização"),
+    username: str = Depends(credenciais_com_custo(CUSTO_REFRESH)),
+):
+    """
+    Endpoint para solicitar uma atualização imediata dos dados
+
+    Se uma atualização já estiver em andamento, a requisição aguarda essa
+    execução em vez de iniciar outra.
+
+    Args:
+        aguardar: Se False, responde 202 logo após disparar a atualização
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Dict: Versão e horário do snapshot após a atualização
+
+    Raises:
+        HTTPException: 503 se a atualização não estiver configurada,
+            502 se a atualização falhar
+    """
+    tarefa = scheduler.tarefas.get(TAREFA_ATUALIZACAO)
+    if tarefa is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Atualização de dados não configurada",
+        )
+
+    agrupada = tarefa.em_andamento
+    if not aguardar:
+        tarefa.disparar()
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"agrupada": agrupada, "versao": repositorio.versao},
+        )
+
+    try:
+        await tarefa.executar()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Falha na atualização dos dados: {e}",
+        )
+
+    return {
+        "agrupada": agrupada,
+        "versao": repositorio.versao,
+        "ultima_atualizacao": repositorio.ultima_atualizacao,
+        "registros": repositorio.total_registros(),
+    }
@@ -7,13 +7,18 @@ import os
 import sys
 from typing import Dict
 
-from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from canaimeapi.api.auth import verificar_credenciais
+from canaimeapi.api.eventos import difusor
 from canaimeapi.api.router import router
-from canaimeapi.scheduler import scheduler
-from canaimeapi.scraper.crawler import atualizar_dados
+from canaimeapi.coordenacao import coordenador
+from canaimeapi.metricas import INTERVALO, MetricasMiddleware, gerar_metricas
+from canaimeapi.scheduler import TAREFA_ATUALIZACAO, IntervaloAdaptativo, scheduler
+from canaimeapi.scraper.crawler import atualizar_dados, scraper
+from canaimeapi.scraper.fotos import cache_fotos
+from canaimeapi.scraper.repositorio import repositorio
 
 # Configuração de codificação para o sistema
 # Força UTF-8 para entrada/saída padrão
@@ -25,9 +30,6 @@ if sys.stderr.encoding != 'utf-8':
 # Certifica-se de que os logs usam UTF-8
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 
-# Carrega variáveis de ambiente do arquivo .env
-load_dotenv()
-
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,6 +54,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latência, status e tamanho das respostas por rota, expostos em /metrics
+app.add_middleware(MetricasMiddleware)
+
 # Adiciona rotas da API
 app.include_router(router, prefix="/api/v1", tags=["Canaimé"])
 
@@ -71,34 +76,88 @@ async def read_root() -> Dict:
     }
 
 
-@app.on_event("startup")
-async def startup_event():
+@app.get("/metrics", include_in_schema=False)
+async def metrics(username: str = Depends(verificar_credenciais)) -> Response:
     """
-    Evento chamado na inicialização da aplicação
-    Configura o agendador de tarefas
+    Métricas no formato de texto do Prometheus
+
+    Args:
+        username: Nome do usuário autenticado (injetado pela dependência)
+
+    Returns:
+        Response: Métricas das atualizações e das requisições da API
     """
-    logger.info("Inicializando a aplicação Canaimé API")
-    
+    corpo, tipo = gerar_metricas()
+    return Response(content=corpo, media_type=tipo)
+
+
+async def iniciar_atualizacoes():
+    """
+    Configura o agendador de tarefas e a atualização periódica dos dados
+
+    Executada apenas no worker eleito para atualizar os dados; os demais
+    carregam os snapshots gravados por ele.
+    """
+    # Pré-carrega em segundo plano as fotos novas ou alteradas de cada snapshot, com a
+    # mesma sessão do backend HTTP do scraper
+    if cache_fotos is not None:
+        cache_fotos.usar_sessao(scraper.http)
+        repositorio.registrar_ao_instalar(
+            lambda: cache_fotos.agendar_prefetch(repositorio.obter_dados())
+        )
+
     # Configura e inicia o agendador de tarefas
     await scheduler.start()
     
     # Configura a tarefa periódica de atualização dos dados
     interval_minutes = int(os.getenv("ATUALIZAR_INTERVALO_MINUTOS", "60"))
+    # O intervalo se ajusta entre os limites conforme a frequência de mudanças por hora do dia
+    intervalo = IntervaloAdaptativo(
+        minimo=float(os.getenv("ATUALIZAR_INTERVALO_MIN_MINUTOS", max(interval_minutes // 4, 1))),
+        maximo=float(os.getenv("ATUALIZAR_INTERVALO_MAX_MINUTOS", interval_minutes * 2)),
+        inicial=interval_minutes,
+    )
+    INTERVALO.set_function(lambda: intervalo.atual * 60)
     scheduler.add_periodic_task(
         atualizar_dados,
-        interval_minutes=interval_minutes,
-        id="atualizar_dados",
+        interval_minutes=intervalo.atual,
+        id=TAREFA_ATUALIZACAO,
         start_immediately=True,
+        intervalo_adaptativo=intervalo,
     )
     
-    logger.info(f"Agendador configurado para atualizar dados a cada {interval_minutes} minutos")
+    logger.info(
+        f"Agendador configurado para atualizar dados a cada {intervalo.atual:g} minutos "
+        f"(entre {intervalo.minimo:g} e {intervalo.maximo:g}, conforme a frequência de mudanças)"
+    )
+
+
+@app.on_event("startup")
+async def startup_event():
+    """
+    Evento chamado na inicialização da aplicação
+    Carrega o último snapshot salvo e disputa a atualização dos dados entre os workers
+    """
+    logger.info("Inicializando a aplicação Canaimé API")
+
+    # Serve o último snapshot salvo enquanto a primeira atualização é executada
+    repositorio.carregar_snapshot()
+
+    # Sem isso, conexões abertas em /eventos atrasariam o desligamento do uvicorn
+    difusor.encerrar_ao_receber_sinal()
+
+    await coordenador.iniciar(iniciar_atualizacoes)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
     Evento chamado no encerramento da aplicação
-    Para o agendador de tarefas
+    Para o agendador de tarefas e fecha o navegador mantido pelo scraper
     """
     logger.info("Encerrando a aplicação Canaimé API")
-    await scheduler.stop() 
\ No newline at end of file
+    await coordenador.parar()
+    await scheduler.stop()
+    await scraper.fechar()
+    if cache_fotos is not None:
+        await cache_fotos.fechar() 
\ No newline at end of file
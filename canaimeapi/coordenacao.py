@@ -0,0 +1,265 @@
+"""
+Coordenação entre vários workers da API servindo o mesmo armazenamento
+
+Com `uvicorn --workers N`, cada worker é um processo com seu próprio repositório.
+Um único worker, eleito por uma trava de arquivo ao lado do banco de snapshots,
+executa o agendador e o scraper; os demais apenas carregam do banco cada versão
+gravada pelo líder. Se o líder terminar, o sistema operacional libera a trava e
+outro worker assume na verificação seguinte.
+
+Pedidos de atualização recebidos por um seguidor (POST /api/v1/refresh) são
+repassados ao líder por arquivos no mesmo diretório.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from canaimeapi.scheduler import TAREFA_ATUALIZACAO, scheduler
+from canaimeapi.scraper.config import (
+    CANAIME_ARMAZENAMENTO_PATH,
+    CANAIME_WORKERS_SINCRONIZAR_SEGUNDOS,
+)
+from canaimeapi.scraper.repositorio import RepositorioSnapshots, repositorio
+
+try:
+    import fcntl
+
+    def _travar(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _destravar(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+except ImportError:  # Windows
+    import msvcrt
+
+    def _travar(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def _destravar(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+logger = logging.getLogger("canaime_app")
+
+
+class TravaArquivo:
+    """Trava exclusiva e não bloqueante sobre um arquivo, liberada quando o processo termina"""
+
+    def __init__(self, caminho: Path):
+        """
+        Args:
+            caminho: Arquivo usado como trava (criado se não existir)
+        """
+        self.caminho = Path(caminho)
+        self._fd: Optional[int] = None
+
+    @property
+    def adquirida(self) -> bool:
+        """Indica se este processo detém a trava"""
+        return self._fd is not None
+
+    def adquirir(self) -> bool:
+        """
+        Tenta obter a trava sem esperar
+
+        Returns:
+            bool: True se a trava foi obtida (ou já pertencia a este processo)
+        """
+        if self._fd is not None:
+            return True
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _travar(fd)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        return True
+
+    def liberar(self) -> None:
+        """Libera a trava, se obtida"""
+        if self._fd is None:
+            return
+        try:
+            _destravar(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class CoordenadorWorkers:
+    """Elege o worker que atualiza os dados e mantém os demais sincronizados"""
+
+    def __init__(
+        self,
+        repositorio: RepositorioSnapshots,
+        caminho_trava: Optional[Path],
+        intervalo: float = CANAIME_WORKERS_SINCRONIZAR_SEGUNDOS,
+        limite_pedido: float = 900.0,
+    ):
+        """
+        Inicializa o coordenador
+
+        Args:
+            repositorio: Repositório do worker, sincronizado a partir do armazenamento
+            caminho_trava: Arquivo da trava de eleição (None desativa a coordenação:
+                o worker sempre atualiza os dados, como um processo único)
+            intervalo: Segundos entre verificações de nova versão, da trava e de pedidos
+            limite_pedido: Segundos que um seguidor aguarda o líder atender um pedido
+                de atualização
+        """
+        self.repositorio = repositorio
+        self.trava = TravaArquivo(caminho_trava) if caminho_trava else None
+        self.intervalo = intervalo
+        self.limite_pedido = limite_pedido
+        self.lider = False
+        self._ao_assumir: Optional[Callable[[], Awaitable[None]]] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        # Último pedido de atualização atendido pelo líder
+        self._ultimo_pedido = 0
+
+    @property
+    def _arquivo_pedido(self) -> Path:
+        return self.trava.caminho.with_name(self.trava.caminho.name + ".pedido")
+
+    @property
+    def _arquivo_resposta(self) -> Path:
+        return self.trava.caminho.with_name(self.trava.caminho.name + ".resposta")
+
+    async def iniciar(self, ao_assumir: Callable[[], Awaitable[None]]) -> None:
+        """
+        Disputa a liderança e inicia a verificação periódica
+
+        Args:
+            ao_assumir: Função chamada quando este worker se torna o líder
+                (inicia o agendador e a atualização periódica)
+        """
+        self._ao_assumir = ao_assumir
+
+        if self.trava is None:
+            logger.info("Armazenamento desativado; este worker atualiza os dados sozinho")
+            await self._assumir()
+            return
+
+        if self.trava.adquirir():
+            await self._assumir()
+        else:
+            logger.info(f"Worker {os.getpid()} é seguidor; snapshots lidos de {self.trava.caminho}")
+            scheduler.registrar_tarefa(self.solicitar_atualizacao, TAREFA_ATUALIZACAO)
+
+        self._tarefa = asyncio.create_task(self._verificar_periodicamente())
+
+    async def parar(self) -> None:
+        """Interrompe a verificação periódica e libera a liderança"""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        if self.trava is not None:
+            self.trava.liberar()
+        self.lider = False
+
+    async def _assumir(self) -> None:
+        """Torna este worker o líder, responsável pelo agendador e pelo scraper"""
+        self.lider = True
+        logger.info(f"Worker {os.getpid()} eleito para atualizar os dados")
+        if self.trava is not None:
+            # Pedidos anteriores à eleição já foram atendidos ou expiraram
+            self._ultimo_pedido = self._ler_json(self._arquivo_pedido).get("pedido", 0)
+        await self._ao_assumir()
+
+    async def _verificar_periodicamente(self) -> None:
+        """Seguidor: carrega novas versões e disputa a trava. Líder: atende pedidos"""
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                if self.lider:
+                    await self._atender_pedido()
+                    continue
+
+                await asyncio.to_thread(self.repositorio.sincronizar_armazenamento)
+                if self.trava.adquirir():
+                    # O líder anterior terminou; parte da última versão gravada por ele
+                    await asyncio.to_thread(self.repositorio.sincronizar_armazenamento)
+                    await self._assumir()
+            except Exception as e:
+                logger.error(f"Erro na coordenação entre workers: {e}")
+
+    async def _atender_pedido(self) -> None:
+        """Executa a atualização pedida por um seguidor e grava o resultado"""
+        pedido = self._ler_json(self._arquivo_pedido).get("pedido", 0)
+        if pedido <= self._ultimo_pedido:
+            return
+
+        self._ultimo_pedido = pedido
+        logger.info("Atualização solicitada por outro worker")
+        erro = None
+        try:
+            await scheduler.executar_agora(TAREFA_ATUALIZACAO)
+        except Exception as e:
+            erro = str(e)
+
+        self._escrever_json(
+            self._arquivo_resposta,
+            {"pedido": pedido, "versao": self.repositorio.versao, "erro": erro},
+        )
+
+    async def solicitar_atualizacao(self) -> None:
+        """
+        Seguidor: pede uma atualização ao líder e aguarda a nova versão
+
+        Pedidos simultâneos de vários seguidores são atendidos por uma única
+        atualização.
+
+        Raises:
+            RuntimeError: Se a atualização falhar no líder ou não for atendida a tempo
+        """
+        pedido = time.time_ns()
+        self._escrever_json(self._arquivo_pedido, {"pedido": pedido})
+
+        limite = time.monotonic() + self.limite_pedido
+        while time.monotonic() < limite:
+            await asyncio.sleep(0.5)
+            resposta = self._ler_json(self._arquivo_resposta)
+            if resposta.get("pedido", 0) < pedido:
+                continue
+            if resposta.get("erro"):
+                raise RuntimeError(resposta["erro"])
+            await asyncio.to_thread(self.repositorio.sincronizar_armazenamento)
+            return
+
+        raise RuntimeError("O worker responsável pelas atualizações não respondeu ao pedido")
+
+    @staticmethod
+    def _ler_json(caminho: Path) -> dict:
+        """Lê um arquivo de pedido ou resposta, retornando {} se ausente ou inválido"""
+        try:
+            return json.loads(caminho.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _escrever_json(caminho: Path, conteudo: dict) -> None:
+        """Grava o arquivo de forma atômica; o nome temporário é exclusivo do processo"""
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+        temporario.write_text(json.dumps(conteudo), encoding="utf-8")
+        os.replace(temporario, caminho)
+
+
+# Instância única do coordenador; a trava fica ao lado do banco de snapshots
+coordenador = CoordenadorWorkers(
+    repositorio,
+    Path(CANAIME_ARMAZENAMENTO_PATH + ".lider") if CANAIME_ARMAZENAMENTO_PATH else None,
+)
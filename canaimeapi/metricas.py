@@ -0,0 +1,215 @@
+"""
+Métricas Prometheus das atualizações dos dados e das requisições da API
+
+As métricas ficam no registro padrão do prometheus_client e são expostas em
+/metrics pela aplicação principal. A aplicação serverless não expõe /metrics
+(cada instância teria contadores próprios e efêmeros) e só importa este módulo
+ao executar uma atualização.
+"""
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from canaimeapi.api.limites import limitador
+
+# Fases da atualização vão de milissegundos (extração) a minutos (site lento)
+BUCKETS_FASES = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BUCKETS_REQUISICOES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Rótulo usado para requisições que não correspondem a nenhuma rota
+ROTA_DESCONHECIDA = "desconhecida"
+
+FASE_DURACAO = Histogram(
+    "canaime_atualizacao_fase_segundos",
+    "Duração de cada fase da atualização (navegador, login, pagina, extracao, snapshot)",
+    ["backend", "fase"],
+    buckets=BUCKETS_FASES,
+)
+ATUALIZACAO_DURACAO = Histogram(
+    "canaime_atualizacao_segundos",
+    "Duração total de cada atualização",
+    ["backend", "resultado"],
+    buckets=BUCKETS_FASES,
+)
+ATUALIZACOES = Counter(
+    "canaime_atualizacoes",
+    "Atualizações executadas, por resultado",
+    ["backend", "resultado"],
+)
+ULTIMO_SUCESSO = Gauge(
+    "canaime_atualizacao_ultimo_sucesso_timestamp_segundos",
+    "Horário (Unix) da última atualização concluída com sucesso",
+)
+FALHAS_CONSECUTIVAS = Gauge(
+    "canaime_atualizacao_falhas_consecutivas",
+    "Atualizações que falharam desde o último sucesso",
+)
+INTERVALO = Gauge(
+    "canaime_atualizacao_intervalo_segundos",
+    "Intervalo atual entre atualizações, ajustado à frequência de mudanças",
+)
+DISJUNTOR_ABERTO = Gauge(
+    "canaime_disjuntor_aberto",
+    "1 enquanto as atualizações estão suspensas por falhas seguidas no Canaimé",
+)
+RETENTATIVAS = Counter(
+    "canaime_retentativas",
+    "Coletas de unidade repetidas após falha transitória",
+    ["backend"],
+)
+FALHAS_UNIDADE = Counter(
+    "canaime_unidade_falhas",
+    "Unidades cuja extração falhou em uma atualização",
+    ["unidade"],
+)
+UNIDADES_INALTERADAS = Counter(
+    "canaime_unidade_inalterada",
+    "Unidades cuja página de chamada não mudou e não foi extraída novamente",
+    ["unidade"],
+)
+REGISTROS = Gauge(
+    "canaime_registros",
+    "Registros publicados no snapshot atual, por unidade",
+    ["unidade"],
+)
+ENTRADAS_MALFORMADAS = Counter(
+    "canaime_entradas_malformadas",
+    "Entradas da página de chamada com formato inesperado",
+    ["tipo"],
+)
+HTTP_DURACAO = Histogram(
+    "canaime_http_requisicao_segundos",
+    "Latência das requisições da API, por rota",
+    ["metodo", "rota"],
+    buckets=BUCKETS_REQUISICOES,
+)
+HTTP_BYTES = Histogram(
+    "canaime_http_resposta_bytes",
+    "Tamanho do corpo das respostas da API, por rota",
+    ["metodo", "rota"],
+    buckets=BUCKETS_BYTES,
+)
+HTTP_REQUISICOES = Counter(
+    "canaime_http_requisicoes",
+    "Requisições atendidas pela API, por rota e status",
+    ["metodo", "rota", "status"],
+)
+
+
+class ColetorClientes:
+    """
+    Expõe os totais do limitador de requisições, lidos na coleta
+
+    Os totais somam todos os clientes, sem rótulo com o nome de cada um, para que
+    quem lê /metrics não descubra os nomes das chaves; os contadores por cliente
+    ficam em /api/v1/clientes, restrito aos administradores.
+    """
+
+    def collect(self):
+        requisicoes = CounterMetricFamily(
+            "canaime_api_cliente_requisicoes",
+            "Requisições dos clientes da API: aceitas, limitadas (429) e recusadas (401)",
+            labels=["resultado"],
+        )
+        fichas = CounterMetricFamily(
+            "canaime_api_cliente_fichas",
+            "Fichas do limite de requisições consumidas pelos clientes",
+        )
+        clientes = GaugeMetricFamily(
+            "canaime_api_clientes",
+            "Clientes que fizeram requisições a este worker",
+        )
+        contadores = limitador.contadores().values()
+        requisicoes.add_metric(["aceita"], sum(c.aceitas for c in contadores))
+        requisicoes.add_metric(["limitada"], sum(c.limitadas for c in contadores))
+        requisicoes.add_metric(["recusada"], sum(c.recusadas for c in contadores))
+        fichas.add_metric([], sum(c.fichas_consumidas for c in contadores))
+        clientes.add_metric([], len(contadores))
+        yield requisicoes
+        yield fichas
+        yield clientes
+
+
+REGISTRY.register(ColetorClientes())
+
+
+def registrar_atualizacao(backend: str, duracao: float, sucesso: bool) -> None:
+    """
+    Registra o resultado de uma atualização completa
+
+    Args:
+        backend: Backend de scraping usado
+        duracao: Duração da atualização, em segundos
+        sucesso: Se ao menos uma unidade foi extraída e publicada
+    """
+    resultado = "sucesso" if sucesso else "falha"
+    ATUALIZACAO_DURACAO.labels(backend, resultado).observe(duracao)
+    ATUALIZACOES.labels(backend, resultado).inc()
+    if sucesso:
+        ULTIMO_SUCESSO.set(time.time())
+        FALHAS_CONSECUTIVAS.set(0)
+    else:
+        FALHAS_CONSECUTIVAS.inc()
+
+
+def gerar_metricas() -> Tuple[bytes, str]:
+    """
+    Serializa as métricas no formato de texto do Prometheus
+
+    Returns:
+        Tuple[bytes, str]: Corpo da resposta e seu Content-Type
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mede latência, status e tamanho das respostas por rota
+
+    A rota é o modelo do caminho (por exemplo /presos/{codigo}), para que
+    os rótulos não cresçam com os parâmetros das requisições.
+    """
+
+    def __init__(self, app):
+        """
+        Args:
+            app: Aplicação ASGI envolvida
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+        tamanho = 0
+
+        async def enviar(mensagem):
+            nonlocal status, tamanho
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            elif mensagem["type"] == "http.response.body":
+                tamanho += len(mensagem.get("body", b""))
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # O roteador grava a rota encontrada no próprio scope
+            rota = getattr(scope.get("route"), "path", ROTA_DESCONHECIDA)
+            metodo = scope["method"]
+            HTTP_DURACAO.labels(metodo, rota).observe(time.perf_counter() - inicio)
+            HTTP_BYTES.labels(metodo, rota).observe(tamanho)
+            HTTP_REQUISICOES.labels(metodo, rota, str(status)).inc()
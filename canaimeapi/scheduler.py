@@ -4,10 +4,7 @@ Módulo de agendamento de tarefas para atualização periódica dos dados
 import asyncio
 import logging
 from datetime import datetime
-from typing import Callable, Optional
-
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 # Configuração de logging
 logging.basicConfig(
@@ -16,19 +13,173 @@ logging.basicConfig(
 )
 logger = logging.getLogger("canaime_scheduler")
 
+# Identificador da tarefa de atualização dos dados
+TAREFA_ATUALIZACAO = "atualizar_dados"
+
+
+class IntervaloAdaptativo:
+    """
+    Intervalo entre atualizações ajustado à frequência com que os dados mudam
+
+    Para cada hora do dia é mantida uma média móvel exponencial da fração de
+    atualizações que encontraram mudanças. O intervalo vai de `maximo` (nada
+    muda) a `minimo` (toda atualização traz mudanças), usando a maior taxa entre
+    a hora atual e as horas alcançadas pelo intervalo máximo: assim ele encurta
+    antes dos horários de maior movimento, em vez de depois deles.
+    """
+
+    def __init__(self, minimo: float, maximo: float, inicial: float, peso: float = 0.3):
+        """
+        Inicializa o intervalo
+
+        Args:
+            minimo: Menor intervalo, em minutos
+            maximo: Maior intervalo, em minutos
+            inicial: Intervalo antes de qualquer observação, em minutos
+            peso: Peso de cada nova observação na média móvel (0 a 1)
+        """
+        self.minimo = minimo
+        self.maximo = max(maximo, minimo)
+        self.peso = peso
+        self.atual = min(max(inicial, self.minimo), self.maximo)
+
+        # Taxa inicial que reproduz o intervalo inicial em todas as horas
+        amplitude = self.maximo - self.minimo
+        taxa = (self.maximo - self.atual) / amplitude if amplitude else 1.0
+        self.taxas: List[float] = [taxa] * 24
+
+    def calcular(self, quando: Optional[datetime] = None) -> float:
+        """
+        Calcula o intervalo a partir das taxas de mudança observadas
+
+        Args:
+            quando: Horário de referência (padrão: agora)
+
+        Returns:
+            float: Intervalo em minutos
+        """
+        quando = quando or datetime.now()
+        horas = min(int((quando.minute + self.maximo) // 60) + 1, 24)
+        taxa = max(self.taxas[(quando.hour + i) % 24] for i in range(horas))
+        return self.maximo - taxa * (self.maximo - self.minimo)
+
+    def registrar(self, alterou: bool, quando: Optional[datetime] = None) -> float:
+        """
+        Registra o resultado de uma atualização e recalcula o intervalo
+
+        Args:
+            alterou: Se a atualização encontrou mudanças nos dados
+            quando: Horário da atualização (padrão: agora)
+
+        Returns:
+            float: Novo intervalo em minutos
+        """
+        quando = quando or datetime.now()
+        hora = quando.hour
+        self.taxas[hora] += self.peso * (float(alterou) - self.taxas[hora])
+        self.atual = self.calcular(quando)
+        return self.atual
+
+
+class TarefaUnica:
+    """
+    Garante no máximo uma execução simultânea de uma tarefa assíncrona
+
+    Disparos que chegam enquanto a tarefa está em execução são agrupados:
+    eles aguardam a execução em andamento em vez de iniciar outra.
+    """
+
+    def __init__(self, task: Callable[[], Awaitable[Any]], nome: str):
+        """
+        Inicializa a tarefa
+
+        Args:
+            task: Função assíncrona a ser executada
+            nome: Identificador usado nos logs
+        """
+        self.task = task
+        self.nome = nome
+        self._em_andamento: Optional[asyncio.Task] = None
+        self.ultima_execucao: Optional[datetime] = None
+        self.ultimo_erro: Optional[str] = None
+        # Chamada com o resultado de cada execução concluída com sucesso
+        self.ao_concluir: Optional[Callable[[Any], None]] = None
+
+    @property
+    def em_andamento(self) -> bool:
+        """Indica se há uma execução em andamento"""
+        return self._em_andamento is not None and not self._em_andamento.done()
+
+    def disparar(self) -> "asyncio.Task":
+        """
+        Inicia uma execução, ou retorna a que já está em andamento
+
+        Returns:
+            asyncio.Task: Execução que o chamador pode aguardar
+        """
+        if self.em_andamento:
+            logger.info(f"Tarefa '{self.nome}' já em execução; disparo agrupado")
+            return self._em_andamento
+
+        self._em_andamento = asyncio.create_task(self._executar())
+        # Evita o aviso de exceção não recuperada quando ninguém aguarda a execução
+        self._em_andamento.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._em_andamento
+
+    async def executar(self) -> Any:
+        """
+        Executa a tarefa (ou aguarda a execução em andamento) e retorna o resultado
+
+        O cancelamento de quem aguarda não cancela a execução compartilhada.
+        """
+        return await asyncio.shield(self.disparar())
+
+    async def _executar(self) -> Any:
+        """Executa a tarefa registrando horário e erro da última execução"""
+        logger.info(f"Execução da tarefa '{self.nome}' iniciada")
+        try:
+            resultado = await self.task()
+            self.ultimo_erro = None
+            if self.ao_concluir is not None:
+                self.ao_concluir(resultado)
+            return resultado
+        except Exception as e:
+            self.ultimo_erro = str(e)
+            logger.error(f"Erro na execução da tarefa '{self.nome}': {e}")
+            raise
+        finally:
+            self.ultima_execucao = datetime.now()
+
+    async def executar_agendada(self) -> None:
+        """Execução disparada pelo agendador; erros já foram registrados no log"""
+        try:
+            await self.executar()
+        except Exception:
+            pass
+
 
 class TaskScheduler:
     """Classe responsável por agendar a execução periódica de tarefas"""
     
     def __init__(self):
         """Inicializa o agendador de tarefas"""
-        self.scheduler = AsyncIOScheduler()
+        # Criado na primeira utilização, para que importar este módulo não carregue o APScheduler
+        self.scheduler = None
         self.running = False
+        self.tarefas: Dict[str, TarefaUnica] = {}
+
+    def _obter_agendador(self):
+        """Retorna o AsyncIOScheduler, importando o APScheduler na primeira chamada"""
+        if self.scheduler is None:
+            from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+            self.scheduler = AsyncIOScheduler()
+        return self.scheduler
         
     async def start(self):
         """Inicia o agendador de tarefas"""
         if not self.running:
-            self.scheduler.start()
+            self._obter_agendador().start()
             self.running = True
             logger.info("Agendador de tarefas iniciado")
             
@@ -39,41 +190,117 @@ class TaskScheduler:
             self.running = False
             logger.info("Agendador de tarefas parado")
             
+    def registrar_tarefa(self, task: Callable[[], Awaitable[Any]], id: str) -> TarefaUnica:
+        """
+        Registra uma tarefa executada apenas sob demanda, sem agendamento
+
+        Args:
+            task: Função assíncrona a ser executada
+            id: Identificador da tarefa
+
+        Returns:
+            TarefaUnica: Tarefa registrada
+        """
+        tarefa = TarefaUnica(task, id)
+        self.tarefas[id] = tarefa
+        return tarefa
+
     def add_periodic_task(
         self,
         task: Callable,
-        interval_minutes: int = 60,
+        interval_minutes: float = 60,
         id: str = None,
         start_immediately: bool = True,
+        intervalo_adaptativo: Optional[IntervaloAdaptativo] = None,
     ):
         """
         Adiciona uma tarefa periódica ao agendador
+
+        A tarefa nunca tem duas execuções simultâneas: disparos que ocorrem
+        durante uma execução aguardam o término dela.
         
         Args:
             task: Função a ser executada periodicamente
             interval_minutes: Intervalo em minutos entre as execuções
             id: Identificador da tarefa (opcional)
             start_immediately: Se True, executa a tarefa imediatamente
+            intervalo_adaptativo: Se informado, a tarefa é reagendada após cada
+                execução que retorna um bool (se os dados mudaram), com o
+                intervalo calculado por ele
+
+        Returns:
+            TarefaUnica: Tarefa registrada, que também pode ser disparada sob demanda
         """
+        from apscheduler.triggers.interval import IntervalTrigger
+
         trigger = IntervalTrigger(minutes=interval_minutes)
         job_id = id or f"task_{datetime.now().timestamp()}"
+        tarefa = self.registrar_tarefa(task, job_id)
         
-        self.scheduler.add_job(
-            task,
+        self._obter_agendador().add_job(
+            tarefa.executar_agendada,
             trigger=trigger,
             id=job_id,
             replace_existing=True,
+            max_instances=1,
+            coalesce=True,
         )
         
         logger.info(
-            f"Tarefa '{job_id}' agendada para execução a cada {interval_minutes} minutos"
+            f"Tarefa '{job_id}' agendada para execução a cada {interval_minutes:g} minutos"
         )
+
+        if intervalo_adaptativo is not None:
+            tarefa.ao_concluir = lambda resultado: self._reagendar(
+                job_id, intervalo_adaptativo, resultado
+            )
         
         # Executa a tarefa imediatamente, se solicitado
         if start_immediately:
-            asyncio.create_task(task())
+            tarefa.disparar()
             logger.info(f"Execução imediata da tarefa '{job_id}' iniciada")
 
+        return tarefa
+
+    def _reagendar(self, job_id: str, intervalo: IntervaloAdaptativo, resultado: Any) -> None:
+        """
+        Ajusta o intervalo da tarefa de acordo com o resultado da última execução
+
+        Args:
+            job_id: Identificador da tarefa
+            intervalo: Intervalo adaptativo da tarefa
+            resultado: Retorno da execução; apenas bool (se os dados mudaram) é considerado
+        """
+        if not isinstance(resultado, bool) or not self.running:
+            return
+
+        from apscheduler.jobstores.base import JobLookupError
+        from apscheduler.triggers.interval import IntervalTrigger
+
+        anterior = intervalo.atual
+        minutos = intervalo.registrar(resultado)
+        try:
+            self.scheduler.reschedule_job(job_id, trigger=IntervalTrigger(seconds=round(minutos * 60)))
+        except JobLookupError:
+            return
+        if round(minutos, 1) != round(anterior, 1):
+            logger.info(f"Intervalo da tarefa '{job_id}' ajustado para {minutos:.1f} minutos")
+
+    async def executar_agora(self, id: str) -> Any:
+        """
+        Executa uma tarefa registrada sob demanda, agrupando com a execução em andamento
+
+        Args:
+            id: Identificador da tarefa
+
+        Returns:
+            Any: Resultado da execução
+
+        Raises:
+            KeyError: Se a tarefa não estiver registrada
+        """
+        return await self.tarefas[id].executar()
+
 
 # Instância única do agendador para ser usada em toda a aplicação
 scheduler = TaskScheduler() 
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Armazenamento durável dos snapshots em SQLite, para servir dados logo após reiniciar
+
+O mesmo banco guarda o histórico temporal dos presos (ver `historico`), atualizado
+na transação que grava cada snapshot.
+"""
+import json
+import logging
+import sqlite3
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from canaimeapi.scraper import historico
+
+logger = logging.getLogger("canaime_scraper")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    versao INTEGER PRIMARY KEY,
+    atualizado_em TEXT NOT NULL,
+    ultima_atualizacao TEXT NOT NULL,
+    atualizacoes_unidades TEXT NOT NULL,
+    registros BLOB NOT NULL
+)
+"""
+
+
+@dataclass
+class SnapshotSalvo:
+    """Snapshot persistido: registros em JSON e metadados da atualização"""
+
+    versao: int
+    atualizado_em: datetime
+    ultima_atualizacao: str
+    atualizacoes_unidades: Dict[str, str]
+    registros_json: str
+
+
+class ArmazenamentoSnapshots:
+    """Grava e lê snapshots em um banco SQLite local"""
+
+    def __init__(self, caminho: Path, manter: Optional[int] = 3):
+        """
+        Inicializa o armazenamento
+
+        Args:
+            caminho: Arquivo do banco SQLite
+            manter: Quantidade de snapshots mantidos no banco (None mantém todos)
+        """
+        self.caminho = Path(caminho)
+        self.manter = manter
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre uma conexão com o banco, criando as tabelas se necessário"""
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute(ESQUEMA)
+        historico.criar_tabelas(conexao)
+        return conexao
+
+    @staticmethod
+    def _linha(snapshot: SnapshotSalvo) -> Tuple:
+        """Valores da linha do snapshot na tabela, com os registros comprimidos"""
+        return (
+            snapshot.versao,
+            snapshot.atualizado_em.isoformat(),
+            snapshot.ultima_atualizacao,
+            json.dumps(snapshot.atualizacoes_unidades),
+            zlib.compress(snapshot.registros_json.encode("utf-8"), 6),
+        )
+
+    def _remover_antigos(self, conexao: sqlite3.Connection) -> None:
+        """Remove os snapshots além dos `manter` mais recentes"""
+        if self.manter is not None:
+            conexao.execute(
+                "DELETE FROM snapshots WHERE versao NOT IN "
+                "(SELECT versao FROM snapshots ORDER BY versao DESC LIMIT ?)",
+                (self.manter,),
+            )
+
+    def _gravar(
+        self,
+        conexao: sqlite3.Connection,
+        snapshot: SnapshotSalvo,
+        vigentes: Optional[historico.Vigentes] = None,
+    ) -> Tuple[int, historico.Vigentes]:
+        """
+        Grava a linha do snapshot e o incorpora ao histórico temporal
+
+        Args:
+            conexao: Conexão dentro da transação
+            snapshot: Snapshot a gravar
+            vigentes: Intervalos vigentes do histórico, se já carregados
+
+        Returns:
+            Tuple: Tamanho dos registros comprimidos e os intervalos vigentes atualizados
+        """
+        linha = self._linha(snapshot)
+        conexao.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)", linha)
+        vigentes = historico.registrar_snapshot(
+            conexao,
+            snapshot.versao,
+            snapshot.atualizado_em,
+            json.loads(snapshot.registros_json),
+            vigentes,
+        )
+        return len(linha[4]), vigentes
+
+    def salvar(self, snapshot: SnapshotSalvo) -> None:
+        """
+        Grava o snapshot, atualiza o histórico e remove os snapshots mais antigos
+        em uma única transação
+
+        Leitores nunca veem um snapshot gravado pela metade.
+
+        Args:
+            snapshot: Snapshot a gravar
+        """
+        conexao = self._conectar()
+        try:
+            with conexao:
+                tamanho, _ = self._gravar(conexao, snapshot)
+                self._remover_antigos(conexao)
+        finally:
+            conexao.close()
+
+        logger.info(f"Snapshot {snapshot.versao} salvo em {self.caminho} ({tamanho} bytes)")
+
+    def salvar_varios(self, snapshots: Iterable[SnapshotSalvo]) -> int:
+        """
+        Grava uma sequência de snapshots em uma única transação
+
+        Os snapshots são comprimidos à medida que são consumidos, sem manter todos
+        em memória, e os intervalos vigentes do histórico são mantidos entre eles.
+        Usado ao reconstruir o histórico a partir das páginas arquivadas.
+
+        Args:
+            snapshots: Snapshots a gravar, em ordem de versão
+
+        Returns:
+            int: Quantidade de snapshots gravados
+        """
+        gravados = 0
+        conexao = self._conectar()
+        try:
+            with conexao:
+                vigentes = None
+                for snapshot in snapshots:
+                    _, vigentes = self._gravar(conexao, snapshot, vigentes)
+                    gravados += 1
+                self._remover_antigos(conexao)
+        finally:
+            conexao.close()
+
+        logger.info(f"{gravados} snapshots salvos em {self.caminho}")
+        return gravados
+
+    def dados_em(
+        self, quando: datetime, unidade: Optional[str] = None
+    ) -> Optional[List[Dict[str, Optional[str]]]]:
+        """
+        Consulta no histórico temporal os presos como estavam em um instante
+
+        Args:
+            quando: Instante consultado
+            unidade: Restringe o resultado a uma unidade
+
+        Returns:
+            Optional[List[Dict]]: Registros no formato de /dados, ou None se não há
+                histórico para o instante
+        """
+        if not self.caminho.exists():
+            return None
+
+        conexao = self._conectar()
+        try:
+            return historico.consultar_em(conexao, quando, unidade)
+        finally:
+            conexao.close()
+
+    def historico_preso(self, codigo: str) -> List[Dict[str, Optional[str]]]:
+        """
+        Consulta os intervalos de Unidade, Ala, Cela, Foto e Nome de um preso
+
+        Args:
+            codigo: Código do preso
+
+        Returns:
+            List[Dict]: Intervalos do mais antigo ao vigente (vazia se o preso não
+                aparece no histórico)
+        """
+        if not self.caminho.exists():
+            return []
+
+        conexao = self._conectar()
+        try:
+            return historico.consultar_preso(conexao, codigo)
+        finally:
+            conexao.close()
+
+    def versao_mais_recente(self) -> Optional[int]:
+        """
+        Consulta apenas a versão do snapshot mais recente, sem ler os registros
+
+        Returns:
+            Optional[int]: Versão mais recente, ou None se o banco estiver vazio
+        """
+        if not self.caminho.exists():
+            return None
+
+        conexao = self._conectar()
+        try:
+            (versao,) = conexao.execute("SELECT MAX(versao) FROM snapshots").fetchone()
+        finally:
+            conexao.close()
+        return versao
+
+    def carregar_ultimo(self) -> Optional[SnapshotSalvo]:
+        """
+        Lê o snapshot mais recente
+
+        Returns:
+            Optional[SnapshotSalvo]: Snapshot salvo, ou None se o banco estiver vazio
+        """
+        if not self.caminho.exists():
+            return None
+
+        conexao = self._conectar()
+        try:
+            linha = conexao.execute(
+                "SELECT versao, atualizado_em, ultima_atualizacao, atualizacoes_unidades, registros "
+                "FROM snapshots ORDER BY versao DESC LIMIT 1"
+            ).fetchone()
+        finally:
+            conexao.close()
+
+        if linha is None:
+            return None
+
+        versao, atualizado_em, ultima_atualizacao, atualizacoes_unidades, registros = linha
+        return SnapshotSalvo(
+            versao=versao,
+            atualizado_em=datetime.fromisoformat(atualizado_em),
+            ultima_atualizacao=ultima_atualizacao,
+            atualizacoes_unidades=json.loads(atualizacoes_unidades),
+            registros_json=zlib.decompress(registros).decode("utf-8"),
+        )
@@ -0,0 +1,195 @@
+"""
+Arquivo comprimido das páginas de chamada obtidas do Canaimé
+
+Cada página é gravada uma única vez, comprimida com Brotli, em um arquivo cujo nome
+é o hash do seu conteúdo; páginas repetidas entre atualizações ocupam espaço apenas
+uma vez. Um índice SQLite registra, para cada atualização, o hash da página obtida
+de cada unidade, o que permite refazer a extração e reconstruir os snapshots sem
+acessar o site novamente (`python -m canaimeapi.scraper.reprocessar`).
+"""
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import brotli
+
+from canaimeapi.scraper.config import CANAIME_ARQUIVO_QUALIDADE
+from canaimeapi.scraper.parser import hash_conteudo
+
+logger = logging.getLogger("canaime_scraper")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS coletas (
+    coletado_em TEXT NOT NULL,
+    unidade TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (coletado_em, unidade)
+)
+"""
+
+
+def _instante(quando: datetime) -> str:
+    """Instante em UTC no formato ISO, comparável como texto no índice"""
+    return quando.astimezone(timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class ColetaArquivada:
+    """Página de chamada de uma unidade obtida em uma atualização"""
+
+    # Início da atualização (UTC); igual para todas as unidades da mesma atualização
+    coletado_em: datetime
+    unidade: str
+    hash: str
+
+
+class ArquivoPaginas:
+    """Grava e lê as páginas de chamada arquivadas, endereçadas pelo hash do conteúdo"""
+
+    def __init__(self, diretorio: Path, qualidade: int = CANAIME_ARQUIVO_QUALIDADE):
+        """
+        Inicializa o arquivo
+
+        Args:
+            diretorio: Diretório das páginas e do índice
+            qualidade: Nível de compressão Brotli (0 a 11)
+        """
+        self.diretorio = Path(diretorio)
+        self.qualidade = qualidade
+
+    @property
+    def caminho_indice(self) -> Path:
+        """Banco SQLite com as coletas de cada atualização"""
+        return self.diretorio / "indice.sqlite3"
+
+    def caminho_pagina(self, hash_pagina: str) -> Path:
+        """Arquivo da página com o hash informado, em subdiretórios pelos dois primeiros dígitos"""
+        return self.diretorio / "paginas" / hash_pagina[:2] / f"{hash_pagina}.html.br"
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre uma conexão com o índice, criando a tabela se necessário"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho_indice, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute(ESQUEMA)
+        return conexao
+
+    def _gravar_pagina(self, html: str) -> Tuple[str, bool]:
+        """
+        Grava a página se ela ainda não estiver no arquivo
+
+        Args:
+            html: Conteúdo da página
+
+        Returns:
+            Tuple[str, bool]: Hash da página e se ela foi gravada agora
+        """
+        hash_pagina = hash_conteudo(html)
+        caminho = self.caminho_pagina(hash_pagina)
+        if caminho.exists():
+            return hash_pagina, False
+
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+        temporario.write_bytes(brotli.compress(html.encode("utf-8"), quality=self.qualidade))
+        os.replace(temporario, caminho)
+        return hash_pagina, True
+
+    def guardar(self, coletado_em: datetime, paginas: Dict[str, str]) -> int:
+        """
+        Arquiva as páginas obtidas em uma atualização e as registra no índice
+
+        A página é gravada antes da linha do índice: uma coleta registrada sempre
+        tem a página correspondente no disco.
+
+        Args:
+            coletado_em: Início da atualização (UTC)
+            paginas: HTML da página de chamada de cada unidade
+
+        Returns:
+            int: Quantidade de páginas novas gravadas
+        """
+        linhas = []
+        novas = 0
+        for unidade, html in paginas.items():
+            hash_pagina, nova = self._gravar_pagina(html)
+            novas += nova
+            linhas.append((_instante(coletado_em), unidade, hash_pagina))
+
+        conexao = self._conectar()
+        try:
+            with conexao:
+                conexao.executemany("INSERT OR REPLACE INTO coletas VALUES (?, ?, ?)", linhas)
+        finally:
+            conexao.close()
+
+        logger.info(f"{len(linhas)} páginas de chamada arquivadas ({novas} novas) em {self.diretorio}")
+        return novas
+
+    def ler(self, hash_pagina: str) -> str:
+        """
+        Lê uma página arquivada
+
+        Args:
+            hash_pagina: Hash do conteúdo da página
+
+        Returns:
+            str: HTML da página
+
+        Raises:
+            FileNotFoundError: Se a página não estiver no arquivo
+        """
+        return brotli.decompress(self.caminho_pagina(hash_pagina).read_bytes()).decode("utf-8")
+
+    def coletas(
+        self,
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        unidades: Optional[Iterable[str]] = None,
+    ) -> List[ColetaArquivada]:
+        """
+        Lista as coletas registradas, em ordem cronológica
+
+        Args:
+            desde: Inclui apenas atualizações a partir deste instante
+            ate: Inclui apenas atualizações até este instante
+            unidades: Inclui apenas estas unidades
+
+        Returns:
+            List[ColetaArquivada]: Coletas ordenadas pelo início da atualização e, dentro
+                dela, na ordem das unidades configuradas
+        """
+        if not self.caminho_indice.exists():
+            return []
+
+        condicoes, parametros = [], []
+        if desde is not None:
+            condicoes.append("coletado_em >= ?")
+            parametros.append(_instante(desde))
+        if ate is not None:
+            condicoes.append("coletado_em <= ?")
+            parametros.append(_instante(ate))
+        if unidades is not None:
+            unidades = list(unidades)
+            condicoes.append(f"unidade IN ({', '.join('?' * len(unidades))})")
+            parametros.extend(unidades)
+        filtro = f"WHERE {' AND '.join(condicoes)} " if condicoes else ""
+
+        conexao = self._conectar()
+        try:
+            linhas = conexao.execute(
+                f"SELECT coletado_em, unidade, hash FROM coletas {filtro}"
+                "ORDER BY coletado_em, rowid",
+                parametros,
+            ).fetchall()
+        finally:
+            conexao.close()
+
+        return [
+            ColetaArquivada(datetime.fromisoformat(coletado_em), unidade, hash_pagina)
+            for coletado_em, unidade, hash_pagina in linhas
+        ]
@@ -0,0 +1,219 @@
+"""
+Gerenciamento do navegador Chromium mantido aberto entre as atualizações
+
+O perfil enxuto (padrão) inicia o Chromium com poucas flags, sem carregar imagens
+e sem cache em disco, com uma janela pequena, e bloqueia folhas de estilo, fontes
+e mídia por padrões de URL registrados uma vez no contexto. A comparação com os
+padrões é feita pelo próprio Playwright: requisições que não casam nunca passam
+pelo Python. O perfil padrao reproduz a configuração anterior, em que cada
+requisição passava por um callback em Python que decidia pelo tipo do recurso.
+"""
+import asyncio
+import logging
+import os
+import re
+from pathlib import Path
+from typing import List, Optional
+
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Playwright,
+    Request,
+    Route,
+    async_playwright,
+)
+
+from canaimeapi.metricas import FASE_DURACAO
+from canaimeapi.scraper.config import CANAIME_HEADLESS, CANAIME_NAVEGADOR_PERFIL
+
+logger = logging.getLogger("canaime_scraper")
+
+PERFIL_ENXUTO = "enxuto"
+PERFIL_PADRAO = "padrao"
+PERFIS = (PERFIL_ENXUTO, PERFIL_PADRAO)
+
+# Flags do perfil enxuto, além das que o Playwright já passa (sem extensões, sem
+# sincronização, sem tarefas de rede em segundo plano etc.)
+ARGUMENTOS_ENXUTO = (
+    # As imagens nem chegam a ser requisitadas; o src das fotos continua no DOM
+    "--blink-settings=imagesEnabled=false",
+    "--disable-gpu",
+    # Em contêineres o /dev/shm costuma ser pequeno
+    "--disable-dev-shm-usage",
+    # Cada atualização precisa da página nova: o cache em disco só gastaria escrita
+    "--disk-cache-size=1",
+    "--media-cache-size=1",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+)
+# Janela pequena: a extração lê o DOM e não depende do layout
+VIEWPORT_ENXUTO = {"width": 800, "height": 600}
+# Recursos que a extração não usa, reconhecidos pela extensão na URL
+URLS_BLOQUEADAS = re.compile(
+    r"\.(?:css|woff2?|ttf|otf|eot|png|jpe?g|gif|webp|bmp|ico|svg|mp3|mp4|webm|ogg)(?:[?#]|$)",
+    re.IGNORECASE,
+)
+# Tipos de recurso bloqueados pelo callback do perfil padrao
+TIPOS_BLOQUEADOS = ("image", "media", "font")
+
+
+def argumentos_chromium(perfil: str) -> List[str]:
+    """Flags de inicialização do Chromium para o perfil"""
+    return list(ARGUMENTOS_ENXUTO) if perfil == PERFIL_ENXUTO else []
+
+
+async def _abortar(route: Route) -> None:
+    """Aborta uma requisição que casou com URLS_BLOQUEADAS"""
+    await route.abort()
+
+
+async def _bloquear_por_tipo(route: Route, request: Request) -> None:
+    """Decide, para cada requisição, se ela é bloqueada pelo tipo do recurso (perfil padrao)"""
+    if request.resource_type in TIPOS_BLOQUEADOS:
+        logger.debug(f"Bloqueando recurso: {request.url}")
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def iniciar_chromium(playwright: Playwright, headless: bool, perfil: str) -> Browser:
+    """
+    Inicia o Chromium com as flags do perfil
+
+    Args:
+        playwright: Instância do Playwright já iniciada
+        headless: Executa o navegador sem interface gráfica
+        perfil: PERFIL_ENXUTO ou PERFIL_PADRAO
+
+    Returns:
+        Browser: Navegador iniciado
+    """
+    return await playwright.chromium.launch(headless=headless, args=argumentos_chromium(perfil))
+
+
+async def criar_contexto(
+    browser: Browser, perfil: str, storage_state: Optional[str] = None
+) -> BrowserContext:
+    """
+    Cria um contexto com JavaScript desativado e o bloqueio de recursos do perfil
+
+    Args:
+        browser: Navegador iniciado por `iniciar_chromium`
+        perfil: PERFIL_ENXUTO ou PERFIL_PADRAO
+        storage_state: Arquivo da sessão salva (opcional)
+
+    Returns:
+        BrowserContext: Contexto pronto para abrir as páginas
+    """
+    if perfil == PERFIL_ENXUTO:
+        context = await browser.new_context(
+            java_script_enabled=False,  # Desativa JavaScript
+            storage_state=storage_state,
+            viewport=VIEWPORT_ENXUTO,
+            service_workers="block",
+        )
+        await context.route(URLS_BLOQUEADAS, _abortar)
+    else:
+        context = await browser.new_context(
+            java_script_enabled=False,  # Desativa JavaScript
+            storage_state=storage_state,
+        )
+        await context.route("**/*", _bloquear_por_tipo)
+    return context
+
+
+class NavegadorPersistente:
+    """Mantém o navegador aberto e a sessão autenticada salva em disco"""
+
+    def __init__(self, sessao_path: Path, perfil: str = CANAIME_NAVEGADOR_PERFIL):
+        """
+        Inicializa o gerenciador do navegador
+
+        Args:
+            sessao_path: Arquivo onde o storage_state da sessão autenticada é salvo
+            perfil: Perfil de inicialização do Chromium (PERFIL_ENXUTO ou PERFIL_PADRAO)
+
+        Raises:
+            ValueError: Se o perfil for desconhecido
+        """
+        if perfil not in PERFIS:
+            raise ValueError(f"Perfil do navegador desconhecido: {perfil}")
+        self.sessao_path = Path(sessao_path)
+        self.perfil = perfil
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._context: Optional[BrowserContext] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        """Indica se o navegador está aberto e conectado"""
+        return self._browser is not None and self._browser.is_connected()
+
+    async def obter_contexto(self, headless: bool = CANAIME_HEADLESS) -> BrowserContext:
+        """
+        Retorna o contexto do navegador, iniciando o Chromium se necessário
+
+        O contexto é criado a partir da sessão salva em disco, quando existir,
+        para que o login não precise ser refeito.
+
+        Args:
+            headless: Executa o navegador sem interface gráfica
+
+        Returns:
+            BrowserContext: Contexto com JavaScript desativado e bloqueio de recursos
+        """
+        async with self._lock:
+            if not self.ativo:
+                await self._encerrar()
+                logger.info(f"Iniciando o navegador Chromium (perfil {self.perfil})")
+                with FASE_DURACAO.labels("playwright", "navegador").time():
+                    self._playwright = await async_playwright().start()
+                    self._browser = await iniciar_chromium(self._playwright, headless, self.perfil)
+
+            if self._context is None:
+                storage_state = str(self.sessao_path) if self.sessao_path.exists() else None
+                if storage_state:
+                    logger.info(f"Reutilizando sessão salva em {self.sessao_path}")
+                self._context = await criar_contexto(self._browser, self.perfil, storage_state)
+
+            return self._context
+
+    async def salvar_sessao(self) -> None:
+        """Salva o storage_state do contexto atual para reutilizar o login"""
+        if self._context is None:
+            return
+        self.sessao_path.parent.mkdir(parents=True, exist_ok=True)
+        await self._context.storage_state(path=str(self.sessao_path))
+        os.chmod(self.sessao_path, 0o600)
+        logger.info(f"Sessão autenticada salva em {self.sessao_path}")
+
+    async def descartar_contexto(self) -> None:
+        """Fecha o contexto atual; o próximo será criado a partir da sessão salva"""
+        async with self._lock:
+            if self._context is not None:
+                try:
+                    await self._context.close()
+                except Exception as e:
+                    logger.warning(f"Erro ao fechar o contexto do navegador: {e}")
+                self._context = None
+
+    async def fechar(self) -> None:
+        """Fecha o navegador e encerra o Playwright"""
+        async with self._lock:
+            await self._encerrar()
+
+    async def _encerrar(self) -> None:
+        """Libera contexto, navegador e Playwright (deve ser chamado com o lock)"""
+        for recurso in (self._context, self._browser):
+            if recurso is not None:
+                try:
+                    await recurso.close()
+                except Exception as e:
+                    logger.warning(f"Erro ao fechar o navegador: {e}")
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+        self._context = None
+        self._browser = None
+        self._playwright = None
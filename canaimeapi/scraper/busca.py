@@ -0,0 +1,149 @@
+"""
+Índice de busca aproximada por nome, insensível a acentos e maiúsculas
+
+O numpy é importado apenas ao construir o índice e ao buscar, como o pandas em
+`TabelaPresos.para_dataframe`: quem não atende /busca não paga a importação.
+"""
+import heapq
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from canaimeapi.scraper.tabela import TabelaPresos
+
+# Similaridade mínima (coeficiente de Dice entre trigramas) para um nome ser retornado
+LIMIAR_SIMILARIDADE = 0.3
+# Bônus para nomes que contêm o termo buscado por inteiro
+BONUS_SUBSTRING = 0.2
+
+NAO_ALFANUMERICO_RE = re.compile(r"[^0-9A-Z]+")
+
+
+def dobrar_texto(texto: Optional[str]) -> str:
+    """
+    Remove acentos, converte para maiúsculas e reduz separadores a um espaço
+
+    Segue a ideia de `normalize_text` do processamento da página, mas para busca:
+    "José da Conceição" e "JOSE DA CONCEICAO" produzem o mesmo texto.
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        str: Texto dobrado
+    """
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return NAO_ALFANUMERICO_RE.sub(" ", sem_acentos.upper()).strip()
+
+
+def trigramas(texto_dobrado: str) -> FrozenSet[str]:
+    """
+    Gera os trigramas de cada palavra, com espaços de preenchimento nas bordas
+
+    Args:
+        texto_dobrado: Texto já processado por `dobrar_texto`
+
+    Returns:
+        FrozenSet[str]: Conjunto de trigramas
+    """
+    resultado = set()
+    for palavra in texto_dobrado.split():
+        preenchida = f"  {palavra} "
+        resultado.update(preenchida[i:i + 3] for i in range(len(preenchida) - 2))
+    return frozenset(resultado)
+
+
+class IndiceNomes:
+    """Índice invertido de trigramas dos nomes, construído na primeira busca de cada snapshot"""
+
+    def __init__(self, tabela: TabelaPresos, campo: str = "Nome"):
+        """
+        Constrói as listas de posições por trigrama
+
+        Args:
+            tabela: Registros do snapshot
+            campo: Campo com o nome a indexar
+        """
+        import numpy as np
+
+        self.tabela = tabela
+        self._nomes: List[str] = []
+        tamanhos: List[int] = []
+        postings: Dict[str, List[int]] = {}
+
+        for posicao, valor in enumerate(tabela.coluna(campo)):
+            nome = dobrar_texto(valor)
+            tris = trigramas(nome)
+            self._nomes.append(nome)
+            tamanhos.append(len(tris))
+            for tri in tris:
+                postings.setdefault(tri, []).append(posicao)
+
+        self._postings = {tri: np.asarray(posicoes, dtype=np.int32) for tri, posicoes in postings.items()}
+        self._tamanhos = np.asarray(tamanhos, dtype=np.float32)
+
+        # Unidade de cada registro como inteiro, para filtrar sem percorrer strings
+        self._codigos_unidade: Dict[str, int] = {}
+        self._unidades = np.asarray(
+            [
+                self._codigos_unidade.setdefault(unidade, len(self._codigos_unidade))
+                for unidade in tabela.coluna("Unidade")
+            ],
+            dtype=np.int16,
+        )
+
+    def buscar(
+        self,
+        termo: str,
+        limite: int = 20,
+        unidade: Optional[str] = None,
+    ) -> List[Tuple[float, int]]:
+        """
+        Busca os nomes mais parecidos com o termo
+
+        A pontuação é o coeficiente de Dice entre os trigramas do termo e do nome,
+        calculado de forma vetorizada sobre todas as listas de posições; nomes que
+        contêm o termo por inteiro recebem um bônus.
+
+        Args:
+            termo: Nome ou parte do nome, com ou sem acentos
+            limite: Quantidade máxima de resultados
+            unidade: Restringe a busca a uma unidade prisional (opcional)
+
+        Returns:
+            List[Tuple[float, int]]: Pares (pontuação, posição) em ordem decrescente
+        """
+        import numpy as np
+
+        termo = dobrar_texto(termo)
+        tris_termo = trigramas(termo)
+        listas = [self._postings[tri] for tri in tris_termo if tri in self._postings]
+        if not listas:
+            return []
+
+        comuns = np.bincount(np.concatenate(listas), minlength=len(self.tabela))
+        pontuacoes = 2 * comuns / (len(tris_termo) + self._tamanhos)
+
+        if unidade is not None:
+            codigo = self._codigos_unidade.get(unidade)
+            if codigo is None:
+                return []
+            pontuacoes[self._unidades != codigo] = 0
+
+        # Apenas os melhores candidatos recebem o bônus e são reordenados
+        candidatos = np.flatnonzero(pontuacoes >= LIMIAR_SIMILARIDADE - BONUS_SUBSTRING)
+        if len(candidatos) > limite * 4:
+            melhores = np.argpartition(pontuacoes[candidatos], -limite * 4)[-limite * 4:]
+            candidatos = candidatos[melhores]
+
+        pontuados = []
+        for posicao in candidatos.tolist():
+            pontuacao = float(pontuacoes[posicao])
+            if termo in self._nomes[posicao]:
+                pontuacao += BONUS_SUBSTRING
+            if pontuacao >= LIMIAR_SIMILARIDADE:
+                pontuados.append((min(pontuacao, 1.0), posicao))
+
+        # Empates mantêm a ordem do snapshot
+        return heapq.nlargest(limite, pontuados, key=lambda item: (item[0], -item[1]))
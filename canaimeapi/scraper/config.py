@@ -0,0 +1,112 @@
+"""
+Configurações do scraper do Canaimé obtidas das variáveis de ambiente
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente do arquivo .env
+# Tenta carregar tanto do diretório atual quanto do diretório raiz do projeto
+load_dotenv()
+load_dotenv(Path(__file__).parents[2] / ".env")
+
+# URL do site Canaimé
+CANAIME_URL = os.getenv("CANAIME_URL", "https://canaime.com.br/sgp2rr/areas/impressoes/UND_ChamadaFOTOS_todos2.php?id_und_prisional=PAMC")
+CANAIME_LOGIN_URL = os.getenv("CANAIME_LOGIN_URL", "https://canaime.com.br/sgp2rr/login/login_principal.php")
+# URL base para fotos
+CANAIME_FOTOS_URL = os.getenv("CANAIME_FOTOS_URL", "https://canaime.com.br/sgp2rr/fotos/presos/")
+# Credenciais para login (substitua pelas credenciais reais em variáveis de ambiente)
+CANAIME_USER = os.getenv("CANAIME_USER", "usuario")
+CANAIME_PASSWORD = os.getenv("CANAIME_PASSWORD", "senha")
+# Modo de extração: "lote" (uma única chamada ao navegador) ou "item" (uma chamada por elemento)
+CANAIME_EXTRACAO = os.getenv("CANAIME_EXTRACAO", "lote")
+# Backend de scraping: "playwright" (navegador Chromium) ou "http" (httpx sem navegador)
+CANAIME_BACKEND = os.getenv("CANAIME_BACKEND", "playwright")
+# Tempo limite, em segundos, das requisições do backend HTTP
+CANAIME_HTTP_TIMEOUT = float(os.getenv("CANAIME_HTTP_TIMEOUT", "60"))
+# Tempos limite, em segundos, de cada fase da atualização e da atualização inteira (0 desativa)
+CANAIME_TIMEOUT_LOGIN_SEGUNDOS = float(os.getenv("CANAIME_TIMEOUT_LOGIN_SEGUNDOS", "60"))
+CANAIME_TIMEOUT_PAGINA_SEGUNDOS = float(os.getenv("CANAIME_TIMEOUT_PAGINA_SEGUNDOS", "120"))
+CANAIME_TIMEOUT_EXTRACAO_SEGUNDOS = float(os.getenv("CANAIME_TIMEOUT_EXTRACAO_SEGUNDOS", "120"))
+CANAIME_TIMEOUT_ATUALIZACAO_SEGUNDOS = float(os.getenv("CANAIME_TIMEOUT_ATUALIZACAO_SEGUNDOS", "900"))
+# Tentativas por unidade em falhas transitórias e espera exponencial entre elas, em segundos
+CANAIME_TENTATIVAS = max(int(os.getenv("CANAIME_TENTATIVAS", "3")), 1)
+CANAIME_RETENTATIVA_BASE_SEGUNDOS = float(os.getenv("CANAIME_RETENTATIVA_BASE_SEGUNDOS", "2"))
+CANAIME_RETENTATIVA_MAX_SEGUNDOS = float(os.getenv("CANAIME_RETENTATIVA_MAX_SEGUNDOS", "30"))
+# Atualizações seguidas com falha que suspendem novas tentativas (0 desativa), e por quanto tempo
+CANAIME_DISJUNTOR_FALHAS = int(os.getenv("CANAIME_DISJUNTOR_FALHAS", "3"))
+CANAIME_DISJUNTOR_ESPERA_SEGUNDOS = float(os.getenv("CANAIME_DISJUNTOR_ESPERA_SEGUNDOS", "300"))
+CANAIME_DISJUNTOR_ESPERA_MAX_SEGUNDOS = float(os.getenv("CANAIME_DISJUNTOR_ESPERA_MAX_SEGUNDOS", "3600"))
+# Idade, em minutos, a partir da qual o /status considera os dados desatualizados
+CANAIME_DADOS_VALIDADE_MINUTOS = float(os.getenv("CANAIME_DADOS_VALIDADE_MINUTOS", "180"))
+# Mantém o navegador aberto entre as atualizações (backend playwright)
+CANAIME_NAVEGADOR_PERSISTENTE = os.getenv("CANAIME_NAVEGADOR_PERSISTENTE", "true").lower() == "true"
+# Executa o Chromium sem interface gráfica
+CANAIME_HEADLESS = os.getenv("CANAIME_HEADLESS", "true").lower() == "true"
+# Perfil do Chromium: enxuto (flags mínimas, sem imagens, bloqueio por URL) ou padrao
+CANAIME_NAVEGADOR_PERFIL = os.getenv("CANAIME_NAVEGADOR_PERFIL", "enxuto").lower()
+# Arquivo onde a sessão autenticada (storage_state) é salva para evitar novos logins
+CANAIME_SESSAO_PATH = Path(
+    os.getenv("CANAIME_SESSAO_PATH", str(Path(tempfile.gettempdir()) / "canaime_sessao.json"))
+)
+
+
+def _unidade_da_url(url: str) -> str:
+    """Retorna a unidade prisional indicada no parâmetro id_und_prisional da URL"""
+    return parse_qs(urlsplit(url).query).get("id_und_prisional", ["PAMC"])[0]
+
+
+# Unidades prisionais extraídas a cada atualização (separadas por vírgula)
+CANAIME_UNIDADES: List[str] = [
+    unidade.strip().upper()
+    for unidade in os.getenv("CANAIME_UNIDADES", _unidade_da_url(CANAIME_URL)).split(",")
+    if unidade.strip()
+]
+# Quantidade máxima de páginas (ou requisições) abertas ao mesmo tempo
+CANAIME_MAX_PAGINAS = int(os.getenv("CANAIME_MAX_PAGINAS", "4"))
+# Banco SQLite onde os snapshots são gravados (vazio desativa o armazenamento)
+CANAIME_ARMAZENAMENTO_PATH = os.getenv(
+    "CANAIME_ARMAZENAMENTO_PATH", str(Path(tempfile.gettempdir()) / "canaime_snapshots.sqlite3")
+)
+# Diretório do arquivo comprimido das páginas de chamada obtidas (vazio desativa) e o
+# nível de compressão Brotli (0 a 11) usado ao gravá-las
+CANAIME_ARQUIVO_PATH = os.getenv(
+    "CANAIME_ARQUIVO_PATH", str(Path(tempfile.gettempdir()) / "canaime_arquivo")
+)
+CANAIME_ARQUIVO_QUALIDADE = int(os.getenv("CANAIME_ARQUIVO_QUALIDADE", "9"))
+# Intervalo, em segundos, em que workers seguidores procuram novas versões no banco
+# e disputam a atualização caso o worker responsável termine (uvicorn --workers)
+CANAIME_WORKERS_SINCRONIZAR_SEGUNDOS = float(os.getenv("CANAIME_WORKERS_SINCRONIZAR_SEGUNDOS", "2"))
+# Quantidade de versões cujas alterações ficam disponíveis em /changes
+CANAIME_HISTORICO_VERSOES = int(os.getenv("CANAIME_HISTORICO_VERSOES", "500"))
+# Diretório do cache de fotos (vazio desativa /fotos) e seu tamanho máximo em MB
+CANAIME_FOTOS_CACHE_PATH = os.getenv(
+    "CANAIME_FOTOS_CACHE_PATH", str(Path(tempfile.gettempdir()) / "canaime_fotos")
+)
+CANAIME_FOTOS_CACHE_MB = int(os.getenv("CANAIME_FOTOS_CACHE_MB", "512"))
+# Idade, em segundos, a partir da qual uma foto em cache é revalidada no Canaimé
+CANAIME_FOTOS_REVALIDAR_SEGUNDOS = int(os.getenv("CANAIME_FOTOS_REVALIDAR_SEGUNDOS", "86400"))
+# Lado maior, em pixels, das miniaturas geradas com o Pillow (0 desativa)
+CANAIME_FOTOS_MINIATURA_PX = int(os.getenv("CANAIME_FOTOS_MINIATURA_PX", "160"))
+# Downloads simultâneos no pré-carregamento de fotos após cada atualização (0 desativa)
+CANAIME_FOTOS_PREFETCH_CONCORRENCIA = int(os.getenv("CANAIME_FOTOS_PREFETCH_CONCORRENCIA", "4"))
+
+
+def url_unidade(unidade: str) -> str:
+    """
+    Monta a URL da página de chamada de uma unidade prisional
+
+    Args:
+        unidade: Identificador da unidade (id_und_prisional)
+
+    Returns:
+        str: CANAIME_URL com o parâmetro id_und_prisional substituído
+    """
+    partes = urlsplit(CANAIME_URL)
+    query = parse_qs(partes.query, keep_blank_values=True)
+    query["id_und_prisional"] = [unidade]
+    return urlunsplit(partes._replace(query=urlencode(query, doseq=True)))
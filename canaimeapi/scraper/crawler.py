@@ -5,22 +5,65 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Dict, List, Optional
-from pathlib import Path
-
-import pandas as pd
-from dotenv import load_dotenv
-
-# Carrega variáveis de ambiente do arquivo .env
-# Tenta carregar tanto do diretório atual quanto do diretório raiz do projeto
-load_dotenv()
-load_dotenv(Path(__file__).parents[2] / ".env")
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
 # Configuração para Vercel - Definir antes de importar playwright
 os.environ["PLAYWRIGHT_BROWSERS_PATH"] = "0"
 
 # Agora importa o Playwright após configurar a variável
-from playwright.async_api import async_playwright, Page, Route, Request
+import httpx
+from playwright.async_api import BrowserContext, Page, Response
+from playwright.async_api import Error as PlaywrightError
+
+from canaimeapi.metricas import (
+    DISJUNTOR_ABERTO,
+    FALHAS_UNIDADE,
+    FASE_DURACAO,
+    REGISTROS,
+    RETENTATIVAS,
+    UNIDADES_INALTERADAS,
+    registrar_atualizacao,
+)
+from canaimeapi.scraper.arquivo import ArquivoPaginas
+from canaimeapi.scraper.browser import NavegadorPersistente
+from canaimeapi.scraper.config import (
+    CANAIME_ARQUIVO_PATH,
+    CANAIME_BACKEND,
+    CANAIME_EXTRACAO,
+    CANAIME_FOTOS_URL,
+    CANAIME_HEADLESS,
+    CANAIME_LOGIN_URL,
+    CANAIME_MAX_PAGINAS,
+    CANAIME_NAVEGADOR_PERSISTENTE,
+    CANAIME_PASSWORD,
+    CANAIME_SESSAO_PATH,
+    CANAIME_TIMEOUT_ATUALIZACAO_SEGUNDOS,
+    CANAIME_TIMEOUT_EXTRACAO_SEGUNDOS,
+    CANAIME_TIMEOUT_LOGIN_SEGUNDOS,
+    CANAIME_TIMEOUT_PAGINA_SEGUNDOS,
+    CANAIME_UNIDADES,
+    CANAIME_URL,
+    CANAIME_USER,
+    url_unidade,
+)
+from canaimeapi.scraper.http_backend import CanaimeHttpScraper
+from canaimeapi.scraper.parser import (
+    ColetaUnidade,
+    detectar_codificacao,
+    hash_conteudo,
+    normalize_text,
+    processar_entradas,
+)
+from canaimeapi.scraper.repositorio import RepositorioSnapshots, repositorio
+from canaimeapi.scraper.resiliencia import (
+    FECHADO,
+    com_retentativas,
+    disjuntor,
+    limitar_tempo,
+)
 
 # Configuração de codificação para o sistema
 # Força UTF-8 para entrada/saída padrão
@@ -37,47 +80,69 @@ logging.basicConfig(
 )
 logger = logging.getLogger("canaime_scraper")
 
-# URL do site Canaimé
-CANAIME_URL = os.getenv("CANAIME_URL", "https://canaime.com.br/sgp2rr/areas/impressoes/UND_ChamadaFOTOS_todos2.php?id_und_prisional=PAMC")
-CANAIME_LOGIN_URL = os.getenv("CANAIME_LOGIN_URL", "https://canaime.com.br/sgp2rr/login/login_principal.php")
-# URL base para fotos
-CANAIME_FOTOS_URL = os.getenv("CANAIME_FOTOS_URL", "https://canaime.com.br/sgp2rr/fotos/presos/")
-# Credenciais para login (substitua pelas credenciais reais em variáveis de ambiente)
-CANAIME_USER = os.getenv("CANAIME_USER", "usuario")
-CANAIME_PASSWORD = os.getenv("CANAIME_PASSWORD", "senha")
+# Script que lê entradas, nomes e fotos da página em uma única ida ao navegador
+JS_EXTRACAO_LOTE = """
+() => ({
+    entradas: Array.from(document.querySelectorAll('.titulobkSingCAPS'), e => e.textContent),
+    nomes: Array.from(document.querySelectorAll('.titulobkSingCAPS .titulo12bk'), e => e.textContent),
+    fotos: Array.from(document.querySelectorAll('img'), e => e.getAttribute('src')),
+})
+"""
 
 # Log das configurações para debug
 logger.info(f"CANAIME_URL: {CANAIME_URL}")
 logger.info(f"CANAIME_LOGIN_URL: {CANAIME_LOGIN_URL}")
 logger.info(f"CANAIME_USER definido: {'Sim' if CANAIME_USER else 'Não'}")
 logger.info(f"CANAIME_PASSWORD definido: {'Sim' if CANAIME_PASSWORD else 'Não'}")
+logger.info(f"CANAIME_EXTRACAO: {CANAIME_EXTRACAO}")
+logger.info(f"CANAIME_BACKEND: {CANAIME_BACKEND}")
+logger.info(f"CANAIME_UNIDADES: {', '.join(CANAIME_UNIDADES)}")
 logger.info(f"PLAYWRIGHT_BROWSERS_PATH: {os.environ.get('PLAYWRIGHT_BROWSERS_PATH')}")
 
 class CanaimeScraper:
     """Classe responsável por fazer scraping no sistema Canaimé"""
 
-    def __init__(self):
-        """Inicializa o scraper"""
-        self._dados_presos: Optional[pd.DataFrame] = None
-        self._ultima_atualizacao: Optional[str] = None
-
-    @property
-    def dados_presos(self) -> Optional[pd.DataFrame]:
-        """Retorna o DataFrame com os dados dos presos"""
-        return self._dados_presos
-
-    @property
-    def ultima_atualizacao(self) -> Optional[str]:
-        """Retorna a data e hora da última atualização"""
-        return self._ultima_atualizacao
-
-    @property
-    def dados_json(self) -> str:
-        """Retorna os dados em formato JSON"""
-        if self._dados_presos is None:
-            return "[]"
-        return self._dados_presos.to_json(orient="records", force_ascii=False)
-    
+    def __init__(
+        self,
+        modo_extracao: str = CANAIME_EXTRACAO,
+        navegador_persistente: bool = CANAIME_NAVEGADOR_PERSISTENTE,
+        unidades: Optional[List[str]] = None,
+        max_paginas: int = CANAIME_MAX_PAGINAS,
+        repositorio: Optional[RepositorioSnapshots] = None,
+        arquivo: Optional[ArquivoPaginas] = None,
+    ):
+        """
+        Inicializa o scraper
+
+        Args:
+            modo_extracao: "lote" para ler a página em uma única chamada ao navegador
+                ou "item" para ler elemento a elemento
+            navegador_persistente: Mantém o navegador aberto entre as atualizações
+            unidades: Unidades prisionais extraídas (padrão: CANAIME_UNIDADES)
+            max_paginas: Quantidade máxima de unidades extraídas ao mesmo tempo
+            repositorio: Repositório onde os snapshots são publicados
+                (padrão: um repositório próprio)
+            arquivo: Arquivo onde as páginas de chamada obtidas são guardadas
+                (padrão: CANAIME_ARQUIVO_PATH, se configurado)
+        """
+        # Onde os registros extraídos são publicados
+        self.repositorio = repositorio or RepositorioSnapshots(unidades)
+        self.unidades = unidades or list(CANAIME_UNIDADES)
+        self.max_paginas = max_paginas
+        self.modo_extracao = modo_extracao
+        self.navegador_persistente = navegador_persistente
+        self.navegador = NavegadorPersistente(CANAIME_SESSAO_PATH)
+        self.http = CanaimeHttpScraper()
+        # Evita logins simultâneos quando várias páginas detectam a sessão expirada
+        self._login_lock = asyncio.Lock()
+        self._sessao_id = 0
+        # Hash da página de chamada de cada unidade na última coleta publicada
+        self._hashes: Dict[str, str] = {}
+        # Páginas de chamada obtidas, para refazer a extração sem acessar o site
+        if arquivo is None and CANAIME_ARQUIVO_PATH:
+            arquivo = ArquivoPaginas(CANAIME_ARQUIVO_PATH)
+        self.arquivo = arquivo
+
     def normalize_text(self, text):
         """
         Normaliza textos que começam com 'REMI' e terminam com '01' ou '02' para
@@ -93,171 +158,489 @@ class CanaimeScraper:
         str
             Texto normalizado.
         """
-        if text.startswith("REMI") and text.endswith("01"):
-            logger.debug(f"Texto recebido: {text} -> Texto normalizado: REMIÇÃO01")
-            return "REMIÇÃO01"
-        elif text.startswith("REMI") and text.endswith("02"):
-            logger.debug(f"Texto recebido: {text} -> Texto normalizado: REMIÇÃO02")
-            return "REMIÇÃO02"
-        else:
-            return text
+        return normalize_text(text)
             
-    async def block_images(self, route: Route, request: Request):
-        """
-        Função para bloquear o carregamento de imagens
-        """
-        if request.resource_type in ["image", "media", "font"]:
-            logger.debug(f"Bloqueando recurso: {request.url}")
-            await route.abort()
-        else:
-            await route.continue_()
-
     async def realizar_login(self, page: Page):
         """
         Realiza o login no sistema Canaimé conforme a lógica fornecida
         
         Args:
             page: Instância da página do Playwright
+
+        Raises:
+            TimeoutError: Se o login passar de CANAIME_TIMEOUT_LOGIN_SEGUNDOS
         """
+        with FASE_DURACAO.labels("playwright", "login").time():
+            await limitar_tempo(self._enviar_login(page), CANAIME_TIMEOUT_LOGIN_SEGUNDOS, "login")
+
+    async def _enviar_login(self, page: Page) -> None:
+        """Preenche e envia o formulário de login, aguardando a navegação seguinte"""
+        limite_ms = CANAIME_TIMEOUT_LOGIN_SEGUNDOS * 1000
         logger.info(f"Acessando a página de login: {CANAIME_LOGIN_URL}")
-        await page.goto(CANAIME_LOGIN_URL, timeout=0)
-        
+        await page.goto(CANAIME_LOGIN_URL, timeout=limite_ms)
+
         logger.info("Realizando login no sistema")
         await page.locator("input[name=\"usuario\"]").click()
         await page.locator("input[name=\"usuario\"]").fill(CANAIME_USER)
         await page.locator("input[name=\"usuario\"]").press("Tab")
         await page.locator("input[name=\"senha\"]").fill(CANAIME_PASSWORD)
         await page.locator("input[name=\"senha\"]").press("Enter")
-        
+
         # Aguardar a navegação após o login
-        await page.wait_for_load_state("networkidle")
+        await page.wait_for_load_state("networkidle", timeout=limite_ms)
+
+    async def _sessao_expirada(self, page: Page) -> bool:
+        """
+        Verifica se o site redirecionou para a página de login
+
+        Args:
+            page: Instância da página do Playwright
+
+        Returns:
+            bool: True se a sessão não está mais autenticada
+        """
+        if page.url.startswith(CANAIME_LOGIN_URL):
+            return True
+        return await page.locator("input[name=\"usuario\"]").count() > 0
+
+    async def _carregar_pagina(self, page: Page, url: str) -> Optional[Response]:
+        """
+        Abre a página e aguarda o fim do carregamento
+
+        Args:
+            page: Instância da página do Playwright
+            url: Endereço da página
+
+        Returns:
+            Optional[Response]: Resposta do documento principal, após redirecionamentos
+
+        Raises:
+            TimeoutError: Se o carregamento passar de CANAIME_TIMEOUT_PAGINA_SEGUNDOS
+        """
+        logger.info(f"Acessando a página de dados: {url}")
+        limite_ms = CANAIME_TIMEOUT_PAGINA_SEGUNDOS * 1000
+
+        async def carregar() -> Optional[Response]:
+            resposta = await page.goto(url, timeout=limite_ms)
+            await page.wait_for_load_state("networkidle", timeout=limite_ms)
+            return resposta
+
+        with FASE_DURACAO.labels("playwright", "pagina").time():
+            return await limitar_tempo(carregar(), CANAIME_TIMEOUT_PAGINA_SEGUNDOS, "pagina")
+
+    async def _abrir_pagina_dados(self, page: Page, url: str = CANAIME_URL) -> Optional[Response]:
+        """
+        Abre a página de dados, fazendo login apenas quando a sessão salva expirou
+
+        Args:
+            page: Instância da página do Playwright
+            url: Endereço da página de chamada da unidade
+
+        Returns:
+            Optional[Response]: Resposta com o HTML bruto da página de dados
+
+        Raises:
+            RuntimeError: Se o site continuar exigindo login após autenticar
+        """
+        sessao_id = self._sessao_id
+        resposta = await self._carregar_pagina(page, url)
+
+        if not await self._sessao_expirada(page):
+            logger.info("Sessão reutilizada, login não necessário")
+            return resposta
+
+        async with self._login_lock:
+            # Outra página pode ter refeito o login enquanto esta aguardava
+            if self._sessao_id == sessao_id:
+                logger.info("Sessão ausente ou expirada")
+                await self.realizar_login(page)
+                await self.navegador.salvar_sessao()
+                self._sessao_id += 1
+
+        resposta = await self._carregar_pagina(page, url)
+
+        if await self._sessao_expirada(page):
+            raise RuntimeError("Login no Canaimé falhou: o site continua exigindo autenticação")
+        return resposta
+
+    async def _ler_entradas_lote(
+        self, page: Page
+    ) -> Tuple[List[Optional[str]], List[Optional[str]], List[Optional[str]]]:
+        """
+        Lê todas as entradas, nomes e fotos da página em uma única chamada
+
+        Args:
+            page: Instância da página do Playwright
+
+        Returns:
+            Tuple: Listas com os textos das entradas, os nomes e os src das fotos
+        """
+        dados = await page.evaluate(JS_EXTRACAO_LOTE)
+        return dados["entradas"], dados["nomes"], dados["fotos"]
+
+    async def _ler_entradas_item(
+        self, page: Page
+    ) -> Tuple[List[Optional[str]], List[Optional[str]], List[Optional[str]]]:
+        """
+        Lê as entradas elemento a elemento, com uma chamada ao navegador por campo
+
+        Mantido para comparação com o modo em lote.
+
+        Args:
+            page: Instância da página do Playwright
+
+        Returns:
+            Tuple: Listas com os textos das entradas, os nomes e os src das fotos
+        """
+        all_entries = page.locator('.titulobkSingCAPS')
+        names = page.locator('.titulobkSingCAPS .titulo12bk')
+        fotos = page.locator('img')
+
+        count = await all_entries.count()
+        entradas, nomes, fotos_src = [], [], []
+        for i in range(count):
+            entradas.append(await all_entries.nth(i).text_content())
+            nomes.append(await names.nth(i).text_content())
+            try:
+                fotos_src.append(await fotos.nth(i).get_attribute('src'))
+            except Exception as e:
+                logger.warning(f"Erro ao extrair URL da foto para o item {i}: {e}")
+                fotos_src.append(None)
+
+        return entradas, nomes, fotos_src
+
+    @staticmethod
+    def _erro_transitorio(erro: BaseException) -> bool:
+        """
+        Indica se vale repetir a coleta após o erro
+
+        Tempos limite, falhas de rede, erros 5xx/429 e erros do navegador são
+        repetidos; falhas de login e de formato da página, não.
+        """
+        if isinstance(erro, httpx.HTTPStatusError):
+            return erro.response.status_code >= 500 or erro.response.status_code == 429
+        return isinstance(erro, (TimeoutError, httpx.TransportError, PlaywrightError))
+
+    def _hash_anterior(self, unidade: str) -> Optional[str]:
+        """Hash da última página publicada da unidade, se os dados dela ainda estão no snapshot"""
+        if self.repositorio.obter_dados(unidade) is None:
+            return None
+        return self._hashes.get(unidade)
 
-    async def extrair_dados(self, headless=False) -> None:
+    async def _coletar_unidades(
+        self,
+        coletar: Callable[[str, Optional[str]], Awaitable[ColetaUnidade]],
+        backend: str,
+    ) -> Tuple[Dict[str, BaseException], bool]:
+        """
+        Coleta as unidades configuradas em paralelo, limitado a `max_paginas` por vez
+
+        Unidades cuja página de chamada não mudou desde a última coleta não são
+        extraídas nem reinstaladas; se nenhuma mudou, nenhum snapshot é publicado.
+        Falhas transitórias de cada unidade são repetidas com espera exponencial.
+        As páginas obtidas, alteradas ou não, são guardadas no arquivo de páginas.
+
+        Args:
+            coletar: Função que recebe a unidade e o hash anterior da página e
+                retorna a coleta da unidade
+            backend: Backend usado na coleta, para as métricas
+
+        Returns:
+            Tuple: Erros das unidades que falharam e se os registros publicados mudaram
+
+        Raises:
+            RuntimeError: Se nenhuma unidade puder ser extraída
+        """
+        coletado_em = datetime.now(timezone.utc)
+        semaforo = asyncio.Semaphore(self.max_paginas)
+
+        async def coletar_limitado(unidade: str) -> ColetaUnidade:
+            async with semaforo:
+                return await coletar(unidade, self._hash_anterior(unidade))
+
+        async def coletar_com_retentativas(unidade: str) -> ColetaUnidade:
+            # A espera entre tentativas não ocupa uma das `max_paginas` vagas
+            return await com_retentativas(
+                partial(coletar_limitado, unidade),
+                f"[{unidade}] Coleta",
+                self._erro_transitorio,
+                ao_repetir=RETENTATIVAS.labels(backend).inc,
+            )
+
+        resultados = await asyncio.gather(
+            *(coletar_com_retentativas(unidade) for unidade in self.unidades),
+            return_exceptions=True,
+        )
+
+        coletas: Dict[str, ColetaUnidade] = {}
+        falhas = {}
+        for unidade, resultado in zip(self.unidades, resultados):
+            if isinstance(resultado, BaseException):
+                logger.error(f"Erro ao extrair dados da unidade {unidade}: {resultado}")
+                FALHAS_UNIDADE.labels(unidade).inc()
+                falhas[unidade] = resultado
+            else:
+                coletas[unidade] = resultado
+
+        if not coletas:
+            raise RuntimeError(
+                f"Nenhuma unidade pôde ser extraída: {', '.join(falhas)}"
+            ) from next(iter(falhas.values()))
+
+        registros_por_unidade = {
+            unidade: coleta.registros
+            for unidade, coleta in coletas.items()
+            if not coleta.inalterada
+        }
+        for unidade in coletas.keys() - registros_por_unidade.keys():
+            UNIDADES_INALTERADAS.labels(unidade).inc()
+
+        alterou = False
+        if registros_por_unidade:
+            # Construção da tabela, dos índices e do diff, e gravação em disco
+            with FASE_DURACAO.labels(backend, "snapshot").time():
+                alterou = await self.repositorio.instalar_unidades(registros_por_unidade)
+            for unidade in self.unidades:
+                REGISTROS.labels(unidade).set(self.repositorio.total_registros(unidade))
+        else:
+            logger.info("Nenhuma página de chamada mudou; snapshot mantido")
+
+        for unidade, coleta in coletas.items():
+            if coleta.hash is not None and coleta.registros != []:
+                self._hashes[unidade] = coleta.hash
+
+        await self._arquivar_paginas(coletado_em, coletas)
+        return falhas, alterou
+
+    async def _arquivar_paginas(
+        self, coletado_em: datetime, coletas: Dict[str, ColetaUnidade]
+    ) -> None:
+        """
+        Guarda as páginas de chamada obtidas no arquivo, se configurado
+
+        Falhas ao gravar são registradas no log e não interrompem a atualização.
+
+        Args:
+            coletado_em: Início da atualização (UTC)
+            coletas: Coleta de cada unidade obtida com sucesso
+        """
+        if self.arquivo is None:
+            return
+
+        paginas = {
+            unidade: coleta.pagina
+            for unidade, coleta in coletas.items()
+            if coleta.pagina is not None
+        }
+        if not paginas:
+            return
+        try:
+            # A compressão roda fora do loop de eventos
+            await asyncio.to_thread(self.arquivo.guardar, coletado_em, paginas)
+        except Exception as e:
+            logger.error(f"Erro ao arquivar as páginas de chamada: {e}")
+
+    async def _coletar_unidade_playwright(
+        self, context: BrowserContext, unidade: str, hash_anterior: Optional[str] = None
+    ) -> ColetaUnidade:
+        """
+        Extrai os registros de uma unidade em uma nova aba do contexto autenticado
+
+        Args:
+            context: Contexto do navegador compartilhado entre as unidades
+            unidade: Identificador da unidade prisional
+            hash_anterior: Hash da página na coleta anterior; se o HTML recebido for
+                o mesmo, a extração é ignorada
+
+        Returns:
+            ColetaUnidade: Hash e HTML da página e registros com as chaves Código,
+                Ala, Cela, Foto e Nome (None se a página não mudou)
+        """
+        # Imagens, estilos e fontes são bloqueados no próprio contexto (browser.criar_contexto);
+        # as URLs das fotos continuam no DOM
+        page = await context.new_page()
+        try:
+            # Acessa a página com os dados dos presos, refazendo o login se a sessão expirou
+            resposta = await self._abrir_pagina_dados(page, url_unidade(unidade))
+
+            # Compara o HTML bruto recebido antes de percorrer a página
+            corpo = await resposta.body() if resposta is not None else None
+            hash_pagina = hash_conteudo(corpo) if corpo is not None else None
+            pagina = (
+                corpo.decode(detectar_codificacao(corpo), errors="replace")
+                if corpo is not None and self.arquivo is not None
+                else None
+            )
+            if hash_pagina is not None and hash_pagina == hash_anterior:
+                logger.info(f"[{unidade}] Página de chamada inalterada; extração ignorada")
+                return ColetaUnidade(hash_pagina, pagina=pagina)
+
+            # Lê as entradas da página e processa em Python puro
+            logger.info(
+                f"Extraindo dados dos presos da unidade {unidade} (modo: {self.modo_extracao})"
+            )
+            with FASE_DURACAO.labels("playwright", "extracao").time():
+                ler = self._ler_entradas_item if self.modo_extracao == "item" else self._ler_entradas_lote
+                entradas, nomes, fotos = await limitar_tempo(
+                    ler(page), CANAIME_TIMEOUT_EXTRACAO_SEGUNDOS, "extracao"
+                )
+                registros = await asyncio.to_thread(
+                    processar_entradas, entradas, nomes, fotos, CANAIME_FOTOS_URL
+                )
+        finally:
+            await page.close()
+
+        logger.info(f"[{unidade}] Total de entradas encontradas: {len(entradas)}")
+        logger.info(f"[{unidade}] Total de fotos encontradas: {len(fotos)}")
+        return ColetaUnidade(hash_pagina, registros, pagina)
+
+    async def extrair_dados(self, headless: bool = CANAIME_HEADLESS) -> bool:
         """
         Realiza o scraping de dados do sistema Canaimé
         
-        Acessa o site, faz login e extrai informações dos presos,
-        organizando em um DataFrame com as colunas: Código, Ala, Cela e Nome.
+        Acessa o site, faz login e extrai informações dos presos de cada unidade,
+        organizando em uma tabela com as colunas: Código, Ala, Cela, Foto, Nome e Unidade.
+        As unidades são extraídas em abas paralelas que compartilham a mesma sessão.
+
+        Returns:
+            bool: True se os registros publicados mudaram
         """
         logger.info("Iniciando extração de dados do Canaimé")
-        raw_unit_list = []
-        
+
         try:
-            async with async_playwright() as p:
-                # Configuração do browser para desativar JavaScript e não baixar imagens
-                browser = await p.chromium.launch(headless=headless)
-                context = await browser.new_context(
-                    java_script_enabled=False,  # Desativa JavaScript
-                )
-                
-                # Configura o bloqueio de imagens (ainda bloqueamos o download, mas extraímos as URLs)
-                page = await context.new_page()
-                await page.route("**/*", self.block_images)
-                
-                # Realiza o login no sistema
-                await self.realizar_login(page)
-                
-                # Acessa a página com os dados dos presos
-                logger.info(f"Acessando a página de dados: {CANAIME_URL}")
-                await page.goto(CANAIME_URL, timeout=0)
-                await page.wait_for_load_state("networkidle")
-                
-                # Usando a lógica específica do arquivo logica_implementar.py
-                logger.info("Extraindo dados dos presos")
-                
-                # Localiza os elementos conforme a lógica original
-                all_entries = page.locator('.titulobkSingCAPS')
-                names = page.locator('.titulobkSingCAPS .titulo12bk')
-                fotos = page.locator('img')
-                
-                # Conta o número de entradas
-                count = await all_entries.count()
-                fotos_count = await fotos.count()
-                logger.info(f"Total de entradas encontradas: {count}")
-                logger.info(f"Total de fotos encontradas: {fotos_count}")
-                
-                # Extrai dados de cada entrada
-                for i in range(count):
-                    # Obtém o conteúdo de texto e processa-o
-                    processed_entry = (await all_entries.nth(i).text_content()).replace(" ", "").strip()
-                    elements = processed_entry.split('\n')
-                    
-                    # Verifica se temos elementos suficientes
-                    if len(elements) >= 5:
-                        code = elements[0]
-                        wing_cell = elements[4]
-                        inmate = await names.nth(i).text_content()
-                        inmate = inmate.strip()
-                        
-                        # Processa ala e cela
-                        wing_cell = wing_cell.replace("ALA:", "")
-                        split_index = wing_cell.rfind('/')
-                        
-                        # Obtém a URL da foto
-                        foto_url = ""
-                        try:
-                            foto_src = await fotos.nth(i).get_attribute('src')
-                            if foto_src:
-                                foto_url = CANAIME_FOTOS_URL + foto_src[19:]
-                                logger.debug(f"URL da foto extraída: {foto_url}")
-                        except Exception as e:
-                            logger.warning(f"Erro ao extrair URL da foto para o item {i}: {e}")
-                        
-                        if split_index != -1:
-                            wing = self.normalize_text(wing_cell[:split_index].strip())
-                            cell = wing_cell[split_index + 1:].strip()
-                            
-                            # Adiciona os dados à lista
-                            raw_unit_list.append({
-                                "Código": code[2:] if len(code) > 2 else code,  # Remove os 2 primeiros caracteres
-                                "Ala": wing,
-                                "Cela": cell,
-                                "Foto": foto_url,
-                                "Nome": inmate
-                            })
-                        else:
-                            logger.warning(f"Formato inesperado para ala/cela: {wing_cell}")
-                    else:
-                        logger.warning(f"Formato inesperado para entrada: {processed_entry}")
-                
-                # Fecha o navegador
-                await browser.close()
-                
-                # Converte para DataFrame
-                if raw_unit_list:
-                    logger.info(f"Dados extraídos com sucesso. Total de registros: {len(raw_unit_list)}")
-                    self._dados_presos = pd.DataFrame(raw_unit_list)
-                    self._ultima_atualizacao = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    logger.warning("Nenhum dado foi extraído")
-                    
+            # Contexto com JavaScript desativado, reaproveitando navegador e sessão salvos
+            context = await self.navegador.obter_contexto(headless=headless)
+
+            falhas, alterou = await self._coletar_unidades(
+                partial(self._coletar_unidade_playwright, context), "playwright"
+            )
+            if falhas:
+                # Descarta o contexto para que a próxima execução comece de um estado limpo
+                await self.navegador.descartar_contexto()
+            return alterou
+
+        except Exception as e:
+            logger.error(f"Erro ao extrair dados: {e}")
+            await self.navegador.descartar_contexto()
+            raise
+
+        finally:
+            if not self.navegador_persistente:
+                await self.navegador.fechar()
+
+    async def extrair_dados_http(self) -> bool:
+        """
+        Realiza o scraping de dados do sistema Canaimé sem navegador
+
+        Usa o backend HTTP (httpx) e produz os mesmos registros de `extrair_dados`.
+        As unidades são obtidas em requisições paralelas com o mesmo cliente.
+
+        Returns:
+            bool: True se os registros publicados mudaram
+        """
+        logger.info("Iniciando extração de dados do Canaimé via HTTP")
+
+        try:
+            falhas, alterou = await self._coletar_unidades(self.http.coletar_registros, "http")
+            if falhas:
+                # Descarta a sessão para que a próxima execução comece de um estado limpo
+                await self.http.fechar()
+            return alterou
         except Exception as e:
             logger.error(f"Erro ao extrair dados: {e}")
+            await self.http.fechar()
             raise
 
-    async def executar_scraping(self, headless=False) -> None:
-        """Função auxiliar para executar o scraping"""
-        await self.extrair_dados(headless=headless)
+    async def fechar(self) -> None:
+        """Fecha o navegador e o cliente HTTP mantidos entre as atualizações"""
+        await self.navegador.fechar()
+        await self.http.fechar()
+
+    async def _descartar_sessao(self, backend: str) -> None:
+        """Descarta a sessão do backend após uma atualização interrompida no meio"""
+        try:
+            if backend == "http":
+                await self.http.fechar()
+            else:
+                await self.navegador.descartar_contexto()
+        except Exception as e:
+            logger.warning(f"Erro ao descartar a sessão do backend {backend}: {e}")
+
+    async def executar_scraping(
+        self, headless: bool = CANAIME_HEADLESS, backend: Optional[str] = None
+    ) -> bool:
+        """
+        Função auxiliar para executar o scraping
+
+        A atualização inteira é limitada a CANAIME_TIMEOUT_ATUALIZACAO_SEGUNDOS. Após
+        falhas seguidas, o disjuntor recusa novas atualizações por um tempo, e o
+        último snapshot continua sendo servido.
+
+        Args:
+            headless: Executa o navegador sem interface gráfica (backend playwright)
+            backend: "playwright" ou "http"; usa CANAIME_BACKEND quando não informado
+
+        Returns:
+            bool: True se os registros publicados mudaram
+
+        Raises:
+            CircuitoAberto: Se o disjuntor estiver aberto
+            TimeoutError: Se a atualização passar do tempo limite
+        """
+        backend = backend or CANAIME_BACKEND
+        if backend == "http":
+            extrair = self.extrair_dados_http
+        elif backend == "playwright":
+            extrair = partial(self.extrair_dados, headless=headless)
+        else:
+            raise ValueError(f"Backend de scraping desconhecido: {backend}")
+
+        disjuntor.verificar()
+
+        inicio = time.perf_counter()
+        try:
+            alterou = await limitar_tempo(
+                extrair(), CANAIME_TIMEOUT_ATUALIZACAO_SEGUNDOS, "atualizacao"
+            )
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                logger.error(f"Atualização interrompida: {e}")
+                await self._descartar_sessao(backend)
+            registrar_atualizacao(backend, time.perf_counter() - inicio, sucesso=False)
+            disjuntor.registrar_falha(e)
+            DISJUNTOR_ABERTO.set(disjuntor.estado != FECHADO)
+            raise
+        registrar_atualizacao(backend, time.perf_counter() - inicio, sucesso=True)
+        disjuntor.registrar_sucesso()
+        DISJUNTOR_ABERTO.set(0)
+        return alterou
 
 
 # Instância única do scraper para ser usada em toda a aplicação
-scraper = CanaimeScraper()
+scraper = CanaimeScraper(repositorio=repositorio)
 
 
-async def atualizar_dados(headless=False) -> None:
+async def atualizar_dados(headless: bool = CANAIME_HEADLESS, backend: Optional[str] = None) -> bool:
     """
     Função para atualizar os dados via scraping.
     Pode ser chamada pelo agendador de tarefas.
+
+    Args:
+        headless: Executa o navegador sem interface gráfica (backend playwright)
+        backend: "playwright" ou "http"; usa CANAIME_BACKEND quando não informado
+
+    Returns:
+        bool: True se os registros publicados mudaram (usado no intervalo adaptativo)
     """
-    await scraper.executar_scraping(headless=headless)
+    return await scraper.executar_scraping(headless=headless, backend=backend)
 
 
 # Função para testes
-async def main(headless=False):
+async def main(headless: bool = CANAIME_HEADLESS):
     """Função principal para testes"""
     await atualizar_dados(headless=headless)
-    print(scraper.dados_json)
+    print(repositorio.dados_json)
 
 
 if __name__ == "__main__":
-    asyncio.run(main(headless=False)) 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file
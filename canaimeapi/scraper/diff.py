@@ -0,0 +1,173 @@
+"""
+Comparação entre snapshots consecutivos e histórico de alterações por Código
+"""
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from canaimeapi.scraper.tabela import TabelaPresos
+
+logger = logging.getLogger("canaime_scraper")
+
+# Campos que definem a localização do preso
+CAMPOS_LOCAL = ["Unidade", "Ala", "Cela"]
+# Campos devolvidos em cada alteração
+CAMPOS_REGISTRO = ["Unidade", "Ala", "Cela", "Foto", "Nome"]
+
+# Tipos de alteração
+ENTRADA = "entrada"
+SAIDA = "saida"
+TRANSFERENCIA = "transferencia"
+FOTO = "foto"
+
+
+@dataclass
+class DiffSnapshot:
+    """Alterações entre um snapshot e o anterior"""
+
+    versao: int
+    versao_anterior: int
+    gerado_em: str
+    alteracoes: List[Dict] = field(default_factory=list)
+
+    @property
+    def resumo(self) -> Dict[str, int]:
+        """Retorna a quantidade de alterações por tipo"""
+        resumo = {ENTRADA: 0, SAIDA: 0, TRANSFERENCIA: 0, FOTO: 0}
+        for alteracao in self.alteracoes:
+            resumo[alteracao["tipo"]] += 1
+        return resumo
+
+
+def _por_codigo(tabela: TabelaPresos) -> Dict[str, Tuple[Optional[str], ...]]:
+    """Indexa o snapshot por Código, mantendo a primeira ocorrência de códigos repetidos"""
+    codigos = tabela.coluna("Código")
+    linhas = zip(*(tabela.coluna(campo) for campo in CAMPOS_REGISTRO))
+    por_codigo: Dict[str, Tuple[Optional[str], ...]] = {}
+    for codigo, linha in zip(codigos, linhas):
+        por_codigo.setdefault(codigo, linha)
+    duplicados = len(codigos) - len(por_codigo)
+    if duplicados:
+        logger.warning(f"{duplicados} códigos repetidos ignorados na comparação")
+    return por_codigo
+
+
+def _registro_preenchido(linha: Tuple[Optional[str], ...]) -> Dict[str, str]:
+    """Converte uma linha em registro, trocando valores ausentes por texto vazio"""
+    return {campo: valor or "" for campo, valor in zip(CAMPOS_REGISTRO, linha)}
+
+
+def calcular_diff(
+    anterior: TabelaPresos,
+    atual: TabelaPresos,
+    versao: int,
+    versao_anterior: int,
+) -> DiffSnapshot:
+    """
+    Compara dois snapshots usando Código como chave
+
+    Cada lado é indexado em um dicionário por Código; entradas e saídas saem da
+    diferença entre as chaves e só os registros comuns que mudaram são convertidos.
+
+    Args:
+        anterior: Snapshot anterior
+        atual: Snapshot novo
+        versao: Versão do snapshot novo
+        versao_anterior: Versão do snapshot anterior
+
+    Returns:
+        DiffSnapshot: Entradas, saídas, transferências de unidade/ala/cela e trocas de foto
+    """
+    antes = _por_codigo(anterior)
+    depois = _por_codigo(atual)
+
+    alteracoes = [
+        {"versao": versao, "tipo": ENTRADA, "Código": codigo, "depois": dict(zip(CAMPOS_REGISTRO, linha))}
+        for codigo, linha in depois.items()
+        if codigo not in antes
+    ]
+    alteracoes += [
+        {"versao": versao, "tipo": SAIDA, "Código": codigo, "antes": dict(zip(CAMPOS_REGISTRO, linha))}
+        for codigo, linha in antes.items()
+        if codigo not in depois
+    ]
+
+    transferencias, fotos = [], []
+    for codigo, linha_depois in depois.items():
+        linha_antes = antes.get(codigo)
+        if linha_antes is None or linha_antes == linha_depois:
+            continue
+
+        registro_antes = _registro_preenchido(linha_antes)
+        registro_depois = _registro_preenchido(linha_depois)
+        if any(registro_antes[campo] != registro_depois[campo] for campo in CAMPOS_LOCAL):
+            tipo, destino = TRANSFERENCIA, transferencias
+        elif registro_antes["Foto"] != registro_depois["Foto"]:
+            tipo, destino = FOTO, fotos
+        else:
+            continue
+
+        destino.append({
+            "versao": versao,
+            "tipo": tipo,
+            "Código": codigo,
+            "antes": registro_antes,
+            "depois": registro_depois,
+        })
+
+    return DiffSnapshot(
+        versao=versao,
+        versao_anterior=versao_anterior,
+        gerado_em=datetime.now(timezone.utc).isoformat(),
+        alteracoes=alteracoes + transferencias + fotos,
+    )
+
+
+class HistoricoAlteracoes:
+    """Mantém as alterações das últimas versões para sincronização incremental"""
+
+    def __init__(self, max_versoes: int = 500):
+        """
+        Inicializa o histórico
+
+        Args:
+            max_versoes: Quantidade de diffs mantidos em memória
+        """
+        self._diffs: Deque[DiffSnapshot] = deque(maxlen=max_versoes)
+
+    def adicionar(self, diff: DiffSnapshot) -> None:
+        """Acrescenta o diff de uma nova versão"""
+        self._diffs.append(diff)
+
+    def limpar(self) -> None:
+        """Descarta o histórico, obrigando os clientes a baixar os dados completos"""
+        self._diffs.clear()
+
+    @property
+    def ultimo(self) -> Optional[DiffSnapshot]:
+        """Retorna o diff da versão mais recente"""
+        return self._diffs[-1] if self._diffs else None
+
+    @property
+    def versao_minima(self) -> Optional[int]:
+        """
+        Retorna a menor versão a partir da qual é possível sincronizar
+
+        Um cliente na versão `versao_minima` (ou posterior) recebe todas as
+        alterações; versões mais antigas precisam baixar os dados completos.
+        """
+        return self._diffs[0].versao_anterior if self._diffs else None
+
+    def desde(self, versao: int) -> List[DiffSnapshot]:
+        """
+        Retorna os diffs das versões posteriores à informada
+
+        Args:
+            versao: Última versão conhecida pelo cliente
+
+        Returns:
+            List[DiffSnapshot]: Diffs em ordem crescente de versão
+        """
+        return [diff for diff in self._diffs if diff.versao > versao]
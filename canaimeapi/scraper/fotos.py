@@ -0,0 +1,468 @@
+"""
+Cache em disco das fotos dos presos, com revalidação no Canaimé e miniaturas
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from canaimeapi.scraper.config import (
+    CANAIME_FOTOS_CACHE_MB,
+    CANAIME_FOTOS_CACHE_PATH,
+    CANAIME_FOTOS_MINIATURA_PX,
+    CANAIME_FOTOS_PREFETCH_CONCORRENCIA,
+    CANAIME_FOTOS_REVALIDAR_SEGUNDOS,
+    CANAIME_HTTP_TIMEOUT,
+)
+from canaimeapi.scraper.tabela import TabelaPresos
+
+logger = logging.getLogger("canaime_scraper")
+
+# Códigos aceitos como nome de arquivo no cache
+CODIGO_RE = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+# Ocupação do cache a partir da qual o pré-carregamento para, sem expulsar fotos em uso
+LIMITE_PREFETCH = 0.9
+
+
+@dataclass
+class EntradaFoto:
+    """Metadados de uma foto em cache, gravados em JSON ao lado do arquivo"""
+
+    url: str
+    hash: str
+    tipo: str
+    tamanho: int
+    validada_em: float
+    etag_origem: Optional[str] = None
+    modificada_origem: Optional[str] = None
+    miniatura: bool = False
+
+
+@dataclass(frozen=True)
+class Foto:
+    """Foto (ou miniatura) pronta para ser enviada ao cliente"""
+
+    conteudo: bytes
+    tipo: str
+    etag: str
+
+
+class CacheFotos:
+    """
+    Fotos baixadas do Canaimé, guardadas em disco com limite de tamanho
+
+    Quando o limite é atingido, as fotos usadas há mais tempo são descartadas
+    (LRU). Fotos com mais de `revalidar_segundos` são revalidadas com uma
+    requisição condicional; se o Canaimé falhar, a cópia em cache é servida.
+
+    Como as páginas de chamada, as fotos só são servidas a uma sessão
+    autenticada. Os downloads usam a sessão de um backend HTTP do scraper: a do
+    próprio scraper, quando informada com `usar_sessao`, ou uma sessão própria,
+    que faz login quando o Canaimé responde com a página de login.
+    """
+
+    def __init__(
+        self,
+        diretorio: Path,
+        limite_bytes: int,
+        revalidar_segundos: int = CANAIME_FOTOS_REVALIDAR_SEGUNDOS,
+        miniatura_px: int = CANAIME_FOTOS_MINIATURA_PX,
+        concorrencia_prefetch: int = CANAIME_FOTOS_PREFETCH_CONCORRENCIA,
+        timeout: float = CANAIME_HTTP_TIMEOUT,
+    ):
+        """
+        Inicializa o cache
+
+        Args:
+            diretorio: Diretório onde as fotos são gravadas
+            limite_bytes: Espaço máximo ocupado pelas fotos e miniaturas
+            revalidar_segundos: Idade a partir da qual a foto é revalidada no Canaimé
+            miniatura_px: Lado maior das miniaturas (0 desativa)
+            concorrencia_prefetch: Downloads simultâneos no pré-carregamento (0 desativa)
+            timeout: Tempo limite, em segundos, de cada download
+        """
+        self.diretorio = Path(diretorio)
+        self.limite_bytes = limite_bytes
+        self.revalidar_segundos = revalidar_segundos
+        self.miniatura_px = miniatura_px
+        self.concorrencia_prefetch = concorrencia_prefetch
+        self.timeout = timeout
+        # Entradas da menos para a mais usada; lidas do disco no primeiro acesso
+        self._entradas: Optional["OrderedDict[str, EntradaFoto]"] = None
+        self._tamanho_total = 0
+        self._indice_lock = asyncio.Lock()
+        # Downloads em andamento por código, compartilhados entre requisições
+        self._downloads: Dict[str, asyncio.Task] = {}
+        self._prefetch: Optional[asyncio.Task] = None
+        # Backend HTTP (CanaimeHttpScraper) cuja sessão autentica os downloads
+        self._sessao = None
+        self._sessao_propria = False
+
+    @property
+    def tamanho_total(self) -> int:
+        """Retorna o espaço ocupado pelas fotos em cache, em bytes"""
+        return self._tamanho_total
+
+    def _arquivos(self, codigo: str) -> Tuple[Path, Path, Path]:
+        """Retorna os caminhos da foto, da miniatura e dos metadados de um código"""
+        return (
+            self.diretorio / f"{codigo}.foto",
+            self.diretorio / f"{codigo}.mini.jpg",
+            self.diretorio / f"{codigo}.json",
+        )
+
+    def usar_sessao(self, http) -> None:
+        """
+        Baixa as fotos com a sessão de um backend HTTP já usado pelo scraper
+
+        Args:
+            http: CanaimeHttpScraper do scraper; seus cookies e logins passam a
+                valer também para as fotos
+        """
+        self._sessao = http
+        self._sessao_propria = False
+
+    def _obter_sessao(self):
+        """
+        Retorna o backend HTTP dos downloads, criando uma sessão própria se nenhuma
+        foi informada; o httpx só é importado no primeiro uso
+        """
+        if self._sessao is None:
+            from canaimeapi.scraper.http_backend import CanaimeHttpScraper
+
+            self._sessao = CanaimeHttpScraper(timeout=self.timeout)
+            self._sessao_propria = True
+        return self._sessao
+
+    async def _indice(self) -> "OrderedDict[str, EntradaFoto]":
+        """Retorna as entradas do cache, lendo os metadados do disco na primeira chamada"""
+        if self._entradas is None:
+            async with self._indice_lock:
+                if self._entradas is None:
+                    entradas = await asyncio.to_thread(self._ler_indice)
+                    self._tamanho_total = sum(entrada.tamanho for entrada in entradas.values())
+                    self._entradas = entradas
+                    logger.info(
+                        f"Cache de fotos: {len(entradas)} fotos, "
+                        f"{self._tamanho_total / 2**20:.1f} MB em {self.diretorio}"
+                    )
+        return self._entradas
+
+    def _ler_indice(self) -> "OrderedDict[str, EntradaFoto]":
+        """Lê os metadados gravados, ordenando pelo último acesso (mtime da foto)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        encontradas = []
+        for metadados in self.diretorio.glob("*.json"):
+            codigo = metadados.stem
+            foto, _, _ = self._arquivos(codigo)
+            try:
+                entrada = EntradaFoto(**json.loads(metadados.read_text(encoding="utf-8")))
+                encontradas.append((foto.stat().st_mtime, codigo, entrada))
+            except (OSError, TypeError, ValueError):
+                logger.warning(f"Foto {codigo} ignorada: arquivos do cache incompletos")
+
+        encontradas.sort(key=lambda item: item[0])
+        return OrderedDict((codigo, entrada) for _, codigo, entrada in encontradas)
+
+    async def obter(self, codigo: str, url: str, miniatura: bool = False) -> Foto:
+        """
+        Retorna a foto de um preso, baixando ou revalidando no Canaimé se necessário
+
+        Args:
+            codigo: Código do preso
+            url: Endereço da foto no Canaimé (campo Foto do snapshot)
+            miniatura: Retorna a miniatura, quando disponível
+
+        Returns:
+            Foto: Conteúdo, tipo e ETag da foto
+
+        Raises:
+            ValueError: Se o código não puder ser usado como nome de arquivo ou o
+                Canaimé não devolver uma imagem
+            httpx.HTTPError: Se a foto não estiver em cache e o download falhar
+            RuntimeError: Se a foto não estiver em cache e o login no Canaimé falhar
+        """
+        if not CODIGO_RE.match(codigo):
+            raise ValueError(f"Código inválido para foto: {codigo}")
+
+        entradas = await self._indice()
+        entrada = entradas.get(codigo)
+        if (
+            entrada is None
+            or entrada.url != url
+            or time.time() - entrada.validada_em > self.revalidar_segundos
+        ):
+            entrada = await self._atualizar(codigo, url)
+
+        foto, arquivo_miniatura, _ = self._arquivos(codigo)
+        usar_miniatura = miniatura and entrada.miniatura
+        try:
+            conteudo = await asyncio.to_thread(
+                self._ler, arquivo_miniatura if usar_miniatura else foto, foto
+            )
+        except FileNotFoundError:
+            # Expulsa do cache entre a consulta e a leitura: baixa novamente
+            self._descartar(codigo)
+            entrada = await self._atualizar(codigo, url)
+            usar_miniatura = miniatura and entrada.miniatura
+            conteudo = await asyncio.to_thread(
+                self._ler, arquivo_miniatura if usar_miniatura else foto, foto
+            )
+
+        if codigo in entradas:
+            entradas.move_to_end(codigo)
+
+        if usar_miniatura:
+            return Foto(conteudo=conteudo, tipo="image/jpeg", etag=f'"{entrada.hash}-mini"')
+        return Foto(conteudo=conteudo, tipo=entrada.tipo, etag=f'"{entrada.hash}"')
+
+    @staticmethod
+    def _ler(caminho: Path, foto: Path) -> bytes:
+        """Lê o arquivo e marca a foto como usada agora (ordem LRU após reiniciar)"""
+        conteudo = caminho.read_bytes()
+        os.utime(foto)
+        return conteudo
+
+    async def _atualizar(self, codigo: str, url: str) -> EntradaFoto:
+        """Baixa ou revalida a foto, compartilhando o download entre requisições simultâneas"""
+        tarefa = self._downloads.get(codigo)
+        if tarefa is None:
+            tarefa = asyncio.create_task(self._baixar(codigo, url))
+            self._downloads[codigo] = tarefa
+            tarefa.add_done_callback(lambda t: self._concluir_download(codigo, t))
+        return await asyncio.shield(tarefa)
+
+    def _concluir_download(self, codigo: str, tarefa: asyncio.Task) -> None:
+        """Remove o download concluído, recuperando a exceção se ninguém a aguardou"""
+        if self._downloads.get(codigo) is tarefa:
+            del self._downloads[codigo]
+        if not tarefa.cancelled():
+            tarefa.exception()
+
+    async def _baixar(self, codigo: str, url: str) -> EntradaFoto:
+        """
+        Obtém a foto no Canaimé, com requisição condicional se já houver cópia da mesma URL
+
+        Returns:
+            EntradaFoto: Entrada nova, revalidada ou, se o Canaimé falhar, a cópia em cache
+        """
+        anterior = self._entradas.get(codigo)
+        if anterior is not None and anterior.url != url:
+            anterior = None
+
+        cabecalhos = {}
+        if anterior is not None:
+            if anterior.etag_origem:
+                cabecalhos["If-None-Match"] = anterior.etag_origem
+            if anterior.modificada_origem:
+                cabecalhos["If-Modified-Since"] = anterior.modificada_origem
+
+        try:
+            resposta = await self._obter_sessao().obter_autenticado(url, cabecalhos)
+            if resposta.status_code == 304 and anterior is not None:
+                anterior.validada_em = time.time()
+                await asyncio.to_thread(self._gravar_metadados, codigo, anterior)
+                return anterior
+
+            resposta.raise_for_status()
+            tipo = resposta.headers.get("content-type", "").split(";")[0].strip()
+            if not tipo.startswith("image/"):
+                raise ValueError(f"Resposta do Canaimé não é uma imagem ({tipo or 'sem tipo'})")
+        except Exception as e:
+            if anterior is None:
+                raise
+            logger.warning(f"Falha ao revalidar a foto {codigo}; servindo a cópia em cache: {e}")
+            return anterior
+
+        entrada = await asyncio.to_thread(
+            self._gravar,
+            codigo,
+            url,
+            resposta.content,
+            tipo,
+            resposta.headers.get("etag"),
+            resposta.headers.get("last-modified"),
+        )
+        await self._registrar(codigo, entrada)
+        return entrada
+
+    def _gravar(
+        self,
+        codigo: str,
+        url: str,
+        conteudo: bytes,
+        tipo: str,
+        etag_origem: Optional[str],
+        modificada_origem: Optional[str],
+    ) -> EntradaFoto:
+        """Grava a foto, a miniatura e os metadados (executado fora do loop de eventos)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        foto, arquivo_miniatura, _ = self._arquivos(codigo)
+        self._escrever(foto, conteudo)
+
+        miniatura = self._gerar_miniatura(codigo, conteudo)
+        if miniatura is None:
+            arquivo_miniatura.unlink(missing_ok=True)
+        else:
+            self._escrever(arquivo_miniatura, miniatura)
+
+        entrada = EntradaFoto(
+            url=url,
+            hash=hashlib.sha256(conteudo).hexdigest()[:32],
+            tipo=tipo,
+            tamanho=len(conteudo) + len(miniatura or b""),
+            validada_em=time.time(),
+            etag_origem=etag_origem,
+            modificada_origem=modificada_origem,
+            miniatura=miniatura is not None,
+        )
+        self._gravar_metadados(codigo, entrada)
+        return entrada
+
+    def _gerar_miniatura(self, codigo: str, conteudo: bytes) -> Optional[bytes]:
+        """
+        Reduz a foto para a miniatura em JPEG
+
+        Returns:
+            Optional[bytes]: Miniatura, ou None se desativada, sem Pillow ou com erro
+        """
+        if self.miniatura_px <= 0:
+            return None
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+
+        try:
+            with Image.open(io.BytesIO(conteudo)) as imagem:
+                imagem = imagem.convert("RGB")
+                imagem.thumbnail((self.miniatura_px, self.miniatura_px))
+                saida = io.BytesIO()
+                imagem.save(saida, format="JPEG", quality=80, optimize=True)
+                return saida.getvalue()
+        except Exception as e:
+            logger.warning(f"Erro ao gerar a miniatura da foto {codigo}: {e}")
+            return None
+
+    @staticmethod
+    def _escrever(caminho: Path, conteudo: bytes) -> None:
+        """Grava o arquivo de forma atômica, para que leitores nunca vejam um arquivo parcial"""
+        temporario = caminho.with_name(caminho.name + ".tmp")
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, caminho)
+
+    def _gravar_metadados(self, codigo: str, entrada: EntradaFoto) -> None:
+        """Grava os metadados da foto em JSON"""
+        _, _, metadados = self._arquivos(codigo)
+        self._escrever(metadados, json.dumps(asdict(entrada)).encode("utf-8"))
+
+    async def _registrar(self, codigo: str, entrada: EntradaFoto) -> None:
+        """Registra a foto como a mais usada e expulsa as menos usadas acima do limite"""
+        self._descartar(codigo)
+        self._entradas[codigo] = entrada
+        self._tamanho_total += entrada.tamanho
+
+        expulsas: List[str] = []
+        while self._tamanho_total > self.limite_bytes and len(self._entradas) > 1:
+            antiga, removida = self._entradas.popitem(last=False)
+            self._tamanho_total -= removida.tamanho
+            expulsas.append(antiga)
+
+        if expulsas:
+            await asyncio.to_thread(self._remover_arquivos, expulsas)
+            logger.info(f"{len(expulsas)} fotos expulsas do cache (limite de {self.limite_bytes} bytes)")
+
+    def _descartar(self, codigo: str) -> None:
+        """Remove a entrada do índice em memória, sem apagar os arquivos"""
+        entrada = self._entradas.pop(codigo, None)
+        if entrada is not None:
+            self._tamanho_total -= entrada.tamanho
+
+    def _remover_arquivos(self, codigos: List[str]) -> None:
+        """Apaga a foto, a miniatura e os metadados dos códigos informados"""
+        for codigo in codigos:
+            for caminho in self._arquivos(codigo):
+                caminho.unlink(missing_ok=True)
+
+    def agendar_prefetch(self, tabela: Optional[TabelaPresos]) -> None:
+        """
+        Pré-carrega em segundo plano as fotos novas ou alteradas de um snapshot
+
+        Chamado a cada snapshot instalado; um pré-carregamento em andamento é
+        substituído pelo novo. Fora de um loop de eventos não faz nada.
+
+        Args:
+            tabela: Registros do snapshot (Código e Foto)
+        """
+        if tabela is None or self.concorrencia_prefetch <= 0:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug("Pré-carregamento de fotos ignorado: sem loop de eventos")
+            return
+
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+
+        pares = list(zip(tabela.coluna("Código"), tabela.coluna("Foto")))
+        self._prefetch = asyncio.create_task(self._pre_carregar(pares))
+        self._prefetch.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _pre_carregar(self, pares: List[Tuple[Optional[str], Optional[str]]]) -> None:
+        """Baixa as fotos ausentes do cache ou com URL diferente, com concorrência limitada"""
+        entradas = await self._indice()
+        pendentes = [
+            (codigo, url)
+            for codigo, url in dict(pares).items()
+            if url and codigo and CODIGO_RE.match(codigo)
+            and (codigo not in entradas or entradas[codigo].url != url)
+        ]
+        if not pendentes:
+            return
+
+        logger.info(f"Pré-carregando {len(pendentes)} fotos novas ou alteradas")
+        fila: Iterator[Tuple[str, str]] = iter(pendentes)
+        resultado = {"baixadas": 0, "falhas": 0}
+
+        async def trabalhador() -> None:
+            for codigo, url in fila:
+                if self._tamanho_total >= self.limite_bytes * LIMITE_PREFETCH:
+                    return
+                try:
+                    await self._atualizar(codigo, url)
+                    resultado["baixadas"] += 1
+                except Exception as e:
+                    resultado["falhas"] += 1
+                    logger.debug(f"Erro ao pré-carregar a foto {codigo}: {e}")
+
+        await asyncio.gather(*(trabalhador() for _ in range(self.concorrencia_prefetch)))
+        logger.info(
+            f"Pré-carregamento de fotos concluído: {resultado['baixadas']} baixadas, "
+            f"{resultado['falhas']} falhas"
+        )
+
+    async def fechar(self) -> None:
+        """Interrompe o pré-carregamento e fecha a sessão própria, se houver"""
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+            self._prefetch = None
+        if self._sessao is not None and self._sessao_propria:
+            await self._sessao.fechar()
+            self._sessao = None
+
+
+# Instância única do cache de fotos (None quando CANAIME_FOTOS_CACHE_PATH está vazio)
+cache_fotos = (
+    CacheFotos(Path(CANAIME_FOTOS_CACHE_PATH), CANAIME_FOTOS_CACHE_MB * 2**20)
+    if CANAIME_FOTOS_CACHE_PATH
+    else None
+)
@@ -0,0 +1,267 @@
+"""
+Histórico temporal dos presos: intervalos de validade de Ala, Cela, Foto e Nome
+
+Cada snapshot gravado é incorporado à tabela `intervalos`, com uma linha por
+(Código, Unidade) e período em que os dados ficaram inalterados. Uma linha só é
+criada quando algo muda, então o histórico cresce com a quantidade de alterações,
+e não com a de snapshots. O início de cada intervalo é o instante do primeiro
+snapshot em que os dados apareceram; a mudança real ocorreu entre esse snapshot
+e o anterior.
+
+Os períodos são indexados por uma R*Tree do SQLite, que encontra os intervalos
+vigentes em um instante sem percorrer o histórico inteiro, e as linhas de cada
+preso por um índice sobre o Código.
+"""
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger("canaime_scraper")
+
+# Tabelas do histórico, criadas no mesmo banco dos snapshots. Os instantes são
+# segundos desde a época (UTC); valido_ate nulo indica o intervalo vigente
+ESQUEMA_HISTORICO = (
+    """
+    CREATE TABLE IF NOT EXISTS intervalos (
+        id INTEGER PRIMARY KEY,
+        codigo TEXT,
+        unidade TEXT,
+        ala TEXT,
+        cela TEXT,
+        foto TEXT,
+        nome TEXT,
+        valido_de REAL NOT NULL,
+        valido_ate REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS intervalos_codigo ON intervalos (codigo, valido_de)",
+    "CREATE INDEX IF NOT EXISTS intervalos_vigentes ON intervalos (codigo) WHERE valido_ate IS NULL",
+    # Coordenadas em ponto flutuante de 32 bits: a R*Tree devolve um superconjunto,
+    # refinado pelos valores exatos da tabela intervalos
+    "CREATE VIRTUAL TABLE IF NOT EXISTS intervalos_periodo USING rtree(id, de, ate)",
+    # Snapshots já incorporados, pelo instante: o histórico só avança no tempo. A
+    # versão é informativa, pois a numeração recomeça com um armazenamento novo
+    """
+    CREATE TABLE IF NOT EXISTS historico_snapshots (
+        registrado_em REAL PRIMARY KEY,
+        versao INTEGER NOT NULL
+    )
+    """,
+)
+
+# Fim usado na R*Tree para os intervalos vigentes
+FIM_ABERTO = 1e12
+
+# (Código, Unidade) de um preso
+ChavePreso = Tuple[str, str]
+# Valores de Ala, Cela, Foto e Nome
+ValoresPreso = Tuple[Optional[str], ...]
+
+# Leitura da chave e dos valores de um registro no formato de /dados
+_chave = itemgetter("Código", "Unidade")
+_valores = itemgetter("Ala", "Cela", "Foto", "Nome")
+
+
+@dataclass
+class Vigentes:
+    """Intervalos vigentes: id da linha e valores de cada (Código, Unidade)"""
+
+    ids: Dict[ChavePreso, int] = field(default_factory=dict)
+    valores: Dict[ChavePreso, ValoresPreso] = field(default_factory=dict)
+
+
+def criar_tabelas(conexao: sqlite3.Connection) -> None:
+    """Cria as tabelas e índices do histórico, se necessário"""
+    for comando in ESQUEMA_HISTORICO:
+        conexao.execute(comando)
+
+    # Bancos anteriores guardavam os snapshots incorporados por versão
+    antiga = conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'historico_versoes'"
+    ).fetchone()
+    if antiga is not None:
+        with conexao:
+            conexao.execute(
+                "INSERT OR IGNORE INTO historico_snapshots "
+                "SELECT registrado_em, versao FROM historico_versoes"
+            )
+            conexao.execute("DROP TABLE historico_versoes")
+
+
+def _instante(segundos: Optional[float]) -> Optional[str]:
+    """Converte segundos desde a época para ISO 8601 em UTC"""
+    if segundos is None:
+        return None
+    return datetime.fromtimestamp(segundos, timezone.utc).isoformat()
+
+
+def carregar_vigentes(conexao: sqlite3.Connection) -> Vigentes:
+    """
+    Lê os intervalos vigentes de todos os presos
+
+    Args:
+        conexao: Conexão com o banco
+
+    Returns:
+        Vigentes: Intervalo vigente de cada (Código, Unidade)
+    """
+    vigentes = Vigentes()
+    for id_, codigo, unidade, ala, cela, foto, nome in conexao.execute(
+        "SELECT id, codigo, unidade, ala, cela, foto, nome FROM intervalos WHERE valido_ate IS NULL"
+    ):
+        vigentes.ids[codigo, unidade] = id_
+        vigentes.valores[codigo, unidade] = (ala, cela, foto, nome)
+    return vigentes
+
+
+def registrar_snapshot(
+    conexao: sqlite3.Connection,
+    versao: int,
+    quando: datetime,
+    registros: Iterable[Mapping[str, Optional[str]]],
+    vigentes: Optional[Vigentes] = None,
+) -> Vigentes:
+    """
+    Incorpora um snapshot ao histórico, na transação da conexão informada
+
+    Fecha os intervalos dos presos cujos dados mudaram ou que saíram e abre um
+    intervalo para cada preso novo ou alterado. Os intervalos vigentes ficam em
+    memória entre chamadas, então cada snapshot é comparado sem consultar o banco.
+    Os intervalos só avançam no tempo: um snapshot cujo instante não é posterior
+    ao do último incorporado (o mesmo snapshot de novo, ou páginas antigas
+    reprocessadas no mesmo banco) é ignorado, com um aviso no log. A versão não é
+    usada nessa decisão, pois a numeração recomeça com um armazenamento novo.
+
+    Args:
+        conexao: Conexão com o banco, dentro da transação que grava o snapshot
+        versao: Versão do snapshot
+        quando: Instante do snapshot
+        registros: Registros com as chaves Código, Ala, Cela, Foto, Nome e Unidade
+        vigentes: Intervalos vigentes já carregados (ao gravar vários snapshots em
+            sequência); lidos do banco quando não informados
+
+    Returns:
+        Vigentes: Intervalos vigentes após o snapshot, para a chamada seguinte
+    """
+    if vigentes is None:
+        vigentes = carregar_vigentes(conexao)
+
+    instante = quando.timestamp()
+    (ultimo,) = conexao.execute("SELECT MAX(registrado_em) FROM historico_snapshots").fetchone()
+    if ultimo is not None and instante <= ultimo:
+        logger.warning(
+            f"Snapshot {versao} de {_instante(instante)} não incorporado ao histórico: "
+            f"o último incorporado é de {_instante(ultimo)}"
+        )
+        return vigentes
+
+    # Um Código repetido na mesma unidade fica com o último registro
+    registros = list(registros)
+    atuais = dict(zip(map(_chave, registros), map(_valores, registros)))
+    anteriores = vigentes.valores
+    abrir = [(chave, valores) for chave, valores in atuais.items() if anteriores.get(chave) != valores]
+    saidas = anteriores.keys() - atuais.keys()
+
+    fechar = [vigentes.ids[chave] for chave, _ in abrir if chave in vigentes.ids]
+    fechar.extend(vigentes.ids[chave] for chave in saidas)
+    conexao.executemany(
+        "UPDATE intervalos SET valido_ate = ? WHERE id = ?", [(instante, id_) for id_ in fechar]
+    )
+    conexao.executemany(
+        "UPDATE intervalos_periodo SET ate = ? WHERE id = ?", [(instante, id_) for id_ in fechar]
+    )
+    for chave in saidas:
+        del vigentes.ids[chave]
+        del vigentes.valores[chave]
+
+    # Ids atribuídos aqui para inserir as duas tabelas em lote
+    (proximo,) = conexao.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM intervalos").fetchone()
+    novos = [(proximo + i, chave, valores) for i, (chave, valores) in enumerate(abrir)]
+    conexao.executemany(
+        "INSERT INTO intervalos (id, codigo, unidade, ala, cela, foto, nome, valido_de) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(id_, *chave, *valores, instante) for id_, chave, valores in novos],
+    )
+    conexao.executemany(
+        "INSERT INTO intervalos_periodo VALUES (?, ?, ?)",
+        [(id_, instante, FIM_ABERTO) for id_, _, _ in novos],
+    )
+    for id_, chave, valores in novos:
+        vigentes.ids[chave] = id_
+        vigentes.valores[chave] = valores
+
+    conexao.execute("INSERT INTO historico_snapshots VALUES (?, ?)", (instante, versao))
+    return vigentes
+
+
+def consultar_em(
+    conexao: sqlite3.Connection, quando: datetime, unidade: Optional[str] = None
+) -> Optional[List[Dict[str, Optional[str]]]]:
+    """
+    Retorna os presos como estavam em um instante
+
+    Args:
+        conexao: Conexão com o banco
+        quando: Instante consultado
+        unidade: Restringe o resultado a uma unidade
+
+    Returns:
+        Optional[List[Dict]]: Registros no formato de /dados, ou None se o instante é
+            anterior ao primeiro snapshot incorporado
+    """
+    instante = quando.timestamp()
+    (primeiro,) = conexao.execute("SELECT MIN(registrado_em) FROM historico_snapshots").fetchone()
+    if primeiro is None or instante < primeiro:
+        return None
+
+    filtro_unidade = "AND i.unidade = ? " if unidade is not None else ""
+    parametros = [instante, instante, instante, instante]
+    if unidade is not None:
+        parametros.append(unidade)
+
+    linhas = conexao.execute(
+        "SELECT i.codigo, i.ala, i.cela, i.foto, i.nome, i.unidade "
+        "FROM intervalos_periodo p JOIN intervalos i ON i.id = p.id "
+        "WHERE p.de <= ? AND p.ate >= ? "
+        "AND i.valido_de <= ? AND (i.valido_ate IS NULL OR i.valido_ate > ?) "
+        f"{filtro_unidade}ORDER BY i.id",
+        parametros,
+    )
+    return [
+        {"Código": codigo, "Ala": ala, "Cela": cela, "Foto": foto, "Nome": nome, "Unidade": unidade_}
+        for codigo, ala, cela, foto, nome, unidade_ in linhas
+    ]
+
+
+def consultar_preso(conexao: sqlite3.Connection, codigo: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Retorna todos os intervalos de um preso, do mais antigo ao vigente
+
+    Args:
+        conexao: Conexão com o banco
+        codigo: Código do preso
+
+    Returns:
+        List[Dict]: Unidade, Ala, Cela, Foto e Nome de cada intervalo, com início e
+            fim (None no intervalo vigente) em ISO 8601
+    """
+    linhas = conexao.execute(
+        "SELECT unidade, ala, cela, foto, nome, valido_de, valido_ate FROM intervalos "
+        "WHERE codigo = ? ORDER BY valido_de, id",
+        (codigo,),
+    )
+    return [
+        {
+            "Unidade": unidade,
+            "Ala": ala,
+            "Cela": cela,
+            "Foto": foto,
+            "Nome": nome,
+            "valido_de": _instante(valido_de),
+            "valido_ate": _instante(valido_ate),
+        }
+        for unidade, ala, cela, foto, nome, valido_de, valido_ate in linhas
+    ]
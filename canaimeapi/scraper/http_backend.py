@@ -0,0 +1,248 @@
+"""
+Backend de scraping sem navegador, usando httpx e um parser HTML
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from canaimeapi.metricas import FASE_DURACAO
+from canaimeapi.scraper.config import (
+    CANAIME_FOTOS_URL,
+    CANAIME_HTTP_TIMEOUT,
+    CANAIME_LOGIN_URL,
+    CANAIME_PASSWORD,
+    CANAIME_TIMEOUT_LOGIN_SEGUNDOS,
+    CANAIME_TIMEOUT_PAGINA_SEGUNDOS,
+    CANAIME_USER,
+    url_unidade,
+)
+from canaimeapi.scraper.parser import (
+    ColetaUnidade,
+    detectar_codificacao,
+    eh_pagina_login,
+    extrair_entradas_html,
+    extrair_formulario_login,
+    hash_conteudo,
+    processar_entradas,
+)
+from canaimeapi.scraper.resiliencia import limitar_tempo
+
+logger = logging.getLogger("canaime_scraper")
+
+
+def _resposta_login(resposta: httpx.Response) -> bool:
+    """Indica se o site respondeu com a página de login em vez do recurso pedido"""
+    tipo = resposta.headers.get("content-type", "")
+    return tipo.startswith("text/html") and eh_pagina_login(resposta.text)
+
+
+def _extrair_registros(html: str) -> Tuple[int, int, List[Dict[str, str]]]:
+    """
+    Analisa a página de chamada e converte as entradas em registros (executado fora
+    do loop de eventos)
+
+    Returns:
+        Tuple: Quantidade de entradas, quantidade de fotos e registros extraídos
+    """
+    entradas, nomes, fotos = extrair_entradas_html(html)
+    registros = processar_entradas(entradas, nomes, fotos, CANAIME_FOTOS_URL)
+    return len(entradas), len(fotos), registros
+
+
+class CanaimeHttpScraper:
+    """Classe responsável por obter a página de chamada do Canaimé via HTTP"""
+
+    def __init__(self, timeout: float = CANAIME_HTTP_TIMEOUT):
+        """
+        Inicializa o backend HTTP
+
+        Args:
+            timeout: Tempo limite, em segundos, de cada requisição
+        """
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        # Evita logins simultâneos quando várias unidades detectam a sessão expirada
+        self._login_lock = asyncio.Lock()
+        self._sessao_id = 0
+
+    def _obter_cliente(self) -> httpx.AsyncClient:
+        """Retorna o cliente HTTP que mantém os cookies da sessão entre atualizações"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                default_encoding=detectar_codificacao,
+            )
+        return self._client
+
+    async def fechar(self) -> None:
+        """Fecha o cliente HTTP, descartando a sessão"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def realizar_login(self, client: httpx.AsyncClient) -> None:
+        """
+        Realiza o login no sistema Canaimé enviando o formulário de login
+
+        Args:
+            client: Cliente HTTP que armazenará os cookies da sessão
+
+        Raises:
+            TimeoutError: Se o login passar de CANAIME_TIMEOUT_LOGIN_SEGUNDOS
+        """
+        with FASE_DURACAO.labels("http", "login").time():
+            await limitar_tempo(self._enviar_login(client), CANAIME_TIMEOUT_LOGIN_SEGUNDOS, "login")
+
+    async def _enviar_login(self, client: httpx.AsyncClient) -> None:
+        """Obtém o formulário de login e o envia com as credenciais configuradas"""
+        logger.info(f"Acessando a página de login: {CANAIME_LOGIN_URL}")
+        resposta = await client.get(CANAIME_LOGIN_URL)
+        resposta.raise_for_status()
+
+        acao, campos = extrair_formulario_login(resposta.text, str(resposta.url))
+        campos["usuario"] = CANAIME_USER
+        campos["senha"] = CANAIME_PASSWORD
+
+        logger.info("Realizando login no sistema")
+        resposta = await client.post(acao, data=campos)
+        resposta.raise_for_status()
+
+    async def obter_pagina(self, client: httpx.AsyncClient, url: str) -> str:
+        """
+        Obtém o HTML da página de chamada
+
+        Args:
+            client: Cliente HTTP com a sessão autenticada
+            url: Endereço da página de chamada da unidade
+
+        Returns:
+            str: Conteúdo da página de chamada
+
+        Raises:
+            TimeoutError: Se o download passar de CANAIME_TIMEOUT_PAGINA_SEGUNDOS
+        """
+        logger.info(f"Acessando a página de dados: {url}")
+        with FASE_DURACAO.labels("http", "pagina").time():
+            # O timeout do httpx vale para cada leitura; este limita o download inteiro
+            resposta = await limitar_tempo(client.get(url), CANAIME_TIMEOUT_PAGINA_SEGUNDOS, "pagina")
+            resposta.raise_for_status()
+            return resposta.text
+
+    @property
+    def sessao_id(self) -> int:
+        """Contador de logins; muda sempre que a sessão é renovada"""
+        return self._sessao_id
+
+    async def renovar_login(self, client: httpx.AsyncClient, sessao_id: int) -> None:
+        """
+        Refaz o login depois que o site exigiu autenticação
+
+        Se outra tarefa já refez o login desde que `sessao_id` foi lido, a sessão
+        nova é reutilizada e nenhum login é feito.
+
+        Args:
+            client: Cliente HTTP com os cookies da sessão
+            sessao_id: Valor de `sessao_id` lido antes da requisição recusada
+        """
+        async with self._login_lock:
+            # Outra unidade pode ter refeito o login enquanto esta aguardava
+            if self._sessao_id == sessao_id:
+                logger.info("Sessão ausente ou expirada")
+                await self.realizar_login(client)
+                self._sessao_id += 1
+
+    async def obter_autenticado(
+        self, url: str, cabecalhos: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Faz um GET com a sessão do backend, refazendo o login se o site o exigir
+
+        Usado para recursos fora da página de chamada (por exemplo, as fotos), que
+        também só são servidos a uma sessão autenticada.
+
+        Args:
+            url: Endereço do recurso
+            cabecalhos: Cabeçalhos adicionais (por exemplo, de requisição condicional)
+
+        Returns:
+            httpx.Response: Resposta do recurso; o status não é verificado
+
+        Raises:
+            RuntimeError: Se o site continuar exigindo login após autenticar
+        """
+        client = self._obter_cliente()
+        sessao_id = self._sessao_id
+        resposta = await client.get(url, headers=cabecalhos)
+        if not _resposta_login(resposta):
+            return resposta
+
+        await self.renovar_login(client, sessao_id)
+        resposta = await client.get(url, headers=cabecalhos)
+        if _resposta_login(resposta):
+            raise RuntimeError("Login no Canaimé falhou: o site continua exigindo autenticação")
+        return resposta
+
+    async def _obter_pagina_autenticada(self, client: httpx.AsyncClient, url: str) -> str:
+        """
+        Obtém a página de chamada, fazendo login apenas quando a sessão expirou
+
+        Args:
+            client: Cliente HTTP com os cookies da sessão
+            url: Endereço da página de chamada da unidade
+
+        Returns:
+            str: Conteúdo da página de chamada
+
+        Raises:
+            RuntimeError: Se o site continuar exigindo login após autenticar
+        """
+        sessao_id = self._sessao_id
+        html = await self.obter_pagina(client, url)
+        # Verificar o formulário de login analisa a página inteira: fora do loop de eventos
+        if not await asyncio.to_thread(eh_pagina_login, html):
+            logger.info("Sessão reutilizada, login não necessário")
+            return html
+
+        await self.renovar_login(client, sessao_id)
+        html = await self.obter_pagina(client, url)
+
+        if await asyncio.to_thread(eh_pagina_login, html):
+            raise RuntimeError("Login no Canaimé falhou: o site continua exigindo autenticação")
+
+        return html
+
+    async def coletar_registros(
+        self, unidade: str, hash_anterior: Optional[str] = None
+    ) -> ColetaUnidade:
+        """
+        Obtém a página de chamada, com login quando necessário, e extrai os registros
+
+        Várias unidades podem ser coletadas ao mesmo tempo com o mesmo cliente.
+
+        Args:
+            unidade: Identificador da unidade prisional (id_und_prisional)
+            hash_anterior: Hash da página na coleta anterior; se o conteúdo for o
+                mesmo, a extração é ignorada
+
+        Returns:
+            ColetaUnidade: Hash e HTML da página e registros com as chaves Código,
+                Ala, Cela, Foto e Nome (None se a página não mudou)
+        """
+        html = await self._obter_pagina_autenticada(self._obter_cliente(), url_unidade(unidade))
+
+        hash_pagina = hash_conteudo(html)
+        if hash_pagina == hash_anterior:
+            logger.info(f"[{unidade}] Página de chamada inalterada; extração ignorada")
+            return ColetaUnidade(hash_pagina, pagina=html)
+
+        logger.info(f"Extraindo dados dos presos da unidade {unidade} (backend: http)")
+        with FASE_DURACAO.labels("http", "extracao").time():
+            # A análise do HTML das unidades grandes bloquearia o loop de eventos
+            entradas, fotos, registros = await asyncio.to_thread(_extrair_registros, html)
+
+        logger.info(f"[{unidade}] Total de entradas encontradas: {entradas}")
+        logger.info(f"[{unidade}] Total de fotos encontradas: {fotos}")
+        return ColetaUnidade(hash_pagina, registros, html)
@@ -0,0 +1,107 @@
+"""
+Índices de hash sobre os registros de um snapshot para consultas por Código, Ala e Cela
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from canaimeapi.scraper.tabela import TabelaPresos
+
+# Campos indexados em cada snapshot
+CAMPOS_INDEXADOS = ("Código", "Ala", "Cela", "Unidade")
+
+
+def normalizar_chave(valor: Optional[str]) -> str:
+    """
+    Normaliza um valor para uso como chave de índice
+
+    Remove espaços e converte para maiúsculas, como no processamento da página,
+    para que "Ala 01" e "ALA01" encontrem os mesmos registros.
+
+    Args:
+        valor: Valor do campo ou do filtro
+
+    Returns:
+        str: Chave normalizada
+    """
+    return (valor or "").replace(" ", "").upper()
+
+
+class IndiceSnapshot:
+    """Índices de hash construídos uma única vez quando o snapshot é instalado"""
+
+    def __init__(self, tabela: TabelaPresos):
+        """
+        Constrói os índices sobre os registros
+
+        Args:
+            tabela: Registros do snapshot (Código, Ala, Cela, Foto, Nome e Unidade)
+        """
+        self.tabela = tabela
+        self._indices: Dict[str, Dict[str, List[int]]] = {
+            campo: defaultdict(list) for campo in CAMPOS_INDEXADOS
+        }
+
+        for campo, indice in self._indices.items():
+            for posicao, valor in enumerate(tabela.coluna(campo)):
+                indice[normalizar_chave(valor)].append(posicao)
+
+        # Converte para dicionários simples para que consultas não criem chaves
+        self._indices = {campo: dict(indice) for campo, indice in self._indices.items()}
+
+    def __len__(self) -> int:
+        """Retorna a quantidade de registros indexados"""
+        return len(self.tabela)
+
+    def valores(self, campo: str) -> List[str]:
+        """Retorna os valores distintos (normalizados) de um campo indexado"""
+        return sorted(self._indices[campo])
+
+    def consultar(self, **filtros: Optional[str]) -> List[int]:
+        """
+        Retorna as posições dos registros que atendem a todos os filtros
+
+        A consulta parte da menor lista de posições entre os filtros informados
+        e verifica os demais campos apenas nesses registros, com custo
+        proporcional à quantidade de resultados e não ao tamanho do snapshot.
+
+        Args:
+            **filtros: Valores por campo indexado (Código, Ala, Cela, Unidade);
+                filtros None são ignorados
+
+        Returns:
+            List[int]: Posições dos registros, na ordem do snapshot
+        """
+        filtros = {
+            campo: normalizar_chave(valor)
+            for campo, valor in filtros.items()
+            if valor is not None
+        }
+        if not filtros:
+            return list(range(len(self.tabela)))
+
+        candidatos = {
+            campo: self._indices[campo].get(valor, []) for campo, valor in filtros.items()
+        }
+        campo_base = min(candidatos, key=lambda campo: len(candidatos[campo]))
+        restantes = [(campo, valor) for campo, valor in filtros.items() if campo != campo_base]
+
+        return [
+            posicao
+            for posicao in candidatos[campo_base]
+            if all(
+                normalizar_chave(self.tabela.coluna(campo)[posicao]) == valor
+                for campo, valor in restantes
+            )
+        ]
+
+    def buscar(self, **filtros: Optional[str]) -> List[Dict[str, str]]:
+        """
+        Retorna os registros que atendem a todos os filtros
+
+        Args:
+            **filtros: Valores por campo indexado (Código, Ala, Cela, Unidade)
+
+        Returns:
+            List[Dict[str, str]]: Registros encontrados
+        """
+        return self.tabela.registros(self.consultar(**filtros))
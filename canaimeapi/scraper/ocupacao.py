@@ -0,0 +1,116 @@
+"""
+Contagem de presos por unidade, ala e cela, calculada uma vez por snapshot
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+from canaimeapi.scraper.tabela import TabelaPresos
+
+# Chave de uma cela: (Unidade, Ala, Cela); valores ausentes viram texto vazio
+ChaveCela = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class Ocupacao:
+    """Quantidade de presos em cada cela de um snapshot, com os totais agregados"""
+
+    versao: int
+    celas: Mapping[ChaveCela, int]
+
+    @classmethod
+    def calcular(cls, tabela: TabelaPresos, versao: int) -> "Ocupacao":
+        """
+        Conta os registros por (Unidade, Ala, Cela) em uma única passagem
+
+        As colunas já são tuplas de textos internados: o Counter sobre o zip das
+        três colunas agrupa tudo em C, sem montar registros nem um DataFrame.
+
+        Args:
+            tabela: Registros do snapshot
+            versao: Versão do snapshot
+
+        Returns:
+            Ocupacao: Contagem por cela
+        """
+        contagem = Counter(zip(tabela.coluna("Unidade"), tabela.coluna("Ala"), tabela.coluna("Cela")))
+        celas: Dict[ChaveCela, int] = {}
+        for (unidade, ala, cela), quantidade in contagem.items():
+            chave = (unidade or "", ala or "", cela or "")
+            celas[chave] = celas.get(chave, 0) + quantidade
+        return cls(versao=versao, celas=celas)
+
+    @property
+    def total(self) -> int:
+        """Quantidade total de presos"""
+        return sum(self.celas.values())
+
+    def _filtrar(self, unidade: Optional[str]) -> Dict[ChaveCela, int]:
+        """Contagem por cela, restrita a uma unidade quando informada"""
+        if unidade is None:
+            return dict(self.celas)
+        return {chave: quantidade for chave, quantidade in self.celas.items() if chave[0] == unidade}
+
+    @staticmethod
+    def _agrupar(celas: Mapping[ChaveCela, int]) -> Dict:
+        """
+        Monta a árvore unidade > ala > cela com os totais de cada nível
+
+        Args:
+            celas: Quantidade por cela (ou diferença, no caso do delta)
+
+        Returns:
+            Dict: {"total", "unidades": {unidade: {"total", "alas": {ala: {"total", "celas"}}}}}
+        """
+        arvore: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(lambda: defaultdict(dict))
+        for (unidade, ala, cela), quantidade in sorted(celas.items()):
+            arvore[unidade][ala][cela] = quantidade
+
+        unidades = {}
+        for unidade, alas in arvore.items():
+            alas_agrupadas = {
+                ala: {"total": sum(por_cela.values()), "celas": por_cela}
+                for ala, por_cela in alas.items()
+            }
+            unidades[unidade] = {
+                "total": sum(ala["total"] for ala in alas_agrupadas.values()),
+                "alas": alas_agrupadas,
+            }
+        return {"total": sum(unidade["total"] for unidade in unidades.values()), "unidades": unidades}
+
+    def para_dict(self, unidade: Optional[str] = None) -> Dict:
+        """
+        Retorna a ocupação agrupada por unidade, ala e cela
+
+        Args:
+            unidade: Restringe o resultado a uma unidade
+
+        Returns:
+            Dict: Totais de cada unidade, ala e cela
+        """
+        return self._agrupar(self._filtrar(unidade))
+
+    def delta(self, anterior: "Ocupacao", unidade: Optional[str] = None) -> Dict:
+        """
+        Retorna a diferença de ocupação em relação a um snapshot anterior
+
+        Apenas as celas cuja quantidade mudou aparecem; celas esvaziadas têm
+        diferença negativa.
+
+        Args:
+            anterior: Ocupação do snapshot anterior
+            unidade: Restringe o resultado a uma unidade
+
+        Returns:
+            Dict: Versão anterior e as diferenças, na mesma estrutura de `para_dict`
+        """
+        atuais = self._filtrar(unidade)
+        anteriores = anterior._filtrar(unidade)
+        diferencas = {
+            chave: atuais.get(chave, 0) - anteriores.get(chave, 0)
+            for chave in atuais.keys() | anteriores.keys()
+        }
+        return {
+            "versao_anterior": anterior.versao,
+            **self._agrupar({chave: valor for chave, valor in diferencas.items() if valor}),
+        }
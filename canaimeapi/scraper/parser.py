@@ -0,0 +1,228 @@
+"""
+Processamento em Python puro das entradas extraídas da página de chamada do Canaimé
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urljoin
+
+from selectolax.lexbor import LexborHTMLParser
+
+from canaimeapi.metricas import ENTRADAS_MALFORMADAS
+
+logger = logging.getLogger("canaime_scraper")
+
+# Tamanho do prefixo relativo do atributo src das fotos ("../../fotos/presos/")
+PREFIXO_FOTO_LEN = 19
+
+# Declaração de charset nos primeiros bytes do HTML
+CHARSET_RE = re.compile(rb"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+@dataclass
+class ColetaUnidade:
+    """Resultado da coleta da página de chamada de uma unidade"""
+
+    # Hash do conteúdo bruto da página (None se não foi possível obtê-lo)
+    hash: Optional[str]
+    # Registros extraídos; None quando a página não mudou e a extração foi ignorada
+    registros: Optional[List[Dict[str, str]]] = None
+    # HTML da página, guardado no arquivo de páginas (None se o arquivo está desativado)
+    pagina: Optional[str] = None
+
+    @property
+    def inalterada(self) -> bool:
+        """Indica se a extração foi ignorada por a página não ter mudado"""
+        return self.registros is None
+
+
+def hash_conteudo(conteudo: Union[str, bytes]) -> str:
+    """
+    Calcula o hash do conteúdo bruto de uma página
+
+    Args:
+        conteudo: HTML da página, em texto ou bytes
+
+    Returns:
+        str: Hash BLAKE2b de 128 bits em hexadecimal
+    """
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode("utf-8")
+    return hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza textos que começam com 'REMI' e terminam com '01' ou '02' para
+    'REMIÇÃO01' e 'REMIÇÃO02', independentemente dos caracteres intermediários.
+
+    Parameters
+    ----------
+    text : str
+        Texto a ser normalizado.
+
+    Returns
+    -------
+    str
+        Texto normalizado.
+    """
+    if text.startswith("REMI") and text.endswith("01"):
+        logger.debug(f"Texto recebido: {text} -> Texto normalizado: REMIÇÃO01")
+        return "REMIÇÃO01"
+    elif text.startswith("REMI") and text.endswith("02"):
+        logger.debug(f"Texto recebido: {text} -> Texto normalizado: REMIÇÃO02")
+        return "REMIÇÃO02"
+    else:
+        return text
+
+
+def processar_entradas(
+    entradas: Sequence[Optional[str]],
+    nomes: Sequence[Optional[str]],
+    fotos: Sequence[Optional[str]],
+    fotos_url: str,
+) -> List[Dict[str, str]]:
+    """
+    Converte os textos brutos da página de chamada em registros de presos
+
+    As três listas são alinhadas por posição, como na página original: a i-ésima
+    entrada `.titulobkSingCAPS` corresponde ao i-ésimo nome `.titulo12bk` e à
+    i-ésima imagem da página.
+
+    Args:
+        entradas: Conteúdo de texto de cada elemento `.titulobkSingCAPS`
+        nomes: Conteúdo de texto de cada elemento `.titulobkSingCAPS .titulo12bk`
+        fotos: Atributo `src` de cada imagem da página
+        fotos_url: URL base usada para montar o endereço das fotos
+
+    Returns:
+        List[Dict[str, str]]: Registros com as chaves Código, Ala, Cela, Foto e Nome
+    """
+    registros = []
+
+    for i, entrada in enumerate(entradas):
+        processed_entry = (entrada or "").replace(" ", "").strip()
+        elements = processed_entry.split('\n')
+
+        # Verifica se temos elementos suficientes
+        if len(elements) < 5:
+            logger.warning(f"Formato inesperado para entrada: {processed_entry}")
+            ENTRADAS_MALFORMADAS.labels("entrada").inc()
+            continue
+
+        code = elements[0]
+        wing_cell = elements[4].replace("ALA:", "")
+        split_index = wing_cell.rfind('/')
+
+        if split_index == -1:
+            logger.warning(f"Formato inesperado para ala/cela: {wing_cell}")
+            ENTRADAS_MALFORMADAS.labels("ala_cela").inc()
+            continue
+
+        inmate = (nomes[i] if i < len(nomes) else None) or ""
+
+        foto_url = ""
+        foto_src = fotos[i] if i < len(fotos) else None
+        if foto_src:
+            foto_url = fotos_url + foto_src[PREFIXO_FOTO_LEN:]
+
+        registros.append({
+            "Código": code[2:] if len(code) > 2 else code,  # Remove os 2 primeiros caracteres
+            "Ala": normalize_text(wing_cell[:split_index].strip()),
+            "Cela": wing_cell[split_index + 1:].strip(),
+            "Foto": foto_url,
+            "Nome": inmate.strip(),
+        })
+
+    return registros
+
+
+def detectar_codificacao(conteudo: bytes) -> str:
+    """
+    Detecta a codificação de uma página a partir da declaração de charset no HTML
+
+    Usada quando o servidor não informa o charset no cabeçalho Content-Type.
+
+    Args:
+        conteudo: Bytes da resposta
+
+    Returns:
+        str: Nome da codificação (utf-8 quando não declarada)
+    """
+    encontrado = CHARSET_RE.search(conteudo[:4096])
+    if encontrado:
+        return encontrado.group(1).decode("ascii")
+    return "utf-8"
+
+
+def eh_pagina_login(html: str) -> bool:
+    """
+    Verifica se o HTML corresponde à página de login do Canaimé
+
+    Args:
+        html: Conteúdo da página
+
+    Returns:
+        bool: True se a página contém o formulário de login
+    """
+    return LexborHTMLParser(html).css_first('input[name="usuario"]') is not None
+
+
+def extrair_formulario_login(html: str, url: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Obtém o endereço de envio e os campos ocultos do formulário de login
+
+    Args:
+        html: Conteúdo da página de login
+        url: Endereço da página de login, usado para resolver ações relativas
+
+    Returns:
+        Tuple[str, Dict[str, str]]: URL de envio do formulário e campos pré-preenchidos
+    """
+    tree = LexborHTMLParser(html)
+    campo_usuario = tree.css_first('input[name="usuario"]')
+
+    formulario = campo_usuario.parent if campo_usuario is not None else None
+    while formulario is not None and formulario.tag != "form":
+        formulario = formulario.parent
+
+    if formulario is None:
+        return url, {}
+
+    campos = {}
+    for campo in formulario.css("input[name]"):
+        if (campo.attributes.get("type") or "").lower() in ("hidden", "submit"):
+            campos[campo.attributes["name"]] = campo.attributes.get("value") or ""
+
+    acao = formulario.attributes.get("action") or url
+    return urljoin(url, acao), campos
+
+
+def extrair_entradas_html(
+    html: str,
+) -> Tuple[List[Optional[str]], List[Optional[str]], List[Optional[str]]]:
+    """
+    Lê entradas, nomes e fotos do HTML da página de chamada
+
+    Produz as mesmas listas que a leitura em lote pelo navegador, usando
+    o conteúdo de texto completo de cada elemento (equivalente a textContent).
+
+    Args:
+        html: Conteúdo da página de chamada
+
+    Returns:
+        Tuple: Listas com os textos das entradas, os nomes e os src das fotos
+    """
+    tree = LexborHTMLParser(html)
+    entradas = [
+        node.text(deep=True, separator="", strip=False)
+        for node in tree.css(".titulobkSingCAPS")
+    ]
+    nomes = [
+        node.text(deep=True, separator="", strip=False)
+        for node in tree.css(".titulobkSingCAPS .titulo12bk")
+    ]
+    fotos = [node.attributes.get("src") for node in tree.css("img")]
+    return entradas, nomes, fotos
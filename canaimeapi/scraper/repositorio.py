@@ -0,0 +1,401 @@
+"""
+Repositório dos snapshots publicados, sem dependência do navegador
+
+Guarda o snapshot atual, as alterações entre versões e o armazenamento em disco.
+A API consulta os dados por aqui; o scraper apenas entrega os registros extraídos.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from canaimeapi.scraper.armazenamento import ArmazenamentoSnapshots, SnapshotSalvo
+from canaimeapi.scraper.busca import IndiceNomes
+from canaimeapi.scraper.config import (
+    CANAIME_ARMAZENAMENTO_PATH,
+    CANAIME_HISTORICO_VERSOES,
+    CANAIME_UNIDADES,
+)
+from canaimeapi.scraper.diff import DiffSnapshot, HistoricoAlteracoes, calcular_diff
+from canaimeapi.scraper.indices import IndiceSnapshot
+from canaimeapi.scraper.ocupacao import Ocupacao
+from canaimeapi.scraper.snapshot import Snapshot
+from canaimeapi.scraper.tabela import TabelaPresos
+
+logger = logging.getLogger("canaime_scraper")
+
+
+class RepositorioSnapshots:
+    """Mantém o snapshot publicado e o histórico de alterações"""
+
+    def __init__(
+        self,
+        unidades: Optional[List[str]] = None,
+        armazenamento: Optional[ArmazenamentoSnapshots] = None,
+    ):
+        """
+        Inicializa o repositório
+
+        Args:
+            unidades: Unidades prisionais atendidas (padrão: CANAIME_UNIDADES)
+            armazenamento: Armazenamento durável (padrão: CANAIME_ARMAZENAMENTO_PATH,
+                se configurado)
+        """
+        # Snapshot publicado; trocado por inteiro a cada atualização
+        self._snapshot: Optional[Snapshot] = None
+        # Alterações por Código entre as últimas versões
+        self._alteracoes = HistoricoAlteracoes(CANAIME_HISTORICO_VERSOES)
+        # Ocupação do snapshot publicado antes do atual, para as diferenças de /ocupacao
+        self._ocupacao_anterior: Optional[Ocupacao] = None
+        # Snapshots gravados em disco para reiniciar já com dados
+        if armazenamento is None and CANAIME_ARMAZENAMENTO_PATH:
+            armazenamento = ArmazenamentoSnapshots(CANAIME_ARMAZENAMENTO_PATH)
+        self.armazenamento = armazenamento
+        # Funções chamadas sempre que um novo snapshot é instalado
+        self._ao_instalar: List[Callable[[], None]] = []
+        # Funções chamadas com cada snapshot novo antes de publicá-lo, fora do loop de eventos
+        self._ao_preparar: List[Callable[[Snapshot], None]] = []
+        self.unidades = unidades or list(CANAIME_UNIDADES)
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        """Retorna o snapshot publicado, ou None se ainda não houver dados"""
+        return self._snapshot
+
+    @property
+    def dados_presos(self):
+        """
+        Retorna os dados dos presos como DataFrame do pandas
+
+        Mantido por compatibilidade; o DataFrame é montado (e o pandas importado)
+        a cada acesso. A API usa `obter_dados`, que não depende do pandas.
+        """
+        return self._snapshot.dados.para_dataframe() if self._snapshot else None
+
+    @property
+    def ultima_atualizacao(self) -> Optional[str]:
+        """Retorna a data e hora da última atualização"""
+        return self._snapshot.ultima_atualizacao if self._snapshot else None
+
+    @property
+    def versao(self) -> int:
+        """Retorna a versão do snapshot atual (0 enquanto não houver dados)"""
+        return self._snapshot.versao if self._snapshot else 0
+
+    @property
+    def atualizado_em(self) -> Optional[datetime]:
+        """Retorna o instante (UTC) em que o snapshot atual foi instalado"""
+        return self._snapshot.atualizado_em if self._snapshot else None
+
+    @property
+    def indice(self) -> Optional[IndiceSnapshot]:
+        """Retorna os índices do snapshot atual, ou None se ainda não houver dados"""
+        return self._snapshot.indice if self._snapshot else None
+
+    @property
+    def indice_nomes(self) -> Optional[IndiceNomes]:
+        """Retorna o índice de busca por nome, ou None se ainda não houver dados"""
+        return self._snapshot.indice_nomes if self._snapshot else None
+
+    @property
+    def ocupacao(self) -> Optional[Ocupacao]:
+        """Retorna a ocupação por unidade, ala e cela, ou None se ainda não houver dados"""
+        return self._snapshot.ocupacao if self._snapshot else None
+
+    @property
+    def ocupacao_anterior(self) -> Optional[Ocupacao]:
+        """Retorna a ocupação do snapshot publicado antes do atual, se houver"""
+        return self._ocupacao_anterior
+
+    @property
+    def alteracoes(self) -> HistoricoAlteracoes:
+        """Retorna o histórico de alterações entre as últimas versões"""
+        return self._alteracoes
+
+    def registrar_ao_instalar(self, callback: Callable[[], None]) -> None:
+        """
+        Registra uma função chamada sempre que um novo snapshot é instalado
+
+        Args:
+            callback: Função sem argumentos; erros são registrados no log e ignorados
+        """
+        self._ao_instalar.append(callback)
+
+    def registrar_ao_preparar(self, callback: Callable[[Snapshot], None]) -> None:
+        """
+        Registra uma função chamada com cada snapshot novo antes de ele ser publicado
+
+        A função roda na mesma thread que constrói o snapshot, fora do loop de
+        eventos, e serve para trabalho pesado que deve estar pronto quando as
+        requisições passarem a ver a nova versão (por exemplo, serializar /dados).
+
+        Args:
+            callback: Função que recebe o snapshot; erros são registrados no log e ignorados
+        """
+        self._ao_preparar.append(callback)
+
+    @property
+    def dados_json(self) -> str:
+        """Retorna os dados em formato JSON"""
+        return self.gerar_json()
+
+    def obter_dados(self, unidade: Optional[str] = None) -> Optional[TabelaPresos]:
+        """
+        Retorna os dados de todas as unidades ou de uma unidade específica
+
+        Args:
+            unidade: Identificador da unidade prisional (opcional)
+
+        Returns:
+            Optional[TabelaPresos]: Dados dos presos, ou None se ainda não extraídos
+        """
+        if self._snapshot is None:
+            return None
+        if unidade is None:
+            return self._snapshot.dados
+        return self._snapshot.dados_unidades.get(unidade.upper())
+
+    def total_registros(self, unidade: Optional[str] = None) -> int:
+        """Retorna a quantidade de registros de todas as unidades ou de uma unidade"""
+        dados = self.obter_dados(unidade)
+        return len(dados) if dados is not None else 0
+
+    def ultima_atualizacao_unidade(self, unidade: str) -> Optional[str]:
+        """Retorna a data e hora da última atualização de uma unidade"""
+        if self._snapshot is None:
+            return None
+        return self._snapshot.atualizacoes_unidades.get(unidade.upper())
+
+    def gerar_json(self, unidade: Optional[str] = None) -> str:
+        """
+        Retorna os dados em formato JSON
+
+        Args:
+            unidade: Identificador da unidade prisional (opcional)
+        """
+        dados = self.obter_dados(unidade)
+        if dados is None:
+            return "[]"
+        return dados.para_json()
+
+    async def instalar_unidades(
+        self, registros_por_unidade: Dict[str, List[Dict[str, str]]]
+    ) -> bool:
+        """
+        Substitui os dados das unidades extraídas e publica o novo snapshot
+
+        Unidades sem registros mantêm os dados da atualização anterior. O snapshot,
+        os índices, as alterações e o que foi registrado em `registrar_ao_preparar`
+        são construídos fora do loop de eventos; as requisições continuam vendo a
+        versão anterior até a troca.
+
+        Args:
+            registros_por_unidade: Registros (Código, Ala, Cela, Foto e Nome) por unidade
+
+        Returns:
+            bool: True se um snapshot foi publicado e os registros mudaram em relação
+                ao anterior (ou não há como comparar)
+        """
+        anterior = self._snapshot
+        dados_unidades = dict(anterior.dados_unidades) if anterior else {}
+        atualizacoes_unidades = dict(anterior.atualizacoes_unidades) if anterior else {}
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        instaladas = 0
+
+        for unidade, raw_unit_list in registros_por_unidade.items():
+            if not raw_unit_list:
+                logger.warning(f"Nenhum dado foi extraído da unidade {unidade}")
+                continue
+
+            logger.info(
+                f"Dados da unidade {unidade} extraídos com sucesso. "
+                f"Total de registros: {len(raw_unit_list)}"
+            )
+            dados_unidades[unidade] = TabelaPresos.de_registros(raw_unit_list, unidade=unidade)
+            atualizacoes_unidades[unidade] = agora
+            instaladas += 1
+
+        if not instaladas:
+            logger.warning("Nenhum dado foi extraído")
+            return False
+
+        novo = await asyncio.to_thread(
+            Snapshot.construir,
+            self.versao + 1,
+            dados_unidades,
+            atualizacoes_unidades,
+            agora,
+            datetime.now(timezone.utc),
+        )
+        diff = await asyncio.to_thread(self._calcular_alteracoes, anterior, novo)
+        await asyncio.to_thread(self._preparar_snapshot, novo)
+
+        self._publicar_snapshot(novo, diff)
+        await asyncio.to_thread(self._salvar_snapshot, novo)
+        return diff is None or bool(diff.alteracoes)
+
+    def _calcular_alteracoes(
+        self, anterior: Optional[Snapshot], novo: Snapshot
+    ) -> Optional[DiffSnapshot]:
+        """
+        Calcula as alterações do novo snapshot em relação ao anterior
+
+        Args:
+            anterior: Snapshot publicado até agora (None na primeira atualização)
+            novo: Snapshot que será publicado
+
+        Returns:
+            Optional[DiffSnapshot]: Alterações, ou None se não houver comparação possível
+        """
+        if anterior is None:
+            return None
+        try:
+            return calcular_diff(anterior.dados, novo.dados, novo.versao, anterior.versao)
+        except Exception as e:
+            logger.error(f"Erro ao comparar os snapshots {anterior.versao} e {novo.versao}: {e}")
+            return None
+
+    def _publicar_snapshot(self, novo: Snapshot, diff: Optional[DiffSnapshot] = None) -> None:
+        """
+        Torna o snapshot visível para as requisições, junto com suas alterações
+
+        Se havia um snapshot anterior e a comparação não foi possível, o histórico
+        é descartado para que nenhum cliente sincronize com uma lacuna de versões.
+
+        Args:
+            novo: Snapshot completo, já com os índices construídos
+            diff: Alterações em relação ao snapshot anterior
+        """
+        if diff is not None:
+            self._alteracoes.adicionar(diff)
+            logger.info(f"Alterações na versão {novo.versao}: {diff.resumo}")
+        elif self._snapshot is not None:
+            self._alteracoes.limpar()
+
+        if self._snapshot is not None:
+            self._ocupacao_anterior = self._snapshot.ocupacao
+        self._snapshot = novo
+        logger.info(
+            f"Snapshot {novo.versao} instalado. "
+            f"Total de registros em todas as unidades: {len(novo.dados)}"
+        )
+        self._notificar_instalacao()
+
+    def _salvar_snapshot(self, snapshot: Snapshot) -> None:
+        """Grava o snapshot no armazenamento durável, se configurado"""
+        if self.armazenamento is None:
+            return
+
+        try:
+            self.armazenamento.salvar(SnapshotSalvo(
+                versao=snapshot.versao,
+                atualizado_em=snapshot.atualizado_em,
+                ultima_atualizacao=snapshot.ultima_atualizacao,
+                atualizacoes_unidades=dict(snapshot.atualizacoes_unidades),
+                registros_json=snapshot.dados.para_json(),
+            ))
+        except Exception as e:
+            logger.error(f"Erro ao salvar o snapshot {snapshot.versao}: {e}")
+
+    def _construir_salvo(self, salvo: SnapshotSalvo) -> Snapshot:
+        """Reconstrói o snapshot (tabelas por unidade e índices) a partir do JSON salvo"""
+        registros_por_unidade: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        for registro in json.loads(salvo.registros_json):
+            registros_por_unidade[registro.get("Unidade")].append(registro)
+
+        return Snapshot.construir(
+            salvo.versao,
+            {
+                unidade: TabelaPresos.de_registros(registros)
+                for unidade, registros in registros_por_unidade.items()
+            },
+            salvo.atualizacoes_unidades,
+            salvo.ultima_atualizacao,
+            salvo.atualizado_em,
+        )
+
+    def carregar_snapshot(self) -> bool:
+        """
+        Carrega o último snapshot salvo para servir dados antes da primeira atualização
+
+        Returns:
+            bool: True se um snapshot foi carregado
+        """
+        if self.armazenamento is None or self._snapshot is not None:
+            return False
+
+        try:
+            salvo = self.armazenamento.carregar_ultimo()
+        except Exception as e:
+            logger.error(f"Erro ao carregar o snapshot salvo: {e}")
+            return False
+
+        if salvo is None:
+            logger.info("Nenhum snapshot salvo encontrado")
+            return False
+
+        novo = self._construir_salvo(salvo)
+        self._preparar_snapshot(novo)
+        self._publicar_snapshot(novo)
+        logger.info(f"Snapshot {salvo.versao} de {salvo.ultima_atualizacao} carregado do disco")
+        return True
+
+    def sincronizar_armazenamento(self) -> bool:
+        """
+        Carrega o snapshot salvo se ele for mais recente que o publicado
+
+        Usado quando outro processo (por exemplo, a execução agendada em modo
+        serverless) grava os snapshots. As alterações são calculadas apenas
+        quando a versão salva é a seguinte à publicada; saltos maiores
+        descartam o histórico.
+
+        Returns:
+            bool: True se um snapshot mais recente foi instalado
+        """
+        if self.armazenamento is None:
+            return False
+
+        try:
+            if (self.armazenamento.versao_mais_recente() or 0) <= self.versao:
+                return False
+            salvo = self.armazenamento.carregar_ultimo()
+        except Exception as e:
+            logger.error(f"Erro ao verificar o snapshot salvo: {e}")
+            return False
+
+        if salvo is None or salvo.versao <= self.versao:
+            return False
+
+        anterior = self._snapshot
+        novo = self._construir_salvo(salvo)
+        diff = (
+            self._calcular_alteracoes(anterior, novo)
+            if anterior is not None and novo.versao == anterior.versao + 1
+            else None
+        )
+        self._preparar_snapshot(novo)
+        self._publicar_snapshot(novo, diff)
+        logger.info(f"Snapshot {salvo.versao} de {salvo.ultima_atualizacao} carregado do disco")
+        return True
+
+    def _preparar_snapshot(self, snapshot: Snapshot) -> None:
+        """Chama as funções registradas em `registrar_ao_preparar`"""
+        for callback in self._ao_preparar:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Erro ao preparar o snapshot {snapshot.versao}: {e}")
+
+    def _notificar_instalacao(self) -> None:
+        """Chama as funções registradas em `registrar_ao_instalar`"""
+        for callback in self._ao_instalar:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erro ao processar o snapshot {self.versao}: {e}")
+
+
+# Instância única do repositório, compartilhada entre o scraper e a API
+repositorio = RepositorioSnapshots()
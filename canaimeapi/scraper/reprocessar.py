@@ -0,0 +1,323 @@
+"""
+Refaz a extração das páginas de chamada arquivadas e reconstrói os snapshots
+
+Lê o arquivo de páginas (CANAIME_ARQUIVO_PATH), processa cada página com o parser
+atual em um pool de processos e, com --saida, reconstrói em um novo banco SQLite os
+snapshots que as atualizações teriam publicado, na ordem e com o horário em que as
+páginas foram obtidas. Sem --saida, apenas informa as páginas com entradas descartadas
+("Formato inesperado"), para conferir uma correção do parser antes de reconstruir.
+
+Uso:
+    python -m canaimeapi.scraper.reprocessar
+    python -m canaimeapi.scraper.reprocessar --saida /tmp/reprocessado.sqlite3
+    python -m canaimeapi.scraper.reprocessar --desde 2025-01-01 --unidades PAMC --processos 8
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import groupby, islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from canaimeapi.scraper.armazenamento import ArmazenamentoSnapshots, SnapshotSalvo
+from canaimeapi.scraper.arquivo import ArquivoPaginas, ColetaArquivada
+from canaimeapi.scraper.config import CANAIME_ARQUIVO_PATH, CANAIME_FOTOS_URL
+from canaimeapi.scraper.parser import extrair_entradas_html, processar_entradas
+from canaimeapi.scraper.tabela import TabelaPresos
+
+logger = logging.getLogger("canaime_scraper")
+
+
+@dataclass
+class PaginaExtraida:
+    """Registros extraídos de uma página arquivada"""
+
+    hash: str
+    # Quantidade de registros extraídos
+    registros: int
+    # Entradas da página que o parser não conseguiu converter em registros
+    descartadas: int
+    # Registros da unidade serializados como em `TabelaPresos.para_json` (None sem unidade)
+    registros_json: Optional[str] = None
+
+
+@dataclass
+class ResumoReprocessamento:
+    """Totais de um reprocessamento"""
+
+    atualizacoes: int = 0
+    coletas: int = 0
+    paginas: int = 0
+    registros: int = 0
+    snapshots: int = 0
+    # Entradas descartadas por página, apenas das páginas com descartes
+    descartes: Dict[str, int] = field(default_factory=dict)
+
+
+def extrair_pagina(diretorio: str, hash_pagina: str, unidade: Optional[str] = None) -> PaginaExtraida:
+    """
+    Lê uma página do arquivo e extrai seus registros
+
+    Executada nos processos do pool: recebe apenas o diretório e o hash, abre o
+    arquivo no próprio processo e devolve os registros já serializados, que custam
+    bem menos para voltar ao processo principal do que uma lista de dicionários.
+
+    Args:
+        diretorio: Diretório do arquivo de páginas
+        hash_pagina: Hash da página
+        unidade: Unidade da página; quando informada, os registros são serializados
+            com a coluna Unidade
+
+    Returns:
+        PaginaExtraida: Totais da página e, com `unidade`, seus registros em JSON
+    """
+    html = ArquivoPaginas(diretorio).ler(hash_pagina)
+    entradas, nomes, fotos = extrair_entradas_html(html)
+    registros = processar_entradas(entradas, nomes, fotos, CANAIME_FOTOS_URL)
+    return PaginaExtraida(
+        hash_pagina,
+        len(registros),
+        len(entradas) - len(registros),
+        TabelaPresos.de_registros(registros, unidade=unidade).para_json() if unidade else None,
+    )
+
+
+def extrair_em_ordem(
+    executor: Executor,
+    diretorio: Path,
+    paginas: Iterable[Tuple[str, Optional[str]]],
+    adiantadas: int,
+) -> Iterator[PaginaExtraida]:
+    """
+    Extrai as páginas no pool, entregando os resultados na ordem informada
+
+    No máximo `adiantadas` páginas ficam em processamento ou aguardando consumo, o
+    que limita a memória quando a gravação dos snapshots é mais lenta que a extração.
+
+    Args:
+        executor: Pool de processos
+        diretorio: Diretório do arquivo de páginas
+        paginas: Hash e unidade de cada página, na ordem em que serão consumidas
+        adiantadas: Quantidade máxima de páginas enviadas ao pool e não consumidas
+
+    Yields:
+        PaginaExtraida: Resultado de cada página, na ordem de `paginas`
+    """
+    paginas = iter(paginas)
+    pendentes = deque(
+        executor.submit(extrair_pagina, str(diretorio), hash_pagina, unidade)
+        for hash_pagina, unidade in islice(paginas, adiantadas)
+    )
+    while pendentes:
+        futuro = pendentes.popleft()
+        proxima = next(paginas, None)
+        if proxima is not None:
+            pendentes.append(executor.submit(extrair_pagina, str(diretorio), *proxima))
+        yield futuro.result()
+
+
+def planejar(
+    coletas: List[ColetaArquivada],
+) -> List[Tuple[datetime, Dict[str, str]]]:
+    """
+    Agrupa as coletas por atualização, mantendo apenas as unidades cuja página mudou
+
+    Reproduz a detecção de páginas inalteradas do scraper: uma unidade só é
+    reinstalada quando o hash da página difere do da última página instalada.
+
+    Args:
+        coletas: Coletas em ordem cronológica
+
+    Returns:
+        List: Para cada atualização com mudanças, o instante e o hash da página de
+            cada unidade alterada
+    """
+    ultimos: Dict[str, str] = {}
+    plano = []
+    for coletado_em, grupo in groupby(coletas, key=lambda coleta: coleta.coletado_em):
+        alteradas = {}
+        for coleta in grupo:
+            if ultimos.get(coleta.unidade) != coleta.hash:
+                alteradas[coleta.unidade] = coleta.hash
+                ultimos[coleta.unidade] = coleta.hash
+        if alteradas:
+            plano.append((coletado_em, alteradas))
+    return plano
+
+
+def montar_snapshots(
+    plano: List[Tuple[datetime, Dict[str, str]]],
+    paginas: Iterator[PaginaExtraida],
+    resumo: ResumoReprocessamento,
+) -> Iterator[SnapshotSalvo]:
+    """
+    Monta, em ordem, o snapshot que cada atualização planejada teria publicado
+
+    Segue as regras de `RepositorioSnapshots.instalar_unidades`: unidades sem
+    registros mantêm os dados anteriores e, se nenhuma unidade tiver registros,
+    nenhuma versão é criada. O JSON de cada snapshot é a junção dos JSON das
+    unidades, idêntico ao de `TabelaPresos.para_json` sobre a tabela completa, sem
+    montar tabelas, índices nem alterações.
+
+    Args:
+        plano: Atualizações com as páginas alteradas de cada unidade
+        paginas: Páginas extraídas, na ordem em que aparecem no plano
+        resumo: Totais, atualizados a cada página
+
+    Yields:
+        SnapshotSalvo: Snapshots com versões consecutivas a partir de 1
+    """
+    # Registros de cada unidade sem os colchetes, na ordem em que as unidades apareceram
+    json_unidades: Dict[str, str] = {}
+    atualizacoes_unidades: Dict[str, str] = {}
+    versao = 0
+
+    for coletado_em, alteradas in plano:
+        agora = coletado_em.astimezone().strftime("%Y-%m-%d %H:%M:%S")
+        instaladas = 0
+        for unidade in alteradas:
+            pagina = next(paginas)
+            resumo.registros += pagina.registros
+            if pagina.descartadas:
+                resumo.descartes[pagina.hash] = pagina.descartadas
+            if not pagina.registros:
+                logger.warning(f"Nenhum registro na página {pagina.hash} da unidade {unidade}")
+                continue
+            json_unidades[unidade] = pagina.registros_json[1:-1]
+            atualizacoes_unidades[unidade] = agora
+            instaladas += 1
+
+        if not instaladas:
+            continue
+
+        versao += 1
+        yield SnapshotSalvo(
+            versao=versao,
+            atualizado_em=coletado_em.astimezone(timezone.utc),
+            ultima_atualizacao=agora,
+            atualizacoes_unidades=dict(atualizacoes_unidades),
+            registros_json="[" + ",".join(json_unidades.values()) + "]",
+        )
+
+
+def reprocessar(
+    arquivo: ArquivoPaginas,
+    saida: Optional[Path] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    unidades: Optional[List[str]] = None,
+    processos: Optional[int] = None,
+) -> ResumoReprocessamento:
+    """
+    Refaz a extração das páginas arquivadas e, com `saida`, reconstrói os snapshots
+
+    Args:
+        arquivo: Arquivo de páginas
+        saida: Banco SQLite novo onde os snapshots são gravados (None apenas extrai)
+        desde: Considera apenas atualizações a partir deste instante
+        ate: Considera apenas atualizações até este instante
+        unidades: Considera apenas estas unidades
+        processos: Processos do pool (padrão: quantidade de CPUs)
+
+    Returns:
+        ResumoReprocessamento: Totais do reprocessamento
+    """
+    coletas = arquivo.coletas(desde, ate, unidades)
+    resumo = ResumoReprocessamento(
+        atualizacoes=len({coleta.coletado_em for coleta in coletas}),
+        coletas=len(coletas),
+    )
+    processos = processos or os.cpu_count() or 1
+
+    # "spawn" dispensa copiar por fork o estado do processo principal
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        if saida is None:
+            # Cada página distinta uma única vez, sem serializar registros
+            hashes = dict.fromkeys(coleta.hash for coleta in coletas)
+            resumo.paginas = len(hashes)
+            paginas = ((hash_pagina, None) for hash_pagina in hashes)
+            for pagina in extrair_em_ordem(executor, arquivo.diretorio, paginas, processos * 4):
+                resumo.registros += pagina.registros
+                if pagina.descartadas:
+                    resumo.descartes[pagina.hash] = pagina.descartadas
+            return resumo
+
+        plano = planejar(coletas)
+        necessarias = [
+            (hash_pagina, unidade)
+            for _, alteradas in plano
+            for unidade, hash_pagina in alteradas.items()
+        ]
+        resumo.paginas = len(set(necessarias))
+        paginas = extrair_em_ordem(executor, arquivo.diretorio, necessarias, processos * 4)
+        resumo.snapshots = ArmazenamentoSnapshots(saida, manter=None).salvar_varios(
+            montar_snapshots(plano, paginas, resumo)
+        )
+
+    return resumo
+
+
+def main() -> None:
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--arquivo", type=Path, default=CANAIME_ARQUIVO_PATH or None,
+        help="Diretório do arquivo de páginas (padrão: CANAIME_ARQUIVO_PATH)",
+    )
+    parser.add_argument("--saida", type=Path, help="Banco SQLite novo para os snapshots reconstruídos")
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="Início do período (ISO 8601)")
+    parser.add_argument("--ate", type=datetime.fromisoformat, help="Fim do período (ISO 8601)")
+    parser.add_argument("--unidades", help="Unidades separadas por vírgula (padrão: todas)")
+    parser.add_argument("--processos", type=int, help="Processos do pool (padrão: CPUs)")
+    parser.add_argument("-v", "--verboso", action="store_true", help="Exibe os logs do parser")
+    args = parser.parse_args()
+
+    if args.arquivo is None:
+        parser.error("CANAIME_ARQUIVO_PATH está vazio; informe --arquivo")
+    if args.saida is not None and args.saida.exists():
+        parser.error(f"{args.saida} já existe; remova-o ou escolha outro caminho")
+
+    logging.basicConfig(
+        level=logging.INFO if args.verboso else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    unidades = (
+        [unidade.strip().upper() for unidade in args.unidades.split(",") if unidade.strip()]
+        if args.unidades
+        else None
+    )
+
+    arquivo = ArquivoPaginas(args.arquivo)
+    inicio = time.perf_counter()
+    resumo = reprocessar(
+        arquivo, args.saida, args.desde, args.ate, unidades, args.processos
+    )
+    duracao = time.perf_counter() - inicio
+
+    print(
+        f"{resumo.coletas} coletas em {resumo.atualizacoes} atualizações; "
+        f"{resumo.paginas} páginas e {resumo.registros} registros extraídos em {duracao:.1f}s"
+    )
+    if args.saida is not None:
+        print(f"{resumo.snapshots} snapshots gravados em {args.saida}")
+
+    if resumo.descartes:
+        print(
+            f"{sum(resumo.descartes.values())} entradas descartadas em "
+            f"{len(resumo.descartes)} páginas:"
+        )
+        for hash_pagina, descartadas in sorted(resumo.descartes.items(), key=lambda item: -item[1]):
+            print(f"  {arquivo.caminho_pagina(hash_pagina)}: {descartadas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Tempos limite, retentativas e disjuntor das atualizações
+
+Sem dependências além da biblioteca padrão: o estado do disjuntor também é lido
+pelo /status da aplicação serverless, que não importa o scraper na inicialização.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from canaimeapi.scraper.config import (
+    CANAIME_DISJUNTOR_ESPERA_MAX_SEGUNDOS,
+    CANAIME_DISJUNTOR_ESPERA_SEGUNDOS,
+    CANAIME_DISJUNTOR_FALHAS,
+    CANAIME_RETENTATIVA_BASE_SEGUNDOS,
+    CANAIME_RETENTATIVA_MAX_SEGUNDOS,
+    CANAIME_TENTATIVAS,
+)
+
+logger = logging.getLogger("canaime_scraper")
+
+T = TypeVar("T")
+
+# Estados do disjuntor
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoAberto(RuntimeError):
+    """Atualização recusada porque o Canaimé falhou repetidamente há pouco tempo"""
+
+
+async def limitar_tempo(aguardavel: Awaitable[T], segundos: float, fase: str) -> T:
+    """
+    Aguarda uma fase da atualização com tempo limite
+
+    Args:
+        aguardavel: Operação da fase
+        segundos: Tempo limite (0 ou negativo desativa o limite)
+        fase: Nome da fase, usado na mensagem de erro
+
+    Returns:
+        Resultado da operação
+
+    Raises:
+        TimeoutError: Se a fase não terminar dentro do tempo limite
+    """
+    if segundos <= 0:
+        return await aguardavel
+    try:
+        return await asyncio.wait_for(aguardavel, segundos)
+    except TimeoutError:
+        raise TimeoutError(f"Tempo limite de {segundos:g}s excedido na fase '{fase}'") from None
+
+
+async def com_retentativas(
+    operacao: Callable[[], Awaitable[T]],
+    descricao: str,
+    transitorio: Callable[[BaseException], bool],
+    tentativas: int = CANAIME_TENTATIVAS,
+    base: float = CANAIME_RETENTATIVA_BASE_SEGUNDOS,
+    maximo: float = CANAIME_RETENTATIVA_MAX_SEGUNDOS,
+    ao_repetir: Optional[Callable[[], None]] = None,
+) -> T:
+    """
+    Executa a operação repetindo falhas transitórias com espera exponencial
+
+    A espera antes da tentativa n é sorteada entre 0 e min(maximo, base * 2^n)
+    ("full jitter"), para que unidades e workers não repitam todos ao mesmo tempo.
+
+    Args:
+        operacao: Função que inicia a operação a cada tentativa
+        descricao: Identificação da operação nos logs
+        transitorio: Indica se um erro pode ser resolvido repetindo a operação
+        tentativas: Quantidade máxima de tentativas (1 desativa as retentativas)
+        base: Espera base, em segundos
+        maximo: Espera máxima, em segundos
+        ao_repetir: Chamada antes de cada nova tentativa (métricas)
+
+    Returns:
+        Resultado da primeira tentativa bem-sucedida
+
+    Raises:
+        Exception: O erro da última tentativa, ou o primeiro erro não transitório
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return await operacao()
+        except Exception as e:
+            if tentativa >= tentativas or not transitorio(e):
+                raise
+            espera = random.uniform(0, min(maximo, base * 2 ** (tentativa - 1)))
+            logger.warning(
+                f"{descricao}: tentativa {tentativa} de {tentativas} falhou ({e}); "
+                f"repetindo em {espera:.1f}s"
+            )
+            if ao_repetir is not None:
+                ao_repetir()
+            await asyncio.sleep(espera)
+
+
+class Disjuntor:
+    """
+    Suspende as atualizações enquanto o Canaimé está fora do ar
+
+    Após `limite_falhas` atualizações seguidas com falha, o disjuntor abre e
+    recusa novas atualizações durante `espera` segundos. Passado esse tempo, uma
+    única atualização de teste é permitida (meio aberto): se ela falhar, o
+    disjuntor reabre com o dobro da espera, até `espera_maxima`; se der certo,
+    ele fecha e a espera volta ao valor inicial.
+    """
+
+    def __init__(
+        self,
+        limite_falhas: int = CANAIME_DISJUNTOR_FALHAS,
+        espera: float = CANAIME_DISJUNTOR_ESPERA_SEGUNDOS,
+        espera_maxima: float = CANAIME_DISJUNTOR_ESPERA_MAX_SEGUNDOS,
+    ):
+        """
+        Inicializa o disjuntor fechado
+
+        Args:
+            limite_falhas: Falhas seguidas que abrem o disjuntor (0 desativa)
+            espera: Segundos em que o disjuntor fica aberto na primeira vez
+            espera_maxima: Limite da espera, que dobra a cada teste com falha
+        """
+        self.limite_falhas = limite_falhas
+        self.espera_inicial = espera
+        self.espera_maxima = max(espera_maxima, espera)
+        self.espera = espera
+        self.falhas_consecutivas = 0
+        self.ultimo_erro: Optional[str] = None
+        self.ultimo_sucesso: Optional[datetime] = None
+        self._aberto_ate: Optional[float] = None
+
+    @property
+    def estado(self) -> str:
+        """Estado atual: fechado, aberto ou meio_aberto"""
+        if self._aberto_ate is None:
+            return FECHADO
+        if time.monotonic() < self._aberto_ate:
+            return ABERTO
+        return MEIO_ABERTO
+
+    @property
+    def proxima_tentativa(self) -> Optional[datetime]:
+        """Horário (UTC) a partir do qual uma atualização volta a ser permitida"""
+        if self._aberto_ate is None:
+            return None
+        restante = max(self._aberto_ate - time.monotonic(), 0)
+        return datetime.now(timezone.utc) + timedelta(seconds=restante)
+
+    def verificar(self) -> None:
+        """
+        Verifica se uma atualização pode ser executada agora
+
+        Raises:
+            CircuitoAberto: Se o disjuntor estiver aberto
+        """
+        if self.estado == ABERTO:
+            raise CircuitoAberto(
+                f"Canaimé indisponível após {self.falhas_consecutivas} falhas seguidas "
+                f"({self.ultimo_erro}); nova tentativa a partir de "
+                f"{self.proxima_tentativa.astimezone():%H:%M:%S}"
+            )
+
+    def registrar_sucesso(self) -> None:
+        """Fecha o disjuntor após uma atualização concluída"""
+        if self._aberto_ate is not None:
+            logger.info("Canaimé voltou a responder; disjuntor fechado")
+        self.falhas_consecutivas = 0
+        self.ultimo_erro = None
+        self.ultimo_sucesso = datetime.now(timezone.utc)
+        self.espera = self.espera_inicial
+        self._aberto_ate = None
+
+    def registrar_falha(self, erro: BaseException) -> None:
+        """
+        Conta uma atualização com falha, abrindo o disjuntor quando necessário
+
+        Args:
+            erro: Erro da atualização
+        """
+        self.falhas_consecutivas += 1
+        self.ultimo_erro = str(erro) or type(erro).__name__
+        if not self.limite_falhas:
+            return
+
+        if self._aberto_ate is not None:
+            # O teste feito com o disjuntor meio aberto falhou
+            self.espera = min(self.espera * 2, self.espera_maxima)
+        elif self.falhas_consecutivas < self.limite_falhas:
+            return
+
+        self._aberto_ate = time.monotonic() + self.espera
+        logger.warning(
+            f"Disjuntor aberto após {self.falhas_consecutivas} falhas seguidas; "
+            f"atualizações suspensas por {self.espera:g}s"
+        )
+
+
+# Instância única, compartilhada pelo scraper e pelo /status
+disjuntor = Disjuntor()
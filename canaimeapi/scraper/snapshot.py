@@ -0,0 +1,84 @@
+"""
+Snapshot imutável dos dados publicados pelo scraper
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, Mapping
+
+from canaimeapi.scraper.busca import IndiceNomes
+from canaimeapi.scraper.indices import IndiceSnapshot
+from canaimeapi.scraper.ocupacao import Ocupacao
+from canaimeapi.scraper.tabela import TabelaPresos
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Conjunto completo de dados de uma versão, com seus índices
+
+    O scraper troca a referência ao snapshot em uma única atribuição, então
+    quem lê nunca vê dados de uma versão com índices de outra.
+    """
+
+    versao: int
+    dados: TabelaPresos
+    dados_unidades: Mapping[str, TabelaPresos]
+    atualizacoes_unidades: Mapping[str, str]
+    ultima_atualizacao: str
+    atualizado_em: datetime
+    indice: IndiceSnapshot
+    ocupacao: Ocupacao
+    # Protege a construção sob demanda do índice de nomes
+    _trava_indice_nomes: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    @cached_property
+    def indice_nomes(self) -> IndiceNomes:
+        """
+        Índice de busca por nome, construído na primeira busca desta versão
+
+        Fica fora de `construir` para que instâncias que não atendem /busca (como
+        as funções serverless) não paguem o índice de trigramas nem o numpy a
+        cada snapshot carregado.
+        """
+        with self._trava_indice_nomes:
+            # Outra thread pode ter construído o índice enquanto esta aguardava
+            return self.__dict__.get("indice_nomes") or IndiceNomes(self.dados)
+
+    @classmethod
+    def construir(
+        cls,
+        versao: int,
+        dados_unidades: Dict[str, TabelaPresos],
+        atualizacoes_unidades: Dict[str, str],
+        ultima_atualizacao: str,
+        atualizado_em: datetime,
+    ) -> "Snapshot":
+        """
+        Recompõe o conjunto completo a partir das unidades e constrói o índice por
+        código e a ocupação por ala e cela
+
+        Args:
+            versao: Versão do snapshot
+            dados_unidades: Dados de cada unidade (com a coluna Unidade)
+            atualizacoes_unidades: Data e hora da última atualização de cada unidade
+            ultima_atualizacao: Data e hora da atualização, para exibição
+            atualizado_em: Instante (UTC) da atualização
+
+        Returns:
+            Snapshot: Snapshot pronto para ser publicado
+        """
+        dados = TabelaPresos.concatenar(dados_unidades.values())
+        return cls(
+            versao=versao,
+            dados=dados,
+            dados_unidades=dict(dados_unidades),
+            atualizacoes_unidades=dict(atualizacoes_unidades),
+            ultima_atualizacao=ultima_atualizacao,
+            atualizado_em=atualizado_em,
+            indice=IndiceSnapshot(dados),
+            ocupacao=Ocupacao.calcular(dados, versao),
+        )
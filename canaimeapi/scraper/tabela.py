@@ -0,0 +1,319 @@
+"""
+Representação compacta, orientada a colunas, dos registros de um snapshot
+"""
+import csv
+import io
+import sys
+from itertools import chain
+from json.encoder import encode_basestring
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Colunas de cada registro, na ordem em que aparecem no JSON
+COLUNAS = ("Código", "Ala", "Cela", "Foto", "Nome", "Unidade")
+# Colunas com poucos valores distintos: uma única cópia de cada texto é mantida
+COLUNAS_INTERNADAS = ("Ala", "Cela", "Unidade")
+
+Coluna = Tuple[Optional[str], ...]
+
+
+def _internar(valores: Iterable[Optional[str]]) -> Coluna:
+    """Reaproveita a mesma instância de texto para valores repetidos"""
+    return tuple(sys.intern(valor) if valor is not None else None for valor in valores)
+
+
+def _codificar_coluna(valores: Coluna, repetidos: bool) -> List[str]:
+    """
+    Converte os valores de uma coluna em literais JSON
+
+    Args:
+        valores: Valores da coluna
+        repetidos: Se True, cada valor distinto é codificado uma única vez
+
+    Returns:
+        List[str]: Literal JSON de cada valor
+    """
+    if not repetidos:
+        if None not in valores:
+            return list(map(encode_basestring, valores))
+        return ["null" if valor is None else encode_basestring(valor) for valor in valores]
+
+    codificados: Dict[Optional[str], str] = {}
+    for valor in set(valores):
+        codificados[valor] = "null" if valor is None else encode_basestring(valor)
+    return [codificados[valor] for valor in valores]
+
+
+class TabelaPresos:
+    """
+    Registros dos presos guardados como uma tupla de textos por coluna
+
+    Ocupa bem menos memória que uma lista de dicionários ou um DataFrame: não há
+    um dicionário por registro e os valores de Ala, Cela e Unidade são
+    compartilhados entre os registros. Dicionários são criados apenas para os
+    registros devolvidos nas respostas.
+    """
+
+    __slots__ = ("colunas", "_tamanho")
+
+    def __init__(self, colunas: Mapping[str, Coluna]):
+        """
+        Inicializa a tabela com colunas já montadas
+
+        Args:
+            colunas: Tupla de valores de cada coluna em COLUNAS, todas do mesmo tamanho
+
+        Raises:
+            ValueError: Se faltar alguma coluna ou os tamanhos forem diferentes
+        """
+        faltando = [nome for nome in COLUNAS if nome not in colunas]
+        if faltando:
+            raise ValueError(f"Colunas ausentes: {', '.join(faltando)}")
+
+        self.colunas: Dict[str, Coluna] = {nome: tuple(colunas[nome]) for nome in COLUNAS}
+        tamanhos = {len(valores) for valores in self.colunas.values()}
+        if len(tamanhos) > 1:
+            raise ValueError(f"Colunas com tamanhos diferentes: {sorted(tamanhos)}")
+        self._tamanho = tamanhos.pop()
+
+    @classmethod
+    def de_registros(
+        cls,
+        registros: Sequence[Mapping[str, Optional[str]]],
+        unidade: Optional[str] = None,
+    ) -> "TabelaPresos":
+        """
+        Monta a tabela a partir de registros no formato de `processar_entradas`
+
+        Args:
+            registros: Registros com as chaves Código, Ala, Cela, Foto, Nome (e Unidade)
+            unidade: Unidade atribuída a todos os registros (opcional)
+
+        Returns:
+            TabelaPresos: Tabela com os registros
+        """
+        colunas = {nome: [registro.get(nome) for registro in registros] for nome in COLUNAS}
+        if unidade is not None:
+            colunas["Unidade"] = [unidade] * len(registros)
+
+        return cls({
+            nome: _internar(valores) if nome in COLUNAS_INTERNADAS else tuple(valores)
+            for nome, valores in colunas.items()
+        })
+
+    @classmethod
+    def concatenar(cls, tabelas: Iterable["TabelaPresos"]) -> "TabelaPresos":
+        """
+        Junta várias tabelas em uma só, na ordem informada
+
+        Os textos não são copiados: a nova tabela aponta para os mesmos valores.
+
+        Args:
+            tabelas: Tabelas a juntar
+
+        Returns:
+            TabelaPresos: Tabela com os registros de todas
+        """
+        tabelas = list(tabelas)
+        return cls({
+            nome: tuple(chain.from_iterable(tabela.colunas[nome] for tabela in tabelas))
+            for nome in COLUNAS
+        })
+
+    def __len__(self) -> int:
+        """Retorna a quantidade de registros"""
+        return self._tamanho
+
+    def coluna(self, nome: str) -> Coluna:
+        """Retorna os valores de uma coluna"""
+        return self.colunas[nome]
+
+    def registro(self, posicao: int) -> Dict[str, Optional[str]]:
+        """Retorna o registro de uma posição como dicionário"""
+        return {nome: valores[posicao] for nome, valores in self.colunas.items()}
+
+    def registros(self, posicoes: Optional[Iterable[int]] = None) -> List[Dict[str, Optional[str]]]:
+        """
+        Retorna registros como dicionários
+
+        Args:
+            posicoes: Posições desejadas, na ordem do resultado (padrão: todas)
+
+        Returns:
+            List[Dict[str, Optional[str]]]: Registros com as chaves de COLUNAS
+        """
+        if posicoes is None:
+            return [dict(zip(COLUNAS, linha)) for linha in zip(*self.colunas.values())]
+        return [self.registro(posicao) for posicao in posicoes]
+
+    def _colunas_selecionadas(self, campos: Optional[Sequence[str]]) -> Dict[str, Coluna]:
+        """Colunas pedidas, na ordem informada (padrão: todas, na ordem de COLUNAS)"""
+        if campos is None:
+            return self.colunas
+        return {nome: self.colunas[nome] for nome in campos}
+
+    def _objetos_json(self, campos: Optional[Sequence[str]]) -> List[str]:
+        """
+        Codifica cada registro como um objeto JSON, sem montar dicionários
+
+        Os valores repetidos de Ala, Cela e Unidade são codificados uma única vez.
+
+        Args:
+            campos: Colunas incluídas em cada objeto (padrão: todas)
+
+        Returns:
+            List[str]: Um objeto JSON por registro
+        """
+        selecionadas = self._colunas_selecionadas(campos)
+        if not self._tamanho or not selecionadas:
+            return ["{}"] * self._tamanho
+
+        colunas = [
+            _codificar_coluna(valores, nome in COLUNAS_INTERNADAS)
+            for nome, valores in selecionadas.items()
+        ]
+        chaves = [
+            ("{" if i == 0 else ",") + encode_basestring(nome) + ":"
+            for i, nome in enumerate(selecionadas)
+        ]
+        modelo = "%s".join(chaves) + "%s}"
+        return list(map(modelo.__mod__, zip(*colunas)))
+
+    def para_json(self, campos: Optional[Sequence[str]] = None) -> str:
+        """
+        Serializa os registros como uma lista JSON de objetos
+
+        Cada valor é codificado diretamente a partir das colunas, sem montar um
+        dicionário por registro.
+
+        Args:
+            campos: Colunas incluídas em cada objeto (padrão: todas)
+
+        Returns:
+            str: JSON no mesmo formato de `registros()`, sem escapar acentos
+        """
+        return "[" + ",".join(self._objetos_json(campos)) + "]"
+
+    def para_ndjson(self, campos: Optional[Sequence[str]] = None) -> str:
+        """
+        Serializa os registros como NDJSON: um objeto JSON por linha
+
+        Args:
+            campos: Colunas incluídas em cada objeto (padrão: todas)
+
+        Returns:
+            str: Linhas terminadas em "\n", vazio se não houver registros
+        """
+        return "".join(objeto + "\n" for objeto in self._objetos_json(campos))
+
+    def para_json_colunas(self, campos: Optional[Sequence[str]] = None) -> str:
+        """
+        Serializa os registros orientados a colunas: um objeto com a lista de cada coluna
+
+        Cada nome de coluna aparece uma única vez, em vez de uma vez por registro.
+
+        Args:
+            campos: Colunas incluídas (padrão: todas)
+
+        Returns:
+            str: JSON no formato {"Código": [...], "Ala": [...], ...}
+        """
+        partes = []
+        for nome, valores in self._colunas_selecionadas(campos).items():
+            literais = _codificar_coluna(valores, nome in COLUNAS_INTERNADAS)
+            partes.append(encode_basestring(nome) + ":[" + ",".join(literais) + "]")
+        return "{" + ",".join(partes) + "}"
+
+    def para_csv(self, campos: Optional[Sequence[str]] = None) -> str:
+        """
+        Serializa os registros como CSV, com cabeçalho
+
+        Args:
+            campos: Colunas incluídas (padrão: todas)
+
+        Returns:
+            str: CSV com separador vírgula e fim de linha "\r\n"; valores nulos ficam vazios
+        """
+        selecionadas = self._colunas_selecionadas(campos)
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(selecionadas)
+        escritor.writerows(zip(*selecionadas.values()))
+        return saida.getvalue()
+
+    def para_arrow(self, campos: Optional[Sequence[str]] = None):
+        """
+        Converte a tabela em uma tabela do Apache Arrow
+
+        O pyarrow é importado apenas aqui, como o pandas em `para_dataframe`. As
+        colunas Ala, Cela e Unidade são codificadas como dicionário.
+
+        Args:
+            campos: Colunas incluídas (padrão: todas)
+
+        Returns:
+            pyarrow.Table: Registros com as colunas pedidas, do tipo texto
+
+        Raises:
+            ImportError: Se o pyarrow não estiver instalado
+        """
+        import pyarrow as pa
+
+        arrays = {}
+        for nome, valores in self._colunas_selecionadas(campos).items():
+            array = pa.array(valores, type=pa.string())
+            arrays[nome] = array.dictionary_encode() if nome in COLUNAS_INTERNADAS else array
+        return pa.table(arrays)
+
+    def para_arrow_ipc(self, campos: Optional[Sequence[str]] = None) -> bytes:
+        """
+        Serializa os registros no formato de stream IPC do Apache Arrow
+
+        Args:
+            campos: Colunas incluídas (padrão: todas)
+
+        Returns:
+            bytes: Stream IPC com um único lote de registros
+
+        Raises:
+            ImportError: Se o pyarrow não estiver instalado
+        """
+        import pyarrow as pa
+
+        tabela = self.para_arrow(campos)
+        saida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return saida.getvalue().to_pybytes()
+
+    def para_parquet(self, campos: Optional[Sequence[str]] = None) -> bytes:
+        """
+        Serializa os registros como um arquivo Parquet comprimido com zstd
+
+        Args:
+            campos: Colunas incluídas (padrão: todas)
+
+        Returns:
+            bytes: Conteúdo do arquivo Parquet
+
+        Raises:
+            ImportError: Se o pyarrow não estiver instalado
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        saida = pa.BufferOutputStream()
+        pq.write_table(self.para_arrow(campos), saida, compression="zstd")
+        return saida.getvalue().to_pybytes()
+
+    def para_dataframe(self):
+        """
+        Converte a tabela em um DataFrame do pandas
+
+        O pandas é importado apenas aqui, para quem ainda precisa do DataFrame.
+
+        Returns:
+            pandas.DataFrame: Registros com as colunas de COLUNAS
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.colunas, columns=list(COLUNAS))
@@ -0,0 +1,170 @@
+"""
+Aplicação da API do Canaimé para ambientes serverless (Vercel)
+
+Na inicialização são importados apenas a API e o repositório de snapshots: o
+scraper (Playwright, httpx) e o APScheduler só são carregados quando uma
+atualização é solicitada. Não há agendador em segundo plano; as atualizações
+são disparadas pelo cron da plataforma em /api/v1/cron/atualizar.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import time
+from typing import Dict, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, status
+from fastapi.middleware.cors import CORSMiddleware
+
+from canaimeapi.api.router import router
+from canaimeapi.scheduler import TAREFA_ATUALIZACAO, scheduler
+from canaimeapi.scraper.repositorio import repositorio
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    encoding='utf-8',  # Especifica UTF-8 para os logs
+)
+logger = logging.getLogger("canaime_app")
+
+# Segredo que o cron da Vercel envia no cabeçalho Authorization (Bearer)
+CRON_SECRET = os.getenv("CRON_SECRET", "")
+# Intervalo mínimo, em segundos, entre verificações de snapshot mais recente em disco
+SINCRONIZAR_SEGUNDOS = float(os.getenv("CANAIME_SERVERLESS_SINCRONIZAR_SEGUNDOS", "30"))
+
+# Momento (time.monotonic) da última verificação do armazenamento
+_ultima_sincronizacao = float("-inf")
+_sincronizacao_lock = asyncio.Lock()
+
+
+async def sincronizar_snapshot() -> None:
+    """
+    Carrega o snapshot salvo mais recente antes de responder
+
+    Na primeira requisição de uma instância carrega o último snapshot salvo;
+    depois verifica o armazenamento no máximo a cada SINCRONIZAR_SEGUNDOS,
+    para servir atualizações gravadas por outra execução.
+    """
+    global _ultima_sincronizacao
+
+    if time.monotonic() - _ultima_sincronizacao < SINCRONIZAR_SEGUNDOS:
+        return
+
+    async with _sincronizacao_lock:
+        if time.monotonic() - _ultima_sincronizacao < SINCRONIZAR_SEGUNDOS:
+            return
+        _ultima_sincronizacao = time.monotonic()
+        await asyncio.to_thread(repositorio.sincronizar_armazenamento)
+
+
+async def atualizar_dados() -> None:
+    """
+    Executa uma atualização completa, importando o scraper apenas neste momento
+
+    Parte do snapshot salvo mais recente, para que a nova versão siga a
+    numeração já gravada, e fecha navegador e cliente HTTP ao final: a
+    instância pode ser congelada até a próxima chamada.
+    """
+    from canaimeapi.scraper.crawler import scraper
+
+    await asyncio.to_thread(repositorio.sincronizar_armazenamento)
+    try:
+        await scraper.executar_scraping(headless=True)
+    finally:
+        await scraper.fechar()
+
+
+# Atualização sob demanda, compartilhada entre o cron e POST /api/v1/refresh
+scheduler.registrar_tarefa(atualizar_dados, TAREFA_ATUALIZACAO)
+
+
+def verificar_cron(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Verifica o segredo enviado pelo cron da plataforma
+
+    Args:
+        authorization: Cabeçalho Authorization ("Bearer <CRON_SECRET>")
+
+    Raises:
+        HTTPException: 503 se CRON_SECRET não estiver configurado,
+            401 se o segredo for inválido
+    """
+    if not CRON_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="CRON_SECRET não configurado",
+        )
+    if not secrets.compare_digest(authorization or "", f"Bearer {CRON_SECRET}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Segredo do cron inválido",
+        )
+
+
+# Criação da aplicação FastAPI
+app = FastAPI(
+    title="Canaimé API",
+    description="API para obter dados do sistema Canaimé",
+    version="0.1.0",
+)
+
+# Configuração de CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Em produção, restrinja para origens específicas
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Adiciona rotas da API, sempre a partir do snapshot salvo mais recente
+app.include_router(
+    router,
+    prefix="/api/v1",
+    tags=["Canaimé"],
+    dependencies=[Depends(sincronizar_snapshot)],
+)
+
+
+@app.get("/", tags=["Root"])
+async def read_root() -> Dict:
+    """
+    Endpoint raiz da API
+
+    Returns:
+        Dict: Informações básicas sobre a API
+    """
+    return {
+        "app": "Canaimé API",
+        "versao": "0.1.0",
+        "documentacao": "/docs",
+    }
+
+
+@app.get("/api/v1/cron/atualizar", tags=["Cron"])
+async def cron_atualizar(_: None = Depends(verificar_cron)) -> Dict:
+    """
+    Endpoint chamado pelo cron da plataforma para atualizar os dados
+
+    Chamadas simultâneas aguardam a mesma atualização.
+
+    Returns:
+        Dict: Versão e horário do snapshot após a atualização
+
+    Raises:
+        HTTPException: 502 se a atualização falhar
+    """
+    try:
+        await scheduler.executar_agora(TAREFA_ATUALIZACAO)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Falha na atualização dos dados: {e}",
+        )
+
+    return {
+        "versao": repositorio.versao,
+        "ultima_atualizacao": repositorio.ultima_atualizacao,
+        "registros": repositorio.total_registros(),
+    }
@@ -0,0 +1,11 @@
+"""
+Configuração dos testes: o ambiente é definido antes de importar `canaimeapi`,
+que lê as variáveis na importação
+"""
+import os
+
+# Nada é gravado fora dos diretórios temporários dos próprios testes
+os.environ["CANAIME_ARMAZENAMENTO_PATH"] = ""
+os.environ["CANAIME_ARQUIVO_PATH"] = ""
+os.environ["CANAIME_FOTOS_CACHE_PATH"] = ""
+os.environ["API_LIMITE_POR_MINUTO"] = "0"
@@ -0,0 +1,143 @@
+"""
+Testes das chaves de API, do cache de verificação e do limite de requisições
+"""
+import pytest
+from fastapi import HTTPException
+
+from canaimeapi.api import auth
+from canaimeapi.api.auth import (
+    ChaveApi,
+    VerificadorChaves,
+    carregar_chaves,
+    conferir_hash,
+    gerar_hash,
+    verificar_administrador,
+)
+from canaimeapi.api.limites import LimitadorRequisicoes
+
+# Poucas iterações: o custo do PBKDF2 não importa nos testes
+ITERACOES = 1000
+
+
+@pytest.fixture
+def limitador(monkeypatch):
+    """Limitador novo, com orçamento de 3 falhas, no lugar do global"""
+    limitador = LimitadorRequisicoes(por_minuto=60, rajada=5, falhas_por_minuto=6, falhas_rajada=3)
+    monkeypatch.setattr(auth, "limitador", limitador)
+    return limitador
+
+
+@pytest.fixture
+def verificador(limitador):
+    return VerificadorChaves({"bi": ChaveApi("bi", gerar_hash("segredo", ITERACOES))})
+
+
+def test_hash_confere_apenas_o_segredo_certo():
+    guardado = gerar_hash("segredo", ITERACOES)
+    assert conferir_hash("segredo", guardado)
+    assert not conferir_hash("outro", guardado)
+    assert not conferir_hash("segredo", "md5$1$00$00")
+    assert not conferir_hash("segredo", "malformado")
+
+
+def test_carregar_chaves():
+    chaves = carregar_chaves(" bi:h1 , painel:h2:120 ,")
+    assert chaves == {"bi": ChaveApi("bi", "h1"), "painel": ChaveApi("painel", "h2", 120.0)}
+    with pytest.raises(ValueError):
+        carregar_chaves("nome.com.ponto:h1")
+    with pytest.raises(ValueError):
+        carregar_chaves("sem_hash")
+
+
+def test_chave_valida_fica_no_cache(verificador, monkeypatch):
+    assert verificador.verificar("bi.segredo") == "bi"
+
+    def falhar(*args):
+        raise AssertionError("o hash não deveria ser recalculado")
+
+    monkeypatch.setattr(auth, "conferir_hash", falhar)
+    assert verificador.verificar("bi.segredo") == "bi"
+
+
+def test_nome_desconhecido_recusado_sem_hash(verificador, limitador, monkeypatch):
+    monkeypatch.setattr(auth, "conferir_hash", lambda *args: pytest.fail("hash calculado"))
+    assert verificador.verificar("outro.segredo") is None
+    assert verificador.verificar("bi") is None
+    assert limitador.contadores() == {}
+
+
+def test_segredo_errado_nao_entra_no_cache(verificador, limitador):
+    assert verificador.verificar("bi.segredo") == "bi"
+    assert verificador.verificar("bi.errado") is None
+    assert len(verificador._cache) == 1
+    assert limitador.contadores()["bi"].recusadas == 1
+
+
+def test_orcamento_de_falhas_esgotado_recusa_sem_hash(verificador, limitador, monkeypatch):
+    for tentativa in range(3):
+        assert verificador.verificar(f"bi.errado{tentativa}") is None
+
+    monkeypatch.setattr(auth, "conferir_hash", lambda *args: pytest.fail("hash calculado"))
+    with pytest.raises(HTTPException) as erro:
+        verificador.verificar("bi.errado3")
+    assert erro.value.status_code == 429
+    assert int(erro.value.headers["Retry-After"]) > 0
+    assert limitador.contadores()["bi"].limitadas == 1
+
+
+def test_chave_em_cache_ignora_orcamento_de_falhas(verificador):
+    assert verificador.verificar("bi.segredo") == "bi"
+    for tentativa in range(3):
+        verificador.verificar(f"bi.errado{tentativa}")
+    assert verificador.verificar("bi.segredo") == "bi"
+
+
+def test_segredo_certo_devolve_a_tentativa(verificador, limitador):
+    verificador.verificar("bi.errado")
+    verificador.verificar("bi.errado2")
+    assert verificador.verificar("bi.segredo") == "bi"
+    # A tentativa reservada pela chave certa foi devolvida: ainda resta uma
+    assert verificador.verificar("bi.errado3") is None
+
+
+def test_limite_de_requisicoes_responde_429():
+    limitador = LimitadorRequisicoes(por_minuto=60, rajada=2)
+    limitador.cobrar("bi")
+    limitador.cobrar("bi")
+    with pytest.raises(HTTPException) as erro:
+        limitador.cobrar("bi")
+    assert erro.value.status_code == 429
+    assert erro.value.headers["Retry-After"] == "1"
+    # Os demais clientes têm baldes próprios
+    limitador.cobrar("painel")
+
+    contadores = limitador.contadores()["bi"]
+    assert (contadores.aceitas, contadores.limitadas) == (2, 1)
+
+
+def test_custo_maior_que_o_balde_vale_como_balde_cheio():
+    limitador = LimitadorRequisicoes(por_minuto=60, rajada=5)
+    limitador.cobrar("bi", 30)
+    assert limitador.fichas("bi") < 1
+
+
+def test_limite_zero_desativa():
+    limitador = LimitadorRequisicoes(por_minuto=0, rajada=5)
+    for _ in range(100):
+        limitador.cobrar("bi")
+    assert limitador.fichas("bi") is None
+
+
+def test_limite_proprio_da_chave():
+    limitador = LimitadorRequisicoes(por_minuto=60, rajada=5)
+    limitador.definir_limite("bi", 0)
+    for _ in range(10):
+        limitador.cobrar("bi")
+
+
+def test_rota_administrativa(monkeypatch):
+    monkeypatch.setattr(auth, "API_ADMINS", {"admin"})
+    assert verificar_administrador("admin") == "admin"
+    with pytest.raises(HTTPException) as erro:
+        verificar_administrador("bi")
+    assert erro.value.status_code == 403
@@ -0,0 +1,46 @@
+"""
+Testes da busca por nome e da construção sob demanda do índice de cada snapshot
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from canaimeapi.scraper.snapshot import Snapshot
+from canaimeapi.scraper.tabela import TabelaPresos
+
+
+def snapshot():
+    nomes = ["José da Conceição", "MARIA SOUZA", "JOAO CONCEICAO LIMA"]
+    registros = [
+        {"Código": str(posicao), "Ala": "A", "Cela": "1", "Foto": None, "Nome": nome}
+        for posicao, nome in enumerate(nomes)
+    ]
+    unidades = {
+        "PAMC": TabelaPresos.de_registros(registros[:2], unidade="PAMC"),
+        "CPBV": TabelaPresos.de_registros(registros[2:], unidade="CPBV"),
+    }
+    return Snapshot.construir(1, unidades, {}, "", datetime.now(timezone.utc))
+
+
+def test_indice_construido_no_primeiro_acesso():
+    novo = snapshot()
+    assert "indice_nomes" not in vars(novo)
+
+    with ThreadPoolExecutor(4) as executor:
+        indices = list(executor.map(lambda _: novo.indice_nomes, range(8)))
+    assert all(indice is indices[0] for indice in indices)
+    assert novo.indice_nomes is indices[0]
+
+
+def nomes(indice, termo, unidade=None):
+    resultados = indice.buscar(termo, unidade=unidade)
+    return [indice.tabela.registro(posicao)["Nome"] for _, posicao in resultados]
+
+
+def test_busca_sem_acentos_e_com_erros():
+    indice = snapshot().indice_nomes
+    assert nomes(indice, "jose conceicao")[0] == "José da Conceição"
+    assert nomes(indice, "MARIA SOUSA") == ["MARIA SOUZA"]
+    assert nomes(indice, "conceicao", unidade="CPBV") == ["JOAO CONCEICAO LIMA"]
+    assert indice.buscar("conceicao", unidade="OUTRA") == []
+    assert indice.buscar("xyz") == []
+
@@ -0,0 +1,165 @@
+"""
+Testes do cache de respostas: variantes comprimidas, ETag/304 e troca de versões
+"""
+import asyncio
+import gzip
+import threading
+from datetime import datetime, timezone
+
+import brotli
+from starlette.requests import Request
+
+from canaimeapi.api import router
+from canaimeapi.api.cache import CacheRespostas, RespostaSerializada
+from canaimeapi.scraper.repositorio import RepositorioSnapshots
+from canaimeapi.scraper.snapshot import Snapshot
+from canaimeapi.scraper.tabela import TabelaPresos
+
+INSTANTE = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+CORPO = b'[{"Codigo": "1"}]' * 100
+
+
+def requisicao(**cabecalhos: str) -> Request:
+    """Requisição GET com os cabeçalhos informados"""
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(nome.replace("_", "-").encode(), valor.encode()) for nome, valor in cabecalhos.items()],
+    })
+
+
+def test_variantes_comprimidas():
+    resposta = RespostaSerializada.criar(CORPO, INSTANTE)
+    assert gzip.decompress(resposta.corpo_gzip) == CORPO
+    assert brotli.decompress(resposta.corpo_br) == CORPO
+
+    br = resposta.responder(requisicao(accept_encoding="gzip, br"))
+    assert br.headers["content-encoding"] == "br"
+    assert brotli.decompress(br.body) == CORPO
+
+    gz = resposta.responder(requisicao(accept_encoding="gzip, br;q=0"))
+    assert gz.headers["content-encoding"] == "gzip"
+
+    identidade = resposta.responder(requisicao())
+    assert "content-encoding" not in identidade.headers
+    assert identidade.body == CORPO
+
+
+def test_sem_compressao():
+    resposta = RespostaSerializada.criar(CORPO, INSTANTE, "application/octet-stream", comprimir=False)
+    assert resposta.corpo_gzip is None and resposta.corpo_br is None
+    enviada = resposta.responder(requisicao(accept_encoding="br"))
+    assert "content-encoding" not in enviada.headers
+    assert enviada.body == CORPO
+
+
+def test_etag_e_304():
+    resposta = RespostaSerializada.criar(CORPO, INSTANTE)
+    assert resposta.etag == RespostaSerializada.criar(CORPO, INSTANTE).etag
+    assert resposta.etag != RespostaSerializada.criar(CORPO + b" ", INSTANTE).etag
+
+    for if_none_match in (resposta.etag, f'"x", {resposta.etag}', f"W/{resposta.etag}", "*"):
+        enviada = resposta.responder(requisicao(if_none_match=if_none_match))
+        assert enviada.status_code == 304, if_none_match
+        assert enviada.headers["etag"] == resposta.etag
+
+    assert resposta.responder(requisicao(if_none_match='"outro"')).status_code == 200
+    # Um ETag contido em outro não vale como igual
+    assert resposta.responder(requisicao(if_none_match=resposta.etag[:-2] + '"')).status_code == 200
+
+
+def test_if_modified_since():
+    resposta = RespostaSerializada.criar(CORPO, INSTANTE)
+    ultima = resposta.responder(requisicao()).headers["last-modified"]
+    assert ultima == "Wed, 01 May 2024 12:30:15 GMT"
+    assert resposta.responder(requisicao(if_modified_since=ultima)).status_code == 304
+    anterior = "Wed, 01 May 2024 12:30:14 GMT"
+    assert resposta.responder(requisicao(if_modified_since=anterior)).status_code == 200
+    assert resposta.responder(requisicao(if_modified_since="inválido")).status_code == 200
+
+
+def test_serializa_uma_vez_por_versao():
+    cache = CacheRespostas()
+    chamadas = []
+
+    def gerar():
+        chamadas.append(1)
+        return CORPO
+
+    primeira = cache.obter("dados", 1, gerar, INSTANTE)
+    assert cache.obter("dados", 1, gerar, INSTANTE) is primeira
+    assert len(chamadas) == 1
+    cache.obter("dados", 2, gerar, INSTANTE)
+    assert len(chamadas) == 2
+
+
+def test_versao_antiga_nao_descarta_as_novas():
+    cache = CacheRespostas()
+    cache.obter("dados", 1, lambda: b"v1", INSTANTE)
+    v2 = cache.obter("dados", 2, lambda: b"v2", INSTANTE)
+    v3 = cache.obter("dados", 3, lambda: b"v3", INSTANTE)
+
+    # A versão 1 ficou antiga: é servida, mas não entra no cache
+    assert cache.obter("dados", 1, lambda: b"v1", INSTANTE).corpo == b"v1"
+    assert cache.obter("dados", 2, lambda: b"outro", INSTANTE) is v2
+    assert cache.obter("dados", 3, lambda: b"outro", INSTANTE) is v3
+    assert sorted({versao for versao, _ in cache._itens}) == [2, 3]
+
+
+def test_threads_concorrentes():
+    cache = CacheRespostas()
+    erros = []
+
+    def consultar(versao):
+        try:
+            for _ in range(50):
+                resposta = cache.obter("dados", versao, lambda: f"v{versao}".encode(), INSTANTE)
+                assert resposta.corpo == f"v{versao}".encode()
+        except AssertionError as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=consultar, args=(versao,)) for versao in (1, 2, 3, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not erros
+    assert max(versao for versao, _ in cache._itens) == 3
+
+
+def test_preparo_antes_da_publicacao():
+    repositorio = RepositorioSnapshots(["PAMC"])
+    vistos = []
+
+    def preparar(snapshot):
+        # O snapshot novo ainda não está visível para as requisições
+        vistos.append((snapshot.versao, repositorio.versao, threading.current_thread()))
+
+    repositorio.registrar_ao_preparar(preparar)
+    registros = [{"Código": "1", "Ala": "A", "Cela": "1", "Foto": None, "Nome": "JOSE"}]
+    assert asyncio.run(repositorio.instalar_unidades({"PAMC": registros}))
+
+    assert [(versao, publicada) for versao, publicada, _ in vistos] == [(1, 0)]
+    assert vistos[0][2] is not threading.main_thread()
+    assert repositorio.versao == 1
+
+
+def test_resposta_ausente_gerada_fora_do_loop(monkeypatch):
+    monkeypatch.setattr(router, "cache_respostas", CacheRespostas())
+    tabela = TabelaPresos.de_registros([{"Código": "1", "Ala": "A", "Cela": "1", "Foto": None, "Nome": "JOSE"}])
+    snapshot = Snapshot.construir(1, {"PAMC": tabela}, {}, "2024-05-01 12:30:15", INSTANTE)
+    threads = []
+
+    def gerar():
+        threads.append(threading.current_thread())
+        return CORPO
+
+    async def cenario():
+        primeira = await router._obter_resposta("dados", snapshot, gerar)
+        assert await router._obter_resposta("dados", snapshot, gerar) is primeira
+
+    asyncio.run(cenario())
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
@@ -0,0 +1,91 @@
+"""
+Testes da comparação entre snapshots e do histórico de alterações
+"""
+from canaimeapi.scraper.diff import (
+    ENTRADA,
+    FOTO,
+    SAIDA,
+    TRANSFERENCIA,
+    HistoricoAlteracoes,
+    calcular_diff,
+)
+from canaimeapi.scraper.tabela import TabelaPresos
+
+
+def tabela(*registros):
+    return TabelaPresos.de_registros(list(registros))
+
+
+def preso(codigo, cela="1", foto="f.jpg", nome="JOSE", unidade="PAMC", ala="A"):
+    return {"Código": codigo, "Ala": ala, "Cela": cela, "Foto": foto, "Nome": nome, "Unidade": unidade}
+
+
+def por_tipo(diff):
+    return {(alteracao["tipo"], alteracao["Código"]) for alteracao in diff.alteracoes}
+
+
+def test_tipos_de_alteracao():
+    antes = tabela(preso("1"), preso("2"), preso("3"), preso("4"), preso("5"))
+    depois = tabela(
+        preso("1"),
+        preso("2", cela="9"),
+        preso("3", unidade="CPBV"),
+        preso("4", foto="nova.jpg"),
+        preso("6"),
+    )
+    diff = calcular_diff(antes, depois, 2, 1)
+
+    assert (diff.versao, diff.versao_anterior) == (2, 1)
+    assert por_tipo(diff) == {
+        (TRANSFERENCIA, "2"),
+        (TRANSFERENCIA, "3"),
+        (FOTO, "4"),
+        (SAIDA, "5"),
+        (ENTRADA, "6"),
+    }
+    assert diff.resumo == {ENTRADA: 1, SAIDA: 1, TRANSFERENCIA: 2, FOTO: 1}
+
+
+def test_conteudo_das_alteracoes():
+    diff = calcular_diff(tabela(preso("1"), preso("2")), tabela(preso("1", cela="7"), preso("3")), 5, 4)
+    alteracoes = {alteracao["Código"]: alteracao for alteracao in diff.alteracoes}
+
+    assert alteracoes["1"]["antes"]["Cela"] == "1"
+    assert alteracoes["1"]["depois"]["Cela"] == "7"
+    assert alteracoes["2"]["antes"]["Nome"] == "JOSE" and "depois" not in alteracoes["2"]
+    assert alteracoes["3"]["depois"]["Unidade"] == "PAMC" and "antes" not in alteracoes["3"]
+    assert all(alteracao["versao"] == 5 for alteracao in diff.alteracoes)
+
+
+def test_mudanca_so_de_nome_nao_gera_alteracao():
+    diff = calcular_diff(tabela(preso("1")), tabela(preso("1", nome="JOSÉ")), 2, 1)
+    assert diff.alteracoes == []
+
+
+def test_valores_ausentes_equivalem_a_vazio():
+    diff = calcular_diff(tabela(preso("1", foto=None)), tabela(preso("1", foto="")), 2, 1)
+    assert diff.alteracoes == []
+
+
+def test_codigo_repetido_usa_a_primeira_ocorrencia():
+    antes = tabela(preso("1", cela="1"), preso("1", cela="2"))
+    depois = tabela(preso("1", cela="1"))
+    assert calcular_diff(antes, depois, 2, 1).alteracoes == []
+
+
+def test_historico_desde_e_versao_minima():
+    historico = HistoricoAlteracoes(max_versoes=2)
+    assert historico.ultimo is None and historico.versao_minima is None
+
+    vazio = tabela(preso("1"))
+    for versao in (2, 3, 4):
+        historico.adicionar(calcular_diff(vazio, vazio, versao, versao - 1))
+
+    # Só os dois últimos diffs ficam: um cliente na versão 2 ainda sincroniza
+    assert historico.versao_minima == 2
+    assert [diff.versao for diff in historico.desde(2)] == [3, 4]
+    assert historico.desde(4) == []
+    assert historico.ultimo.versao == 4
+
+    historico.limpar()
+    assert historico.versao_minima is None
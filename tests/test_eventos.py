@@ -0,0 +1,124 @@
+"""
+Testes do envio de alterações por Server-Sent Events: retomada pelo
+Last-Event-ID, clientes atrasados e manutenção da conexão
+"""
+import asyncio
+
+import pytest
+
+from canaimeapi.api.eventos import HEARTBEAT, DifusorEventos
+from canaimeapi.scraper.repositorio import RepositorioSnapshots
+
+
+def preso(codigo, cela="1"):
+    return {"Código": codigo, "Ala": "A", "Cela": cela, "Foto": None, "Nome": "JOSE"}
+
+
+async def instalar(repositorio, cela):
+    """Instala uma versão nova, com o preso 1 na cela informada"""
+    assert await repositorio.instalar_unidades({"PAMC": [preso("1", cela)]})
+
+
+def campos(quadro: bytes) -> dict:
+    """Campos "id" e "event" de um quadro SSE"""
+    linhas = [linha.split(": ", 1) for linha in quadro.decode().splitlines() if ": " in linha]
+    return {nome: valor for nome, valor in linhas if nome in ("id", "event")}
+
+
+@pytest.fixture
+def repositorio():
+    return RepositorioSnapshots(["PAMC"])
+
+
+def test_retomada_envia_as_versoes_perdidas(repositorio):
+    async def cenario():
+        difusor = DifusorEventos(repositorio)
+        for cela in ("1", "2", "3"):
+            await instalar(repositorio, cela)
+
+        fluxo = difusor.assinar(desde=1)
+        conectado = await anext(fluxo)
+        assert conectado.startswith(b"retry: ")
+        # Sem id: se a conexão cair agora, o cliente retoma da versão 1
+        assert campos(conectado) == {"event": "conectado"}
+        assert campos(await anext(fluxo)) == {"id": "2", "event": "versao"}
+        assert campos(await anext(fluxo)) == {"id": "3", "event": "versao"}
+
+        # Versão nova durante a conexão chega pela fila
+        await instalar(repositorio, "4")
+        assert campos(await anext(fluxo)) == {"id": "4", "event": "versao"}
+        await fluxo.aclose()
+        assert difusor.clientes == 0
+
+    asyncio.run(cenario())
+
+
+def test_versao_fora_do_historico_recebe_reinicio(repositorio):
+    async def cenario():
+        difusor = DifusorEventos(repositorio)
+        for cela in ("1", "2"):
+            await instalar(repositorio, cela)
+
+        for desde in (0, 99):
+            fluxo = difusor.assinar(desde=desde)
+            await anext(fluxo)
+            assert campos(await anext(fluxo)) == {"id": "2", "event": "reinicio"}
+            await fluxo.aclose()
+
+        # Cliente já na versão atual não recebe nada além do "conectado"
+        fluxo = difusor.assinar(desde=2, heartbeat=0.01)
+        await anext(fluxo)
+        assert await anext(fluxo) == HEARTBEAT
+        await fluxo.aclose()
+
+    asyncio.run(cenario())
+
+
+def test_versao_ja_enviada_pelo_historico_nao_se_repete(repositorio):
+    async def cenario():
+        difusor = DifusorEventos(repositorio)
+        await instalar(repositorio, "1")
+        fluxo = difusor.assinar(desde=1, heartbeat=0.01)
+        await anext(fluxo)
+
+        # A versão 2 entra na fila e também no histórico antes do cliente lê-lo
+        await instalar(repositorio, "2")
+        assert campos(await anext(fluxo)) == {"id": "2", "event": "versao"}
+        assert await anext(fluxo) == HEARTBEAT
+        await fluxo.aclose()
+
+    asyncio.run(cenario())
+
+
+def test_cliente_atrasado_e_desconectado(repositorio):
+    async def cenario():
+        difusor = DifusorEventos(repositorio, tamanho_fila=1)
+        await instalar(repositorio, "1")
+        lento = difusor.assinar()
+        assert campos(await anext(lento)) == {"id": "1", "event": "conectado"}
+
+        await instalar(repositorio, "2")
+        await instalar(repositorio, "3")
+        assert difusor.clientes == 0
+        # Os quadros pendentes são descartados e a conexão termina
+        with pytest.raises(StopAsyncIteration):
+            await anext(lento)
+
+    asyncio.run(cenario())
+
+
+def test_limite_de_clientes_e_duracao_maxima(repositorio):
+    async def cenario():
+        difusor = DifusorEventos(repositorio, max_clientes=1)
+        await instalar(repositorio, "1")
+        fluxo = difusor.assinar(duracao_max=0.05, heartbeat=1)
+        await anext(fluxo)
+        assert difusor.lotado
+
+        # A espera termina no prazo da conexão, que então é encerrada
+        assert await anext(fluxo) == HEARTBEAT
+        with pytest.raises(StopAsyncIteration):
+            await anext(fluxo)
+        assert not difusor.lotado
+
+    asyncio.run(cenario())
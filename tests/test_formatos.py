@@ -0,0 +1,101 @@
+"""
+Testes dos formatos de exportação de /dados e da escolha do formato e das colunas
+"""
+import csv
+import io
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from canaimeapi.api import formatos
+from canaimeapi.api.formatos import FORMATOS, obter_campos, obter_formato
+from canaimeapi.scraper.tabela import TabelaPresos
+
+TABELA = TabelaPresos.de_registros([
+    {"Código": "1", "Ala": "A", "Cela": "1", "Foto": None, "Nome": 'JOSE "ZE", DA SILVA', "Unidade": "PAMC"},
+    {"Código": "2", "Ala": "B", "Cela": None, "Foto": "f.jpg", "Nome": "MARIA\nSOUZA", "Unidade": "PAMC"},
+])
+
+
+def requisicao(accept: str = "") -> Request:
+    """Requisição GET com o cabeçalho Accept informado"""
+    cabecalhos = [(b"accept", accept.encode())] if accept else []
+    return Request({"type": "http", "method": "GET", "path": "/dados", "headers": cabecalhos})
+
+
+def serializar(nome, campos=None) -> str:
+    return FORMATOS[nome].serializar(TABELA, campos).decode("utf-8")
+
+
+def test_csv_com_aspas_e_nulos():
+    texto = serializar("csv")
+    assert texto.startswith("Código,Ala,Cela,Foto,Nome,Unidade\r\n")
+    assert '"JOSE ""ZE"", DA SILVA"' in texto
+    linhas = list(csv.reader(io.StringIO(texto)))
+    assert linhas[1] == ["1", "A", "1", "", 'JOSE "ZE", DA SILVA', "PAMC"]
+    # Nulos saem vazios e a quebra de linha fica dentro do campo entre aspas
+    assert linhas[2] == ["2", "B", "", "f.jpg", "MARIA\nSOUZA", "PAMC"]
+
+
+def test_formatos_de_texto_equivalentes():
+    registros = json.loads(serializar("json"))
+    assert registros[1]["Cela"] is None
+    assert [json.loads(linha) for linha in serializar("ndjson").splitlines()] == registros
+    colunas = json.loads(serializar("colunas"))
+    assert colunas["Nome"] == [r["Nome"] for r in registros]
+
+
+def test_projecao_segue_a_ordem_das_colunas():
+    campos = obter_campos("nome, codigo,CELA")
+    assert campos == ("Código", "Cela", "Nome")
+    assert obter_campos("Código,Código") == ("Código",)
+    # Todas as colunas equivalem a não projetar
+    assert obter_campos("Unidade,Nome,Foto,Cela,Ala,Código") is None
+    assert obter_campos(None) is None
+
+    assert serializar("csv", campos).splitlines()[0] == "Código,Cela,Nome"
+    assert list(json.loads(serializar("json", campos))[0]) == ["Código", "Cela", "Nome"]
+
+
+@pytest.mark.parametrize("fields", ["Idade", ",", "Código,Idade"])
+def test_coluna_invalida(fields):
+    with pytest.raises(HTTPException) as erro:
+        obter_campos(fields)
+    assert erro.value.status_code == 400
+
+
+def test_parametro_format_prevalece_sobre_accept():
+    assert obter_formato(requisicao("text/csv"), "NDJSON").nome == "ndjson"
+    assert obter_formato(requisicao("text/csv"), None).nome == "csv"
+    with pytest.raises(HTTPException) as erro:
+        obter_formato(requisicao(), "xml")
+    assert erro.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "accept, esperado",
+    [
+        ("", "json"),
+        ("*/*", "json"),
+        ("text/html, text/csv", "csv"),
+        ("text/csv;q=0.5, application/x-ndjson", "ndjson"),
+        ("application/ndjson;q=0.9, text/csv;q=0.9", "ndjson"),
+        ("text/csv;q=0, application/json;q=0.1", "json"),
+        ("text/csv;q=abc", "json"),
+    ],
+)
+def test_escolha_pelo_accept(accept, esperado):
+    assert obter_formato(requisicao(accept), None).nome == esperado
+
+
+@pytest.mark.parametrize("nome", ["arrow", "parquet"])
+def test_formato_sem_pyarrow_responde_406(nome, monkeypatch):
+    monkeypatch.setattr(formatos.importlib.util, "find_spec", lambda pacote: None)
+    with pytest.raises(HTTPException) as erro:
+        obter_formato(requisicao(), nome)
+    assert erro.value.status_code == 406
+    with pytest.raises(HTTPException) as erro:
+        obter_formato(requisicao(FORMATOS[nome].media_type), None)
+    assert erro.value.status_code == 406
@@ -0,0 +1,101 @@
+"""
+Testes do cache de fotos contra o Canaimé simulado, que só serve fotos a uma
+sessão autenticada
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.servidor_canaime import CAMINHO_FOTOS, FOTO_JPEG, ServidorCanaime
+from canaimeapi.api.cache import etag_corresponde
+from canaimeapi.scraper import http_backend
+from canaimeapi.scraper.fotos import CacheFotos
+from canaimeapi.scraper.http_backend import CanaimeHttpScraper
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    with ServidorCanaime(total=10) as servidor:
+        variaveis = servidor.variaveis_ambiente()
+        for nome in ("CANAIME_LOGIN_URL", "CANAIME_USER", "CANAIME_PASSWORD"):
+            monkeypatch.setattr(http_backend, nome, variaveis[nome])
+        yield servidor
+
+
+def url_foto(servidor: ServidorCanaime, codigo: str) -> str:
+    return f"{servidor.url_base}{CAMINHO_FOTOS}{codigo}_1.jpg"
+
+
+def test_foto_exige_sessao(servidor):
+    resposta = httpx.get(url_foto(servidor, "100001"), follow_redirects=True)
+    assert resposta.headers["content-type"].startswith("text/html")
+    assert servidor.fotos_servidas == 0
+
+
+def test_cache_faz_login_e_revalida(servidor, tmp_path):
+    async def cenario():
+        cache = CacheFotos(tmp_path, 2**20, revalidar_segundos=0, miniatura_px=16)
+        try:
+            foto = await cache.obter("100001", url_foto(servidor, "100001"))
+            assert foto.conteudo == FOTO_JPEG
+            assert foto.tipo == "image/jpeg"
+            assert servidor.logins == 1
+
+            # Miniatura (com Pillow) ou, sem ele, a própria foto
+            miniatura = await cache.obter("100001", url_foto(servidor, "100001"), miniatura=True)
+            assert miniatura.tipo == "image/jpeg"
+
+            # A revalidação reaproveita a sessão e recebe 304
+            await cache.obter("100001", url_foto(servidor, "100001"))
+            assert servidor.fotos_servidas == 1
+            await cache.obter("100002", url_foto(servidor, "100002"))
+            assert servidor.logins == 1
+            assert servidor.fotos_servidas == 2
+        finally:
+            await cache.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_cache_usa_a_sessao_do_scraper(servidor, tmp_path):
+    async def cenario():
+        http = CanaimeHttpScraper()
+        cache = CacheFotos(tmp_path, 2**20)
+        cache.usar_sessao(http)
+        try:
+            await http.realizar_login(http._obter_cliente())
+            await cache.obter("100001", url_foto(servidor, "100001"))
+            assert servidor.logins == 1
+            await cache.fechar()
+            # A sessão do scraper não é fechada pelo cache
+            assert not http._obter_cliente().is_closed
+        finally:
+            await http.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_login_recusado(servidor, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_backend, "CANAIME_PASSWORD", "errada")
+
+    async def cenario():
+        cache = CacheFotos(tmp_path, 2**20)
+        try:
+            with pytest.raises(RuntimeError):
+                await cache.obter("100001", url_foto(servidor, "100001"))
+        finally:
+            await cache.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_if_none_match_da_foto():
+    assert etag_corresponde('"abc"', '"abc"')
+    assert etag_corresponde('W/"abc"', '"abc"')
+    assert etag_corresponde('"x", "abc"', '"abc"')
+    assert etag_corresponde("*", '"abc"')
+    # Um ETag contido em outro não é igual a ele
+    assert not etag_corresponde('"abc-mini"', '"abc"')
+    assert not etag_corresponde('"xabc"', '"abc"')
+    assert not etag_corresponde("", '"abc"')
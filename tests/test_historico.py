@@ -0,0 +1,128 @@
+"""
+Testes do histórico temporal: intervalos, consultas por instante e snapshots ignorados
+"""
+import json
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from canaimeapi.scraper.armazenamento import ArmazenamentoSnapshots, SnapshotSalvo
+from canaimeapi.scraper.historico import (
+    consultar_em,
+    consultar_preso,
+    criar_tabelas,
+    registrar_snapshot,
+)
+
+INICIO = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def preso(codigo, cela, nome="JOSE", unidade="PAMC", ala="A"):
+    return {"Código": codigo, "Ala": ala, "Cela": cela, "Foto": None, "Nome": nome, "Unidade": unidade}
+
+
+@pytest.fixture
+def conexao():
+    conexao = sqlite3.connect(":memory:")
+    criar_tabelas(conexao)
+    yield conexao
+    conexao.close()
+
+
+def horas(quantidade):
+    return INICIO + timedelta(hours=quantidade)
+
+
+def test_intervalos_so_mudam_com_alteracoes(conexao):
+    vigentes = registrar_snapshot(conexao, 1, horas(0), [preso("1", "10"), preso("2", "20")])
+    vigentes = registrar_snapshot(conexao, 2, horas(1), [preso("1", "10"), preso("2", "20")], vigentes)
+    vigentes = registrar_snapshot(conexao, 3, horas(2), [preso("1", "11"), preso("2", "20")], vigentes)
+    registrar_snapshot(conexao, 4, horas(3), [preso("1", "11")], vigentes)
+
+    (linhas,) = conexao.execute("SELECT COUNT(*) FROM intervalos").fetchone()
+    assert linhas == 3
+
+    intervalos = consultar_preso(conexao, "1")
+    assert [intervalo["Cela"] for intervalo in intervalos] == ["10", "11"]
+    assert intervalos[0]["valido_ate"] == horas(2).isoformat()
+    assert intervalos[1]["valido_ate"] is None
+
+    saida = consultar_preso(conexao, "2")
+    assert saida[0]["valido_ate"] == horas(3).isoformat()
+
+
+def test_consulta_por_instante(conexao):
+    vigentes = registrar_snapshot(conexao, 1, horas(0), [preso("1", "10"), preso("2", "20", unidade="CPBV")])
+    registrar_snapshot(conexao, 2, horas(2), [preso("1", "11")], vigentes)
+
+    assert consultar_em(conexao, horas(-1)) is None
+    assert [r["Cela"] for r in consultar_em(conexao, horas(0))] == ["10", "20"]
+    assert [r["Cela"] for r in consultar_em(conexao, horas(1) + timedelta(minutes=59))] == ["10", "20"]
+    assert [r["Cela"] for r in consultar_em(conexao, horas(2))] == ["11"]
+    assert consultar_em(conexao, horas(1), unidade="CPBV") == [preso("2", "20", unidade="CPBV")]
+
+
+def test_vigentes_lidos_do_banco(conexao):
+    registrar_snapshot(conexao, 1, horas(0), [preso("1", "10")])
+    # Sem os vigentes em memória (reinício), a comparação usa os do banco
+    registrar_snapshot(conexao, 2, horas(1), [preso("1", "10")])
+    (linhas,) = conexao.execute("SELECT COUNT(*) FROM intervalos").fetchone()
+    assert linhas == 1
+
+
+def test_snapshot_repetido_ou_antigo_ignorado_com_aviso(conexao, caplog):
+    vigentes = registrar_snapshot(conexao, 1, horas(1), [preso("1", "10")])
+    with caplog.at_level(logging.WARNING, logger="canaime_scraper"):
+        vigentes = registrar_snapshot(conexao, 1, horas(1), [preso("1", "10")], vigentes)
+        registrar_snapshot(conexao, 2, horas(0), [preso("1", "99")], vigentes)
+
+    assert len(caplog.records) == 2
+    assert "não incorporado" in caplog.records[0].getMessage()
+    assert [r["Cela"] for r in consultar_preso(conexao, "1")] == ["10"]
+
+
+def test_numeracao_reiniciada_continua_registrando(conexao):
+    vigentes = registrar_snapshot(conexao, 40, horas(0), [preso("1", "10")])
+    # Armazenamento novo: a numeração das versões recomeça, mas o tempo avança
+    registrar_snapshot(conexao, 1, horas(1), [preso("1", "11")], vigentes)
+    assert [r["Cela"] for r in consultar_preso(conexao, "1")] == ["10", "11"]
+
+
+def test_migra_tabela_por_versao():
+    conexao = sqlite3.connect(":memory:")
+    conexao.execute(
+        "CREATE TABLE historico_versoes (versao INTEGER PRIMARY KEY, registrado_em REAL NOT NULL)"
+    )
+    conexao.execute("INSERT INTO historico_versoes VALUES (7, ?)", (horas(0).timestamp(),))
+    criar_tabelas(conexao)
+
+    assert conexao.execute("SELECT registrado_em, versao FROM historico_snapshots").fetchall() == [
+        (horas(0).timestamp(), 7)
+    ]
+    # O snapshot já incorporado continua valendo para a decisão de ignorar
+    registrar_snapshot(conexao, 8, horas(0), [preso("1", "10")])
+    (linhas,) = conexao.execute("SELECT COUNT(*) FROM intervalos").fetchone()
+    assert linhas == 0
+    assert consultar_em(conexao, horas(-1)) is None
+    conexao.close()
+
+
+def test_armazenamento_grava_o_historico_de_cada_snapshot(tmp_path):
+    armazenamento = ArmazenamentoSnapshots(tmp_path / "snapshots.sqlite3", manter=1)
+
+    def salvo(versao, quando, registros):
+        return SnapshotSalvo(versao, quando, quando.isoformat(), {"PAMC": quando.isoformat()}, json.dumps(registros))
+
+    armazenamento.salvar(salvo(1, horas(0), [preso("1", "10")]))
+    armazenamento.salvar_varios([
+        salvo(2, horas(1), [preso("1", "11")]),
+        salvo(3, horas(2), [preso("1", "11"), preso("2", "20")]),
+    ])
+
+    # Só o último snapshot fica no banco, mas o histórico guarda todos os períodos
+    assert armazenamento.versao_mais_recente() == 3
+    assert armazenamento.dados_em(horas(0)) == [preso("1", "10")]
+    assert [r["Cela"] for r in armazenamento.historico_preso("1")] == ["10", "11"]
+    assert [r["Código"] for r in armazenamento.dados_em(horas(2))] == ["1", "2"]
@@ -0,0 +1,77 @@
+"""
+Testes do arquivo de páginas e do reprocessamento: os snapshots reconstruídos
+devem ser iguais aos publicados pelo repositório com as mesmas páginas
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fixtures import gerar_pagina_chamada
+from canaimeapi.scraper.armazenamento import ArmazenamentoSnapshots
+from canaimeapi.scraper.arquivo import ArquivoPaginas
+from canaimeapi.scraper.config import CANAIME_FOTOS_URL
+from canaimeapi.scraper.parser import extrair_entradas_html, processar_entradas
+from canaimeapi.scraper.repositorio import RepositorioSnapshots
+from canaimeapi.scraper.reprocessar import reprocessar
+
+INICIO = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+PAMC = gerar_pagina_chamada(20, seed=1, codigo_inicial=100000)
+CPBV = gerar_pagina_chamada(15, seed=2, codigo_inicial=200000)
+CPBV_NOVA = gerar_pagina_chamada(16, seed=3, codigo_inicial=200000)
+
+
+def registros(html):
+    return processar_entradas(*extrair_entradas_html(html), CANAIME_FOTOS_URL)
+
+
+def test_paginas_repetidas_gravadas_uma_vez(tmp_path):
+    arquivo = ArquivoPaginas(tmp_path)
+    assert arquivo.guardar(INICIO, {"PAMC": PAMC, "CPBV": CPBV}) == 2
+    assert arquivo.guardar(INICIO + timedelta(hours=1), {"PAMC": PAMC, "CPBV": CPBV_NOVA}) == 1
+
+    coletas = arquivo.coletas()
+    assert [(c.coletado_em, c.unidade) for c in coletas] == [
+        (INICIO, "PAMC"),
+        (INICIO, "CPBV"),
+        (INICIO + timedelta(hours=1), "PAMC"),
+        (INICIO + timedelta(hours=1), "CPBV"),
+    ]
+    assert arquivo.ler(coletas[0].hash) == PAMC
+    assert [c.unidade for c in arquivo.coletas(desde=INICIO + timedelta(minutes=1), unidades=["CPBV"])] == ["CPBV"]
+
+
+def test_reprocessamento_reconstroi_os_snapshots(tmp_path):
+    arquivo = ArquivoPaginas(tmp_path / "arquivo")
+    arquivo.guardar(INICIO, {"PAMC": PAMC, "CPBV": CPBV})
+    arquivo.guardar(INICIO + timedelta(hours=1), {"PAMC": PAMC, "CPBV": CPBV})
+    arquivo.guardar(INICIO + timedelta(hours=2), {"PAMC": PAMC, "CPBV": CPBV_NOVA})
+
+    saida = tmp_path / "reprocessado.sqlite3"
+    resumo = reprocessar(arquivo, saida, processos=2)
+
+    # A atualização sem páginas novas não gera versão, como no scraper
+    assert (resumo.atualizacoes, resumo.coletas, resumo.paginas) == (3, 6, 3)
+    assert resumo.snapshots == 2
+    assert resumo.descartes == {}
+
+    repositorio = RepositorioSnapshots(["PAMC", "CPBV"])
+    asyncio.run(repositorio.instalar_unidades({"PAMC": registros(PAMC), "CPBV": registros(CPBV)}))
+    asyncio.run(repositorio.instalar_unidades({"CPBV": registros(CPBV_NOVA)}))
+
+    armazenamento = ArmazenamentoSnapshots(saida, manter=None)
+    salvo = armazenamento.carregar_ultimo()
+    assert salvo.versao == repositorio.versao == 2
+    assert salvo.atualizado_em == INICIO + timedelta(hours=2)
+    assert json.loads(salvo.registros_json) == json.loads(repositorio.dados_json)
+    # O histórico temporal acompanha os instantes das coletas
+    assert len(armazenamento.dados_em(INICIO + timedelta(minutes=30))) == 35
+
+
+def test_sem_saida_apenas_extrai(tmp_path):
+    arquivo = ArquivoPaginas(tmp_path)
+    arquivo.guardar(INICIO, {"PAMC": PAMC, "CPBV": CPBV})
+    arquivo.guardar(INICIO + timedelta(hours=1), {"PAMC": PAMC, "CPBV": CPBV})
+
+    resumo = reprocessar(arquivo, processos=1)
+    assert (resumo.paginas, resumo.registros, resumo.snapshots) == (2, 35, 0)